@@ -0,0 +1,43 @@
+"""
+将 stock_minute_data.json 转换为内存映射用的二进制格式 stock_minute_data.bin
+分钟数据更新后重新运行一次即可，fund_api.py 启动时会优先使用不早于JSON的二进制文件
+
+用法: python convert_minute_data.py [JSON路径] [输出路径]
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from minute_data import BINARY_DTYPE, MINUTE_DATA_BIN_PATH, MINUTE_DATA_JSON_PATH, MinuteDataIndex
+
+
+def convert(json_path, bin_path):
+    """转换并校验，返回股票数量"""
+    start = time.perf_counter()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        index = MinuteDataIndex.from_json_data(json.load(f))
+    json_ms = (time.perf_counter() - start) * 1000
+
+    index.write_binary(bin_path)
+
+    start = time.perf_counter()
+    mapped = MinuteDataIndex.from_binary(bin_path)
+    bin_ms = (time.perf_counter() - start) * 1000
+
+    # 二进制文件以float32存放价格，按同样精度比较
+    if mapped.codes != index.codes or not np.array_equal(mapped.prices, index.prices.astype(BINARY_DTYPE)):
+        raise ValueError("二进制文件校验失败：读回的数据与JSON不一致")
+
+    print(f"已转换 {len(index)} 只股票: {json_path} -> {bin_path}")
+    print(f"文件大小: JSON {os.path.getsize(json_path) / 1024:.0f} KB，二进制 {os.path.getsize(bin_path) / 1024:.0f} KB")
+    print(f"加载耗时: JSON解析 {json_ms:.1f} ms，内存映射 {bin_ms:.1f} ms")
+    return len(index)
+
+
+if __name__ == '__main__':
+    json_path = sys.argv[1] if len(sys.argv) > 1 else MINUTE_DATA_JSON_PATH
+    bin_path = sys.argv[2] if len(sys.argv) > 2 else MINUTE_DATA_BIN_PATH
+    convert(json_path, bin_path)
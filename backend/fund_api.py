@@ -1,106 +1,75 @@
 """
 使用AkShare获取基金数据的服务
-需要安装: pip install akshare
+需要安装: pip install akshare（上游数据源见 fund_data_source.py，可切换为录制的 fixture 回放）
+请求追踪与 /metrics 指标见 metrics.py
+
+可通过环境变量配置：
+    VERBOSE_STOCK_LOG  是否逐只股票打印行情查询日志（1打印），默认不打印
+    VALUATION_BATCH_WORKERS  批量估值时同时加载持仓的基金数，默认8
 """
-import akshare as ak
 import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
 import json
 import os
 
-app = Flask(__name__)
-CORS(app)
+from fund_data_source import fund_data_source, source_stats
+from holdings_cache import holdings_cache
+from holdings_normalize import normalize_holdings
+from holdings_source import fetch_latest_holdings
+from holdings_store import holdings_store
+from market_clock import MARKET_REPLAY_CONTROL, MARKET_REPLAY_SPEED, market_clock
+from metrics import METRICS_ENABLED, instrument_flask, metrics_registry, span, upstream_call
+from minute_data import (
+    CLOSE_SLOT, MINUTE_SLOT, TRADING_MINUTES, MinuteDataSource, is_trading_minute, price_value, strip_market_suffix,
+    time_to_slot
+)
+from price_snapshot import PriceSnapshot
+from valuation_curve_store import slots_after, valuation_curve_store
+from valuation_engine import compute_fund_changes
+from valuation_stream import VALUATION_STREAM_MAX_FUNDS, ValuationBroadcaster
 
-# 加载分钟级模拟数据
-def load_minute_data():
-    """加载股票分钟级涨跌幅数据"""
-    try:
-        data_file = os.path.join(os.path.dirname(__file__), '..', 'stock_minute_data.json')
-        with open(data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"加载分钟数据失败: {str(e)}")
-        return {}
+VERBOSE_STOCK_LOG = os.environ.get('VERBOSE_STOCK_LOG', '0') == '1'
+VALUATION_BATCH_WORKERS = int(os.environ.get('VALUATION_BATCH_WORKERS', 8))
 
-minute_data_cache = load_minute_data()
 
-def calculate_valuation_at_time(current_time, holdings):
-    """计算指定时间的基金估值"""
-    time_str = current_time.strftime('%H:%M')
-    current_hour = current_time.hour
-    current_minute = current_time.minute
+def _create_holdings_executor():
+    # 与 holdings_source 按年份请求的线程池分开：加载持仓的任务会等待按年份的请求，共用一个有界线程池可能互相等待
+    return ThreadPoolExecutor(max_workers=VALUATION_BATCH_WORKERS, thread_name_prefix='valuation-holdings')
 
-    # 跳过11:31-12:59之间的非交易时间
-    if time_str > "11:30" and time_str < "13:00":
-        return []
 
-    # 判断是否在开盘时间内（包含11:30和15:00作为收盘时刻）
-    # 交易时间：9:30-11:30, 13:00-15:00
-    is_trading_time = (
-        (9 < current_hour < 11) or
-        (current_hour == 9 and current_minute >= 30) or
-        (current_hour == 11 and current_minute >= 0 and current_minute <= 30) or
-        (13 <= current_hour < 15) or
-        (current_hour == 15 and current_minute == 0)
-    )
+# 批量估值时并发加载各基金持仓的线程池
+_holdings_executor = _create_holdings_executor()
 
-    # 计算当前时间的基金估值
-    total_market_value = 0
-    weighted_change = 0
-
-    for holding in holdings:
-        stock_code_simple = holding['stockCode'].replace('.XSHE', '').replace('.XSHG', '').replace('.XBJE', '')
-        market_value = holding['marketValue']
-        hold_percent = holding['holdPercent']
-
-        # 从分钟数据获取该时间点的价格
-        stock_data = minute_data_cache.get(stock_code_simple, {})
-        minute_prices = stock_data.get('minute_prices', [])
-        open_price = stock_data.get('open_price', stock_data.get('base_price', 100.0))
-        base_price = stock_data.get('base_price', open_price)
-
-        current_price = open_price
-        current_change = 0
-        if minute_prices:
-            if is_trading_time:
-                # 交易时间内，使用当前时间对应的最新价格
-                for price_data in minute_prices:
-                    if price_data['time'] <= time_str:
-                        current_price = price_data['price']
-            else:
-                # 不在交易时间（如晚上8点），使用当天15:00的收盘价格
-                for price_data in minute_prices:
-                    if price_data['time'] <= "15:00":
-                        current_price = price_data['price']
 
-        # 计算涨跌幅：
-        # 始终使用：(最新价格 - 开盘价) / 开盘价 * 100
-        # 最新价格在交易时间内是当前时间价格，非交易时间是15:00收盘价
-        if open_price > 0:
-            current_change = (current_price - open_price) / open_price * 100
+def _reset_holdings_executor_after_fork():
+    """fork出的子进程（如gunicorn worker）不会继承父进程的线程，需要新建线程池"""
+    global _holdings_executor
+    _holdings_executor = _create_holdings_executor()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_holdings_executor_after_fork)
+
+app = Flask(__name__)
+CORS(app)
+# 每个请求记录各阶段耗时，汇总到 /metrics
+instrument_flask(app)
 
-        # 加权计算
-        total_market_value += market_value
-        weighted_change += market_value * current_change
+# 加载分钟级模拟数据，并构建按交易分钟下标的价格索引
+# 数据文件被重新生成后自动在后台重新加载，每次请求通过 current() 取当前索引
+minute_data_source = MinuteDataSource()
 
-    if total_market_value > 0:
-        estimated_change = weighted_change / total_market_value
-        return [{'time': time_str, 'changePercent': round(estimated_change, 2)}]
-    return []
+# 预加载本地持仓库，重启后不必重新请求所有基金的持仓
+print(f"本地持仓库已加载 {holdings_store.warm_load()} 只基金")
 
 # 缓存股票实时行情，避免频繁请求
 stock_cache = {}
 cache_time = None
 
-def get_stock_market_code(stock_code):
-    """将股票代码转换为市场代码"""
-    if stock_code.startswith('6') or stock_code.startswith('5'):
-        return 'XSHG'
-    else:
-        return 'XSHE'
-
 def get_cached_stock_prices():
     """获取缓存的股票实时行情"""
     global stock_cache, cache_time
@@ -133,50 +102,37 @@ def get_single_stock_price(stock_code, current_time=None):
     """获取单个股票的实时价格（使用分钟级模拟数据）"""
     try:
         # 去除市场后缀
-        code = stock_code.replace('.XSHE', '').replace('.XSHG', '').replace('.XBJE', '')
+        code = strip_market_suffix(stock_code)
 
-        # 获取当前时间
+        # 获取当前时间（回放模式下为回放时钟的时间）
         if current_time is None:
-            current_time = datetime.now()
+            current_time = market_clock.now()
         time_str = current_time.strftime('%H:%M')
-        current_hour = current_time.hour
-        current_minute = current_time.minute
-
-        print(f"查询股票 {code} 在 {time_str} 的行情...")
 
-        # 从分钟数据中获取该时间的价格
-        stock_data = minute_data_cache.get(code, {})
-        minute_prices = stock_data.get('minute_prices', [])
-        open_price = stock_data.get('open_price', stock_data.get('base_price', 50.0))
-        base_price = stock_data.get('base_price', open_price)
+        if VERBOSE_STOCK_LOG:
+            print(f"查询股票 {code} 在 {time_str} 的行情...")
 
         # 判断是否在开盘时间内（包含11:30和15:00作为收盘时刻）
         # 交易时间：9:30-11:30, 13:00-15:00
-        is_trading_time = (
-            (9 < current_hour < 11) or
-            (current_hour == 9 and current_minute >= 30) or
-            (current_hour == 11 and current_minute >= 0 and current_minute <= 30) or
-            (13 <= current_hour < 15) or
-            (current_hour == 15 and current_minute == 0)
-        )
-
-        # 找到最接近当前时间的价格
-        current_price = open_price
-        if minute_prices:
-            if is_trading_time:
-                # 交易时间内，使用当前时间对应的最新价格
-                for price_data in minute_prices:
-                    if price_data['time'] <= time_str:
-                        current_price = price_data['price']
-            else:
-                # 不在交易时间（如晚上8点），使用当天15:00的收盘价格
-                for price_data in minute_prices:
-                    if price_data['time'] <= "15:00":
-                        current_price = price_data['price']
+        is_trading_time = is_trading_minute(current_time)
+
+        # 从分钟索引中直接取出该时间的价格：
+        # 交易时间内为当前分钟价格，午休为11:30价格，其余非交易时间为15:00收盘价格
+        minute_index = minute_data_source.current()
+        row = minute_index.get_row(code)
+        if row is not None:
+            name = minute_index.names[row]
+            open_price = price_value(minute_index.open_prices[row])
+            base_price = price_value(minute_index.base_prices[row])
+            current_price = price_value(minute_index.prices[row, time_to_slot(current_time)])
+        else:
+            name = code
+            open_price = base_price = current_price = 50.0
 
         # 计算涨跌幅：
         # 始终使用：(最新价格 - 开盘价) / 开盘价 * 100
-        # 最新价格在交易时间内是当前时间价格，非交易时间是15:00收盘价
+        change_value = 0
+        change_percent = 0
         if open_price > 0:
             change_value = current_price - base_price
             change_percent = (current_price - open_price) / open_price * 100
@@ -187,7 +143,7 @@ def get_single_stock_price(stock_code, current_time=None):
 
         result = {
             'code': code,
-            'name': stock_data.get('name', code),
+            'name': name,
             'open': open_price,
             'close': current_price,
             'high': round(high, 2),
@@ -199,7 +155,8 @@ def get_single_stock_price(stock_code, current_time=None):
             'amount': int(current_price * 1000000)
         }
 
-        print(f"  {code}: 最新={result['close']:.2f} 涨跌幅={result['changePercent']:.2f}% (开盘价={open_price:.2f}, 昨收={base_price:.2f}, 交易中={is_trading_time})")
+        if VERBOSE_STOCK_LOG:
+            print(f"  {code}: 最新={result['close']:.2f} 涨跌幅={result['changePercent']:.2f}% (开盘价={open_price:.2f}, 昨收={base_price:.2f}, 交易中={is_trading_time})")
 
         return result
 
@@ -210,6 +167,98 @@ def get_single_stock_price(stock_code, current_time=None):
         return None
 
 
+# 按交易分钟合并的报价快照，同一分钟内每只股票只计算一次；分钟数据重新加载后快照失效
+price_snapshot = PriceSnapshot(get_single_stock_price, index_fn=minute_data_source.current)
+
+
+def read_local_holdings(fund_code):
+    """
+    读取本地持仓库，不访问上游
+    Returns:
+        (未过期的持仓或None, 本地最新一期记录或None)
+    """
+    with span('holdings.store'):
+        record = holdings_store.get_latest(fund_code)
+    if record is not None and holdings_store.is_fresh(record):
+        print(f"使用本地持仓数据: {fund_code} {record['quarter']}")
+        return record['holdings'], record
+    return None, record
+
+
+def fetch_fund_holdings(fund_code, record=None):
+    """请求AkShare获取基金最新一期持仓并回写本地；上游暂无数据时退回使用过期的本地记录 record"""
+    # 尝试获取当年数据，如果没有则获取前一年数据（经过持仓缓存）
+    with span('holdings.fetch'):
+        _, holdings_df = fetch_latest_holdings(fund_code)
+
+    if holdings_df is None or holdings_df.empty:
+        if record is not None:
+            print(f"上游暂无数据，使用过期的本地持仓数据: {fund_code} {record['quarter']}")
+            return record['holdings']
+        return []
+
+    print(f"获取到 {len(holdings_df)} 条持仓记录")
+    with span('holdings.normalize'):
+        quarter, holdings = normalize_holdings(holdings_df)
+    print(f"最新季度: {quarter}，转换后的持仓数据: {len(holdings)} 条")
+    holdings_store.put(fund_code, quarter, holdings)
+    return holdings
+
+
+def load_fund_holdings(fund_code):
+    """
+    获取基金最新一期持仓（本地持仓库读穿透）
+    本地数据未过期时直接返回；否则请求AkShare并回写本地；上游失败时退回使用过期的本地数据
+    """
+    holdings, record = read_local_holdings(fund_code)
+    if holdings is not None:
+        return holdings
+    return fetch_fund_holdings(fund_code, record)
+
+
+def get_stock_quotes(codes, now):
+    """批量获取股票报价，未找到的股票返回全0的默认值"""
+    prices = {}
+    with span('prices.resolve'):
+        for code in codes:
+            # 从本分钟的报价快照获取，同一分钟内其他请求已查询过的股票不再重复计算
+            stock_data = price_snapshot.get_quote(code, now)
+
+            if stock_data:
+                prices[code] = {
+                    'open': stock_data['open'],
+                    'close': stock_data['close'],
+                    'high': stock_data['high'],
+                    'low': stock_data['low'],
+                    'preClose': stock_data['preClose'],
+                    'changePercent': stock_data['changePercent'],
+                    'change': stock_data['change'],
+                    'volume': stock_data['volume'],
+                    'amount': stock_data['amount'],
+                    'pe': 0,  # stock_bid_ask_em不提供
+                    'pb': 0   # stock_bid_ask_em不提供
+                }
+            else:
+                # 未找到该股票，返回默认值
+                if VERBOSE_STOCK_LOG:
+                    print(f"  {code}: 未找到数据，使用默认值")
+                prices[code] = {
+                    'open': 0.0,
+                    'close': 0.0,
+                    'high': 0.0,
+                    'low': 0.0,
+                    'preClose': 0.0,
+                    'changePercent': 0.0,
+                    'change': 0.0,
+                    'volume': 0,
+                    'amount': 0,
+                    'pe': 0,
+                    'pb': 0
+                }
+
+    return prices
+
+
 @app.route('/api/fund/holdings')
 def get_fund_holdings():
     """获取基金持仓数据"""
@@ -224,98 +273,13 @@ def get_fund_holdings():
 
         print(f"查询基金持仓: {fund_code}")
 
-        # 获取当前年份和前一年
-        current_year = datetime.now().year
-
         try:
-            # 尝试获取当年数据，如果没有则获取前一年数据
-            holdings_df = None
-
-            for year in [str(current_year), str(current_year - 1), str(current_year - 2)]:
-                print(f"尝试获取 {year} 年持仓数据...")
-                try:
-                    holdings_df = ak.fund_portfolio_hold_em(symbol=fund_code, date=year)
-                    if holdings_df is not None and not holdings_df.empty:
-                        print(f"成功获取 {year} 年持仓数据，共 {len(holdings_df)} 条")
-                        break
-                    else:
-                        print(f"{year} 年数据为空")
-                except Exception as e:
-                    print(f"获取 {year} 年数据失败: {str(e)}")
-                    continue
+            holdings = load_fund_holdings(fund_code)
 
             # 检查是否获取到数据
-            if holdings_df is None or holdings_df.empty:
+            if not holdings:
                 print(f"基金 {fund_code} 暂无持仓数据")
-                return jsonify({
-                    'fundCode': fund_code,
-                    'holdings': []
-                })
-
-            print(f"获取到 {len(holdings_df)} 条持仓记录")
-            print(holdings_df.head())
-
-            # 获取最新一期和上一期的季度数据
-            latest_quarter_holdings = None
-            previous_quarter_holdings = None
-
-            if '季度' in holdings_df.columns:
-                # 获取所有季度并排序
-                quarters = sorted(holdings_df['季度'].unique())
-                print(f"共 {len(quarters)} 个季度的数据: {quarters}")
-
-                # 找出最新的季度和上一季度
-                if len(quarters) > 0:
-                    latest_quarter = quarters[-1]
-                    print(f"最新季度: {latest_quarter}")
-                    latest_quarter_holdings = holdings_df[holdings_df['季度'] == latest_quarter].copy()
-                    print(f"最新季度持仓数量: {len(latest_quarter_holdings)}")
-
-                if len(quarters) > 1:
-                    previous_quarter = quarters[-2]
-                    print(f"上一季度: {previous_quarter}")
-                    previous_quarter_holdings = holdings_df[holdings_df['季度'] == previous_quarter].copy()
-                    print(f"上一季度持仓数量: {len(previous_quarter_holdings)}")
-
-            # 如果没有最新季度数据，使用全部数据
-            if latest_quarter_holdings is None:
-                latest_quarter_holdings = holdings_df
-
-            # 创建上一季度的持仓占比字典（股票代码 -> 占净值比例）
-            prev_hold_percent_map = {}
-            if previous_quarter_holdings is not None:
-                for _, row in previous_quarter_holdings.iterrows():
-                    stock_code = str(row['股票代码']).zfill(6)
-                    prev_hold_percent_map[stock_code] = row['占净值比例'] if pd.notna(row['占净值比例']) else 0
-
-            # 转换为API需要的格式
-            holdings = []
-            for _, row in latest_quarter_holdings.iterrows():
-                stock_code = str(row['股票代码']).zfill(6)
-                market = get_stock_market_code(stock_code)
-                full_code = f"{stock_code}.{market}"
-
-                current_hold_percent = row['占净值比例'] if pd.notna(row['占净值比例']) else 0
-                prev_hold_percent = prev_hold_percent_map.get(stock_code, 0)
-
-                # 计算变化和是否新增
-                hold_percent_change = current_hold_percent - prev_hold_percent
-                is_new = stock_code not in prev_hold_percent_map
-
-                holdings.append({
-                    'stockCode': full_code,
-                    'stockName': row['股票名称'],
-                    'shares': row['持股数'] if pd.notna(row['持股数']) else 0,
-                    'costPrice': 0,  # AkShare不提供成本价，需要计算
-                    'holdPercent': current_hold_percent,
-                    'marketValue': row['持仓市值'] if pd.notna(row['持仓市值']) else 0,
-                    'quarter': row['季度'] if '季度' in row else '',
-                    'prevHoldPercent': prev_hold_percent,
-                    'holdPercentChange': hold_percent_change,
-                    'isNew': is_new
-                })
-
-            print(f"转换后的持仓数据: {len(holdings)} 条")
+
             return jsonify({
                 'fundCode': fund_code,
                 'holdings': holdings
@@ -342,51 +306,134 @@ def get_stock_prices():
 
         print(f"查询股票价格: {codes}")
 
-        prices = {}
+        return jsonify(get_stock_quotes(codes, market_clock.now()))
 
-        for code in codes:
-            # 解析股票代码（去除.XSHG或.XSHE后缀）
-            stock_code = code.replace('.XSHG', '').replace('.XSHE', '')
+    except Exception as e:
+        print(f"获取股票价格失败: {str(e)}")
+        return jsonify({'error': f'获取股票价格失败: {str(e)}'}), 500
 
-            # 首先尝试使用单个股票接口查询
-            stock_data = get_single_stock_price(code)
 
-            if stock_data:
-                prices[code] = {
-                    'open': stock_data['open'],
-                    'close': stock_data['close'],
-                    'high': stock_data['high'],
-                    'low': stock_data['low'],
-                    'preClose': stock_data['preClose'],
-                    'changePercent': stock_data['changePercent'],
-                    'change': stock_data['change'],
-                    'volume': stock_data['volume'],
-                    'amount': stock_data['amount'],
-                    'pe': 0,  # stock_bid_ask_em不提供
-                    'pb': 0   # stock_bid_ask_em不提供
-                }
-            else:
-                # 未找到该股票，返回默认值
-                print(f"  {code}: 未找到数据，使用默认值")
-                prices[code] = {
-                    'open': 0.0,
-                    'close': 0.0,
-                    'high': 0.0,
-                    'low': 0.0,
-                    'preClose': 0.0,
-                    'changePercent': 0.0,
-                    'change': 0.0,
-                    'volume': 0,
-                    'amount': 0,
-                    'pe': 0,
-                    'pb': 0
-                }
+def compute_funds_valuations(fund_codes, now):
+    """
+    批量估算多只基金的涨跌幅
+    各基金的持仓通过有界线程池并发加载（冷启动时上游请求并行而不是逐只串行），
+    所有基金持仓股票去重后每只只查询一次价格，再统一计算各基金的加权涨跌幅
+    Args:
+        fund_codes: 已补齐6位并去重的基金代码列表
+        now: 估算时间
+    Returns:
+        {'time': 'HH:MM', 'stockCount': n, 'valuations': {基金代码: 估值}}
+    """
+    # 在当前请求的上下文中执行，加载持仓的阶段耗时记入该请求的追踪
+    futures = {
+        fund_code: _holdings_executor.submit(copy_context().run, load_fund_holdings, fund_code)
+        for fund_code in fund_codes
+    }
+    fund_holdings = {}
+    errors = {}
+    for fund_code, future in futures.items():
+        try:
+            fund_holdings[fund_code] = future.result()
+        except Exception as e:
+            print(f"获取基金 {fund_code} 持仓失败: {str(e)}")
+            errors[fund_code] = str(e)
+
+    # 所有基金持仓股票的并集，每只股票只查询一次
+    stock_codes = list(dict.fromkeys(
+        holding['stockCode'] for holdings in fund_holdings.values() for holding in holdings
+    ))
+    stock_changes = {}
+    with span('prices.resolve'):
+        for code in stock_codes:
+            stock_data = price_snapshot.get_quote(code, now)
+            stock_changes[code] = stock_data['changePercent'] if stock_data else 0.0
+
+    with span('valuation.compute'):
+        fund_changes = compute_fund_changes(fund_holdings, stock_changes)
+
+    valuations = {}
+    for fund_code in fund_codes:
+        if fund_code in errors:
+            valuations[fund_code] = {'fundCode': fund_code, 'error': f'获取基金持仓失败: {errors[fund_code]}'}
+            continue
+
+        estimated_change, total_market_value = fund_changes[fund_code]
+        valuations[fund_code] = {
+            'fundCode': fund_code,
+            'estimatedChangePercent': round(estimated_change, 2),
+            'totalMarketValue': round(total_market_value, 2),
+            'totalChangeValue': round(total_market_value * estimated_change / 100, 2),
+            'holdingCount': len(fund_holdings[fund_code])
+        }
+
+    return {
+        'time': now.strftime('%H:%M'),
+        'stockCount': len(stock_codes),
+        'valuations': valuations
+    }
+
+
+def parse_fund_codes(fund_codes):
+    """格式化基金代码为6位并去重（保持请求顺序）"""
+    return list(dict.fromkeys(str(code).strip().zfill(6) for code in fund_codes if str(code).strip()))
+
+
+# 估值推送：所有订阅者共享一个生产者线程，每个交易分钟只计算一次
+valuation_broadcaster = ValuationBroadcaster(
+    compute_funds_valuations, clock=market_clock.now, next_minute=market_clock.seconds_until_next_minute
+)
+# 回放时钟步进或切换模式时立即推送新时间的估值
+market_clock.add_listener(valuation_broadcaster.wake)
+
+
+@app.route('/api/funds/valuations', methods=['POST'])
+def get_funds_valuations():
+    """批量估算多只基金的涨跌幅"""
+    try:
+        data = request.get_json(silent=True) or {}
+        fund_codes = data.get('fundCodes', [])
+
+        if not fund_codes or not isinstance(fund_codes, list):
+            return jsonify({'error': '基金代码列表不能为空'}), 400
+
+        fund_codes = parse_fund_codes(fund_codes)
+        if len(fund_codes) > VALUATION_STREAM_MAX_FUNDS:
+            return jsonify({'error': f'单次最多估算 {VALUATION_STREAM_MAX_FUNDS} 只基金'}), 400
+        print(f"批量估算基金: {fund_codes}")
 
-        return jsonify(prices)
+        return jsonify(compute_funds_valuations(fund_codes, market_clock.now()))
 
     except Exception as e:
-        print(f"获取股票价格失败: {str(e)}")
-        return jsonify({'error': f'获取股票价格失败: {str(e)}'}), 500
+        print(f"批量估算基金失败: {str(e)}")
+        return jsonify({'error': f'批量估算基金失败: {str(e)}'}), 500
+
+
+@app.route('/api/funds/valuations/stream')
+def stream_funds_valuations():
+    """
+    订阅基金估值推送（Server-Sent Events）
+    fundCodes=005550,000001，每个交易分钟每只基金推送一次估值，非交易时间只推送一次
+    """
+    fund_codes = parse_fund_codes(request.args.get('fundCodes', '').split(','))
+    if not fund_codes:
+        return jsonify({'error': '基金代码列表不能为空'}), 400
+    if len(fund_codes) > VALUATION_STREAM_MAX_FUNDS:
+        return jsonify({'error': f'单个订阅最多 {VALUATION_STREAM_MAX_FUNDS} 只基金'}), 400
+
+    print(f"订阅基金估值推送: {fund_codes}")
+    subscriber = valuation_broadcaster.subscribe(fund_codes)
+    if subscriber is None:
+        response = jsonify({'error': '估值推送连接数已满，请稍后重试'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    response = Response(
+        subscriber.events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # 生成器尚未开始迭代就被关闭时 events() 中的 finally 不会执行，连接关闭时再取消一次订阅
+    response.call_on_close(lambda: valuation_broadcaster.unsubscribe(subscriber))
+    return response
 
 
 @app.route('/api/health')
@@ -394,107 +441,191 @@ def health():
     return jsonify({'status': 'ok'})
 
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    """缓存命中统计"""
+    return jsonify({
+        'holdings': holdings_cache.stats(),
+        'holdingsStore': holdings_store.stats(),
+        'priceSnapshot': price_snapshot.stats(),
+        'valuationCurves': valuation_curve_store.stats(),
+        'valuationStream': valuation_broadcaster.stats(),
+        'minuteData': minute_data_source.stats(),
+        'marketClock': market_clock.stats(),
+        'fundDataSource': source_stats(fund_data_source)
+    })
+
+
+def collect_cache_metrics():
+    """把各缓存的 stats() 转为指标：查找次数按结果分类、命中率、估值曲线的增量计算量"""
+    holdings = holdings_cache.stats()
+    store = holdings_store.stats()
+    snapshot = price_snapshot.stats()
+    curves = valuation_curve_store.stats()
+    stream = valuation_broadcaster.stats()
+    store_lookups = store['hits'] + store['staleHits'] + store['misses']
+
+    return [
+        ('fund_cache_lookups_total', 'counter', '缓存查找次数', [
+            ({'cache': 'holdings', 'result': 'hit'}, holdings['hits'] - holdings['negativeHits']),
+            ({'cache': 'holdings', 'result': 'negative_hit'}, holdings['negativeHits']),
+            ({'cache': 'holdings', 'result': 'miss'}, holdings['misses']),
+            ({'cache': 'holdings_store', 'result': 'hit'}, store['hits']),
+            ({'cache': 'holdings_store', 'result': 'stale_hit'}, store['staleHits']),
+            ({'cache': 'holdings_store', 'result': 'miss'}, store['misses']),
+            ({'cache': 'price_snapshot', 'result': 'hit'}, snapshot['requestsServed'] - snapshot['quotesComputed']),
+            ({'cache': 'price_snapshot', 'result': 'miss'}, snapshot['quotesComputed']),
+        ]),
+        ('fund_cache_hit_ratio', 'gauge', '缓存命中率', [
+            ({'cache': 'holdings'}, holdings['hitRatio']),
+            ({'cache': 'holdings_store'}, round(store['hits'] / store_lookups, 4) if store_lookups else 0.0),
+            ({'cache': 'price_snapshot'}, snapshot['coalescingRatio']),
+        ]),
+        ('fund_cache_entries', 'gauge', '缓存条目数', [
+            ({'cache': 'holdings'}, holdings['size']),
+            ({'cache': 'holdings_store'}, store['funds']),
+            ({'cache': 'price_snapshot'}, snapshot['cachedQuotes']),
+            ({'cache': 'valuation_curve'}, curves['funds']),
+        ]),
+        ('fund_valuation_curve_requests_total', 'counter', '估值走势请求次数', [({}, curves['requests'])]),
+        ('fund_valuation_points_computed_total', 'counter', '实际计算的估值点数', [({}, curves['pointsComputed'])]),
+        ('fund_valuation_stream_subscribers', 'gauge', '估值推送订阅数', [({}, stream['subscribers'])]),
+    ]
+
+
+metrics_registry.add_collector(collect_cache_metrics)
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus 指标"""
+    if not METRICS_ENABLED:
+        return jsonify({'error': '未启用指标（METRICS_ENABLED=1）'}), 404
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/replay', methods=['GET'])
+def replay_status():
+    """市场时钟状态"""
+    return jsonify(market_clock.stats())
+
+
+@app.route('/api/replay', methods=['POST', 'DELETE'])
+def replay_control():
+    """
+    开始回放（POST {mode, date, start, speed}）或回到实时模式（DELETE）
+    需要设置 MARKET_REPLAY_CONTROL=1
+    """
+    if not MARKET_REPLAY_CONTROL:
+        return jsonify({'error': '未开放回放控制（MARKET_REPLAY_CONTROL=1）'}), 403
+
+    if request.method == 'DELETE':
+        market_clock.stop_replay()
+        return jsonify(market_clock.stats())
+
+    data = request.get_json(silent=True) or {}
+    try:
+        market_clock.start_replay(
+            data.get('mode', 'accelerated'),
+            data.get('date'),
+            data.get('start', '09:30'),
+            float(data.get('speed', MARKET_REPLAY_SPEED))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'回放参数错误: {str(e)}'}), 400
+    return jsonify(market_clock.stats())
+
+
+@app.route('/api/replay/step', methods=['POST'])
+def replay_step():
+    """步进回放：前进 minutes 个交易分钟（默认1）"""
+    if not MARKET_REPLAY_CONTROL:
+        return jsonify({'error': '未开放回放控制（MARKET_REPLAY_CONTROL=1）'}), 403
+
+    data = request.get_json(silent=True) or {}
+    minutes = data.get('minutes', 1)
+    if not isinstance(minutes, int) or minutes < 1:
+        return jsonify({'error': 'minutes应为正整数'}), 400
+    try:
+        market_clock.step(minutes)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(market_clock.stats())
+
+
+def valuation_end_slot(now):
+    """
+    估值走势的截止分钟：开盘时间内为当前分钟，否则为全天
+    回放模式下只到回放时钟所在的分钟：午休为11:30，开盘前没有数据（-1），不会提前返回尚未"发生"的价格
+    """
+    if market_clock.is_replaying():
+        if now.strftime('%H:%M') < TRADING_MINUTES[0]:
+            return -1
+        return time_to_slot(now)
+
+    current_hour = now.hour
+    current_minute = now.minute
+
+    # 开盘时间判断：
+    # 上午：9:30-11:30
+    # 下午：13:00-15:00
+    is_trading_time = (
+        (9 < current_hour < 11) or
+        (current_hour == 9 and current_minute >= 30) or
+        (current_hour == 11 and current_minute < 30) or
+        (13 <= current_hour < 15)
+    )
+
+    # 如果不在开盘时间，显示当天完整的走势（上午+下午）
+    if not is_trading_time:
+        print(f"当前不在开盘时间 ({now.strftime('%H:%M')})，显示全天完整走势")
+        return CLOSE_SLOT
+
+    # 在开盘时间内，显示从开盘到现在的走势
+    print(f"当前在开盘时间 ({now.strftime('%H:%M')})，显示从开盘到现在的走势")
+    return MINUTE_SLOT[now.strftime('%H:%M')]
+
+
 @app.route('/api/fund/valuation-history')
 def get_fund_valuation_history():
-    """获取基金估值历史走势（从开盘到当前）"""
+    """
+    获取基金估值历史走势（从开盘到当前）
+    可选参数 since=HH:MM：只返回该时间之后的估值点，供前端轮询时增量获取
+    """
     try:
         fund_code = request.args.get('fundCode')
+        since = request.args.get('since')
 
         if not fund_code:
             return jsonify({'error': '基金代码不能为空'}), 400
 
+        if since is not None:
+            try:
+                since = datetime.strptime(since, '%H:%M').strftime('%H:%M')
+            except ValueError:
+                return jsonify({'error': 'since格式应为HH:MM'}), 400
+
         # 格式化基金代码为6位
         fund_code = fund_code.zfill(6)
 
         print(f"查询基金估值历史: {fund_code}")
 
-        # 先获取持仓数据
-        holdings_result = None
-        current_year = datetime.now().year
+        # 先获取持仓数据（最新一期）
+        holdings = load_fund_holdings(fund_code)
 
-        for year in [str(current_year), str(current_year - 1), str(current_year - 2)]:
-            try:
-                holdings_df = ak.fund_portfolio_hold_em(symbol=fund_code, date=year)
-                if holdings_df is not None and not holdings_df.empty:
-                    # 获取最新季度数据
-                    if '季度' in holdings_df.columns:
-                        quarters = sorted(holdings_df['季度'].unique())
-                        if len(quarters) > 0:
-                            latest_quarter = quarters[-1]
-                            holdings_df = holdings_df[holdings_df['季度'] == latest_quarter]
-                    holdings_result = holdings_df
-                    break
-            except Exception as e:
-                print(f"获取 {year} 年数据失败: {str(e)}")
-                continue
-
-        if holdings_result is None or holdings_result.empty:
+        if not holdings:
             return jsonify({'error': '暂无持仓数据'}), 400
 
-        # 解析持仓
-        holdings = []
-        for _, row in holdings_result.iterrows():
-            stock_code = str(row['股票代码']).zfill(6)
-            market = get_stock_market_code(stock_code)
-            full_code = f"{stock_code}.{market}"
-
-            holdings.append({
-                'stockCode': full_code,
-                'stockName': row['股票名称'],
-                'marketValue': row['持仓市值'] if pd.notna(row['持仓市值']) else 0,
-                'holdPercent': row['占净值比例'] if pd.notna(row['占净值比例']) else 0
-            })
-
-        # 判断当前是否在开盘时间内
-        now = datetime.now()
-        current_hour = now.hour
-        current_minute = now.minute
-
-        # 开盘时间判断：
-        # 上午：9:30-11:30
-        # 下午：13:00-15:00
-        is_trading_time = (
-            (9 < current_hour < 11) or
-            (current_hour == 9 and current_minute >= 30) or
-            (current_hour == 11 and current_minute < 30) or
-            (13 <= current_hour < 15)
-        )
+        now = market_clock.now()
+        end_slot = valuation_end_slot(now)
 
-        # 判断当前是上午还是下午
-        is_morning_session = (current_hour < 12)
-
-        # 如果不在开盘时间，显示当天完整的走势（上午+下午）
-        if not is_trading_time:
-            print(f"当前不在开盘时间 ({now.strftime('%H:%M')})，显示全天完整走势")
-            # 生成上午9:30-11:30和下午13:00-15:00的所有时间点
-            valuation_history = []
-            start_time_morning = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
-            end_time_morning = datetime.now().replace(hour=11, minute=30, second=0, microsecond=0)
-            start_time_afternoon = datetime.now().replace(hour=13, minute=0, second=0, microsecond=0)
-            end_time_afternoon = datetime.now().replace(hour=15, minute=0, second=0, microsecond=0)
-
-            # 生成上午数据
-            current_time = start_time_morning
-            while current_time <= end_time_morning:
-                valuation_history.extend(calculate_valuation_at_time(current_time, holdings))
-                current_time = current_time + timedelta(minutes=1)
-
-            # 生成下午数据
-            current_time = start_time_afternoon
-            while current_time <= end_time_afternoon:
-                valuation_history.extend(calculate_valuation_at_time(current_time, holdings))
-                current_time = current_time + timedelta(minutes=1)
-        else:
-            # 在开盘时间内，显示从开盘到现在的走势
-            print(f"当前在开盘时间 ({now.strftime('%H:%M')})，显示从开盘到现在的走势")
-            start_time = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
-            end_time = now
-
-            valuation_history = []
-            current_time = start_time
-            while current_time <= end_time:
-                valuation_history.extend(calculate_valuation_at_time(current_time, holdings))
-                current_time = current_time + timedelta(minutes=1)
+        # 已算过的分钟直接复用，只计算上次请求之后新增的分钟
+        with span('valuation.curve'):
+            valuation_history = valuation_curve_store.get_curve(
+                fund_code, holdings, minute_data_source.current(), now.date(), end_slot
+            )
+        if since is not None:
+            valuation_history = valuation_history[slots_after(since):]
 
         return jsonify({
             'fundCode': fund_code,
@@ -565,6 +696,32 @@ def test_fund_005550():
     return jsonify(test_data)
 
 
+def lookup_fund_name(fund_code):
+    """查询基金名称（雪球基金基本信息），未找到基金时返回None"""
+    fund_info = upstream_call(
+        'fund_individual_basic_info_xq', fund_data_source.fund_individual_basic_info_xq, fund_code
+    )
+
+    if fund_info is None or fund_info.empty:
+        return None
+
+    # 打印列名用于调试
+    print(f"返回的列名: {fund_info.columns.tolist()}")
+    print(f"返回的数据:\n{fund_info}")
+
+    # 获取基金名称
+    # DataFrame是转置格式，包含item和value两列
+    fund_name = ''
+
+    # 方法1：从item列查找"基金名称"对应的value
+    if 'item' in fund_info.columns and 'value' in fund_info.columns:
+        fund_name_row = fund_info[fund_info['item'] == '基金名称']
+        if not fund_name_row.empty:
+            fund_name = fund_name_row.iloc[0]['value']
+
+    return fund_name
+
+
 @app.route('/api/fund/name', methods=['GET'])
 def get_fund_name():
     """获取基金名称"""
@@ -574,30 +731,10 @@ def get_fund_name():
 
     try:
         print(f"查询基金名称: {fund_code}")
-        fund_info = ak.fund_individual_basic_info_xq(symbol=fund_code)
-        
-        if fund_info is None or fund_info.empty:
+        fund_name = lookup_fund_name(fund_code)
+        if fund_name is None:
             return jsonify({'error': '未找到基金信息'}), 404
-        
-        # 打印列名用于调试
-        print(f"返回的列名: {fund_info.columns.tolist()}")
-        print(f"返回的数据:\n{fund_info}")
-        
-        # 获取基金名称
-        # DataFrame是转置格式，包含item和value两列
-        fund_name = ''
-        
-        # 方法1：从item列查找"基金名称"对应的value
-        if 'item' in fund_info.columns and 'value' in fund_info.columns:
-            fund_name_row = fund_info[fund_info['item'] == '基金名称']
-            if not fund_name_row.empty:
-                fund_name = fund_name_row.iloc[0]['value']
-        
-        # 方法2：直接从原始JSON获取（如果有access）
-        if not fund_name and hasattr(fund_info, '_data'):
-            # 尝试其他获取方式
-            pass
-        
+
         print(f"基金名称: {fund_name}")
         return jsonify({
             'fundCode': fund_code,
@@ -0,0 +1,271 @@
+"""
+基金API服务的异步版本（ASGI，基于Quart）
+与 fund_api.py 提供相同的接口和返回格式，计算逻辑直接复用 fund_api.py 中的函数：
+- 阻塞的AkShare调用放到有界线程池中执行，事件循环本身不阻塞
+- 每个上游（持仓、基金名称）有各自的并发上限，一个上游变慢不会占满整个线程池
+- 上游调用超时（包括等待并发名额的时间）后直接返回504，不再让客户端一直等待
+- 本地持仓库命中时不占用上游的并发名额
+- 与 fund_api.py 相同的请求追踪（Server-Timing 响应头）和 /metrics 指标，线程池中的阶段耗时记入所属请求
+
+需要安装: pip install quart quart-cors hypercorn
+启动: hypercorn fund_api_async:app --bind 127.0.0.1:8001
+     或 python fund_api_async.py
+
+可通过环境变量配置：
+    ASYNC_EXECUTOR_WORKERS       执行阻塞调用的线程数，默认16
+    ASYNC_HOLDINGS_CONCURRENCY   同时进行的持仓查询数，默认8
+    ASYNC_FUND_NAME_CONCURRENCY  同时进行的基金名称查询数，默认4
+    ASYNC_UPSTREAM_TIMEOUT       单次上游调用的超时（秒），默认20
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+import os
+
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
+
+from fund_api import (
+    METRICS_ENABLED,
+    fetch_fund_holdings,
+    get_stock_quotes,
+    lookup_fund_name,
+    metrics_registry,
+    minute_data_source,
+    read_local_holdings,
+    valuation_end_slot,
+)
+from market_clock import market_clock
+from metrics import begin_request, end_request
+from valuation_curve_store import slots_after, valuation_curve_store
+
+ASYNC_EXECUTOR_WORKERS = int(os.environ.get('ASYNC_EXECUTOR_WORKERS', 16))
+ASYNC_HOLDINGS_CONCURRENCY = int(os.environ.get('ASYNC_HOLDINGS_CONCURRENCY', 8))
+ASYNC_FUND_NAME_CONCURRENCY = int(os.environ.get('ASYNC_FUND_NAME_CONCURRENCY', 4))
+ASYNC_UPSTREAM_TIMEOUT = float(os.environ.get('ASYNC_UPSTREAM_TIMEOUT', 20))
+
+app = cors(Quart(__name__))
+
+# 所有阻塞调用共用的有界线程池
+_executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_WORKERS, thread_name_prefix='async-upstream')
+
+# 每个上游各自的并发上限，在服务的事件循环启动后创建
+_upstream_limits = {}
+
+
+@app.before_serving
+async def create_upstream_limits():
+    _upstream_limits['holdings'] = asyncio.Semaphore(ASYNC_HOLDINGS_CONCURRENCY)
+    _upstream_limits['fundName'] = asyncio.Semaphore(ASYNC_FUND_NAME_CONCURRENCY)
+
+
+@app.before_request
+async def begin_trace():
+    if request.path != '/metrics':
+        g.metrics_trace = begin_request(f"{request.method} {request.path}")
+
+
+@app.after_request
+async def end_trace(response):
+    trace, token = g.pop('metrics_trace', (None, None))
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    timing = end_request(trace, token, endpoint, request.method, response.status_code)
+    if timing:
+        response.headers['Server-Timing'] = timing
+    return response
+
+
+class UpstreamTimeout(Exception):
+    """上游调用超时"""
+
+
+async def run_blocking(func, *args):
+    """在线程池中执行不访问上游的阻塞函数（在当前请求的上下文中执行，阶段耗时记入该请求的追踪）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, copy_context().run, func, *args)
+
+
+async def call_upstream(upstream, func, *args):
+    """
+    在线程池中执行一次上游调用，受该上游的并发上限和超时限制
+    超时从开始等待并发名额算起，上游持续卡住、名额被占满时后续请求同样在超时后返回504；
+    超时后请求立即返回，已经开始的线程仍会执行完毕，结果写入缓存供后续请求使用；
+    并发名额在线程真正结束时才归还，持续超时时同时进行的上游调用数也不会超过上限
+    """
+    limit = _upstream_limits[upstream]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ASYNC_UPSTREAM_TIMEOUT
+    try:
+        await asyncio.wait_for(limit.acquire(), timeout=ASYNC_UPSTREAM_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise UpstreamTimeout(f"{upstream} 上游 {ASYNC_UPSTREAM_TIMEOUT:g} 秒内没有空闲的并发名额")
+    try:
+        future = loop.run_in_executor(_executor, copy_context().run, func, *args)
+    except BaseException:
+        limit.release()
+        raise
+    future.add_done_callback(lambda _: limit.release())
+
+    try:
+        # shield: 超时（或客户端断开）只取消等待，不取消线程的结果，名额由上面的回调归还
+        return await asyncio.wait_for(asyncio.shield(future), timeout=max(0, deadline - loop.time()))
+    except asyncio.TimeoutError:
+        raise UpstreamTimeout(f"{upstream} 上游调用超过 {ASYNC_UPSTREAM_TIMEOUT:g} 秒未返回")
+
+
+async def load_fund_holdings(fund_code):
+    """获取基金最新一期持仓：先读本地持仓库（不占用上游名额），未命中或已过期才调用上游"""
+    holdings, record = await run_blocking(read_local_holdings, fund_code)
+    if holdings is not None:
+        return holdings
+    return await call_upstream('holdings', fetch_fund_holdings, fund_code, record)
+
+
+@app.errorhandler(UpstreamTimeout)
+async def handle_upstream_timeout(error):
+    print(f"上游调用超时: {str(error)}")
+    return jsonify({'error': str(error)}), 504
+
+
+@app.route('/api/fund/holdings')
+async def get_fund_holdings():
+    """获取基金持仓数据"""
+    fund_code = request.args.get('fundCode')
+    if not fund_code:
+        return jsonify({'error': '基金代码不能为空'}), 400
+
+    # 格式化基金代码为6位
+    fund_code = fund_code.zfill(6)
+    print(f"查询基金持仓: {fund_code}")
+
+    try:
+        holdings = await load_fund_holdings(fund_code)
+    except UpstreamTimeout:
+        raise
+    except Exception as e:
+        print(f"获取基金持仓失败: {str(e)}")
+        return jsonify({'error': f'获取基金持仓失败: {str(e)}'}), 500
+
+    if not holdings:
+        print(f"基金 {fund_code} 暂无持仓数据")
+
+    return jsonify({
+        'fundCode': fund_code,
+        'holdings': holdings
+    })
+
+
+@app.route('/api/stock/prices', methods=['POST'])
+async def get_stock_prices():
+    """获取股票实时价格"""
+    data = await request.get_json(silent=True) or {}
+    codes = data.get('codes', [])
+
+    if not codes or not isinstance(codes, list):
+        return jsonify({'error': '股票代码列表不能为空'}), 400
+
+    print(f"查询股票价格: {codes}")
+
+    try:
+        # 报价来自本地分钟数据，不访问上游，但同一分钟的快照可能需要等待其他请求计算完成
+        return jsonify(await run_blocking(get_stock_quotes, codes, market_clock.now()))
+    except Exception as e:
+        print(f"获取股票价格失败: {str(e)}")
+        return jsonify({'error': f'获取股票价格失败: {str(e)}'}), 500
+
+
+@app.route('/api/fund/valuation-history')
+async def get_fund_valuation_history():
+    """
+    获取基金估值历史走势（从开盘到当前）
+    可选参数 since=HH:MM：只返回该时间之后的估值点
+    """
+    fund_code = request.args.get('fundCode')
+    since = request.args.get('since')
+
+    if not fund_code:
+        return jsonify({'error': '基金代码不能为空'}), 400
+
+    if since is not None:
+        try:
+            since = datetime.strptime(since, '%H:%M').strftime('%H:%M')
+        except ValueError:
+            return jsonify({'error': 'since格式应为HH:MM'}), 400
+
+    # 格式化基金代码为6位
+    fund_code = fund_code.zfill(6)
+    print(f"查询基金估值历史: {fund_code}")
+
+    try:
+        holdings = await load_fund_holdings(fund_code)
+        if not holdings:
+            return jsonify({'error': '暂无持仓数据'}), 400
+
+        now = market_clock.now()
+        valuation_history = await run_blocking(
+            valuation_curve_store.get_curve,
+            fund_code, holdings, minute_data_source.current(), now.date(), valuation_end_slot(now)
+        )
+    except UpstreamTimeout:
+        raise
+    except Exception as e:
+        print(f"获取估值历史失败: {str(e)}")
+        return jsonify({'error': f'获取估值历史失败: {str(e)}'}), 500
+
+    if since is not None:
+        valuation_history = valuation_history[slots_after(since):]
+
+    return jsonify({
+        'fundCode': fund_code,
+        'valuationHistory': valuation_history
+    })
+
+
+@app.route('/api/fund/name', methods=['GET'])
+async def get_fund_name():
+    """获取基金名称"""
+    fund_code = request.args.get('fundCode')
+    if not fund_code:
+        return jsonify({'error': '缺少基金代码'}), 400
+
+    print(f"查询基金名称: {fund_code}")
+    try:
+        fund_name = await call_upstream('fundName', lookup_fund_name, fund_code)
+    except UpstreamTimeout:
+        raise
+    except Exception as e:
+        print(f"获取基金名称失败: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    if fund_name is None:
+        return jsonify({'error': '未找到基金信息'}), 404
+
+    print(f"基金名称: {fund_name}")
+    return jsonify({
+        'fundCode': fund_code,
+        'fundName': fund_name
+    })
+
+
+@app.route('/api/health')
+async def health():
+    return jsonify({'status': 'ok', 'mode': 'asgi'})
+
+
+@app.route('/metrics')
+async def metrics():
+    """Prometheus 指标"""
+    if not METRICS_ENABLED:
+        return jsonify({'error': '未启用指标（METRICS_ENABLED=1）'}), 404
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("启动基金API服务（异步版）...")
+    print("=" * 50)
+    print("服务地址: http://127.0.0.1:8001")
+    print("API文档: 请查看 backend/README.md")
+    print("=" * 50)
+    app.run(host='127.0.0.1', port=8001)
@@ -0,0 +1,247 @@
+"""
+基金数据源（上游适配层）
+后端对上游的调用（基金持仓 fund_portfolio_hold_em、基金基本信息 fund_individual_basic_info_xq）都经过 fund_data_source，
+数据源可以组合：
+- AkshareSource: 调用 akshare（导入推迟到第一次调用，回放时不需要安装和联网）
+- RecordingSource: 包装另一个数据源，把每次返回的DataFrame录制为JSON fixture
+- ReplaySource: 只从录制的 fixture 读取，不访问网络；未录制的调用抛出 FixtureNotFound
+- FaultInjectingSource: 包装另一个数据源，注入固定/随机耗时和失败，
+  是否失败、抖动多少由 (种子, 调用参数, 第几次调用) 决定，多线程下同样可复现
+
+可通过环境变量配置：
+    FUND_DATA_SOURCE        akshare（默认）、record（调用akshare并录制）或 replay（只用录制的数据）
+    FUND_DATA_FIXTURES      fixture 目录，默认 tests_and_examples/fixtures/akshare
+    FUND_DATA_LATENCY       每次调用注入的耗时（秒），默认0
+    FUND_DATA_JITTER        在注入耗时上叠加的随机耗时上限（秒），默认0
+    FUND_DATA_FAILURE_RATE  注入失败的比例（0~1），默认0
+    FUND_DATA_SEED          注入随机数的种子，默认0
+
+用法（录制 fixture）:
+    python fund_data_source.py 005550 000001    录制这些基金近三年的持仓和基金基本信息
+"""
+from datetime import datetime
+from io import StringIO
+import os
+import random
+import sys
+import threading
+import time
+
+import pandas as pd
+
+FUND_DATA_SOURCE = os.environ.get('FUND_DATA_SOURCE', 'akshare')
+FUND_DATA_FIXTURES = os.environ.get(
+    'FUND_DATA_FIXTURES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests_and_examples', 'fixtures', 'akshare')
+)
+FUND_DATA_LATENCY = float(os.environ.get('FUND_DATA_LATENCY', 0))
+FUND_DATA_JITTER = float(os.environ.get('FUND_DATA_JITTER', 0))
+FUND_DATA_FAILURE_RATE = float(os.environ.get('FUND_DATA_FAILURE_RATE', 0))
+FUND_DATA_SEED = int(os.environ.get('FUND_DATA_SEED', 0))
+
+
+class FixtureNotFound(LookupError):
+    """回放时请求了没有录制过的数据"""
+
+
+class InjectedFailure(ConnectionError):
+    """FaultInjectingSource 注入的上游失败"""
+
+
+def fixture_path(fixture_dir, method, **params):
+    """fixture 文件路径：{目录}/{接口名}/{参数值用_连接}.json"""
+    name = '_'.join(str(params[key]) for key in sorted(params))
+    return os.path.join(fixture_dir, method, f"{name}.json")
+
+
+def write_fixture(path, df):
+    """DataFrame 按 split 格式保存为JSON（保留列顺序，代码列保持字符串）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(df.to_json(orient='split', index=False, force_ascii=False, double_precision=15))
+    os.replace(tmp_path, path)
+
+
+def read_fixture(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return pd.read_json(StringIO(f.read()), orient='split', dtype=False, precise_float=True)
+
+
+class AkshareSource:
+    """直接调用 akshare"""
+
+    name = 'akshare'
+
+    def __init__(self):
+        self._ak = None
+
+    def _akshare(self):
+        if self._ak is None:
+            import akshare as ak
+            self._ak = ak
+        return self._ak
+
+    def fund_portfolio_hold_em(self, symbol, date):
+        return self._akshare().fund_portfolio_hold_em(symbol=symbol, date=date)
+
+    def fund_individual_basic_info_xq(self, symbol):
+        return self._akshare().fund_individual_basic_info_xq(symbol=symbol)
+
+
+class RecordingSource:
+    """调用内层数据源，并把结果录制到 fixture 目录（空结果也录制，回放时行为一致）"""
+
+    def __init__(self, inner, fixture_dir=FUND_DATA_FIXTURES):
+        self.inner = inner
+        self.fixture_dir = fixture_dir
+        self.name = f"record({inner.name})"
+        self.recorded = 0
+
+    def _record(self, method, df, **params):
+        if df is not None:
+            write_fixture(fixture_path(self.fixture_dir, method, **params), df)
+            self.recorded += 1
+        return df
+
+    def fund_portfolio_hold_em(self, symbol, date):
+        df = self.inner.fund_portfolio_hold_em(symbol, date)
+        return self._record('fund_portfolio_hold_em', df, symbol=symbol, date=date)
+
+    def fund_individual_basic_info_xq(self, symbol):
+        df = self.inner.fund_individual_basic_info_xq(symbol)
+        return self._record('fund_individual_basic_info_xq', df, symbol=symbol)
+
+
+class ReplaySource:
+    """只从录制的 fixture 读取"""
+
+    name = 'replay'
+
+    def __init__(self, fixture_dir=FUND_DATA_FIXTURES):
+        self.fixture_dir = fixture_dir
+
+    def _replay(self, method, **params):
+        path = fixture_path(self.fixture_dir, method, **params)
+        if not os.path.exists(path):
+            raise FixtureNotFound(f"没有录制 {method}({params})，请先用 FUND_DATA_SOURCE=record 录制")
+        return read_fixture(path)
+
+    def fund_portfolio_hold_em(self, symbol, date):
+        return self._replay('fund_portfolio_hold_em', symbol=symbol, date=date)
+
+    def fund_individual_basic_info_xq(self, symbol):
+        return self._replay('fund_individual_basic_info_xq', symbol=symbol)
+
+
+class FaultInjectingSource:
+    """在内层数据源的调用前注入耗时和失败"""
+
+    def __init__(self, inner, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, sleep=time.sleep):
+        self.inner = inner
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.name = f"{inner.name}+faults"
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._call_counts = {}
+
+        self.calls = 0
+        self.injected_failures = 0
+        self.injected_seconds = 0.0
+
+    def _inject(self, method, *args):
+        """同一组参数的第n次调用总是得到同样的耗时和成败，与线程调度无关"""
+        key = (method,) + args
+        with self._lock:
+            count = self._call_counts.get(key, 0)
+            self._call_counts[key] = count + 1
+            self.calls += 1
+
+        rng = random.Random(f"{self.seed}:{method}:{':'.join(map(str, args))}:{count}")
+        delay = self.latency + rng.uniform(0, self.jitter) if self.jitter else self.latency
+        fail = rng.random() < self.failure_rate
+        if delay > 0:
+            self._sleep(delay)
+
+        with self._lock:
+            self.injected_seconds += delay
+            if fail:
+                self.injected_failures += 1
+        if fail:
+            raise InjectedFailure(f"注入的上游失败: {method}{args}")
+
+    def fund_portfolio_hold_em(self, symbol, date):
+        self._inject('fund_portfolio_hold_em', symbol, date)
+        return self.inner.fund_portfolio_hold_em(symbol, date)
+
+    def fund_individual_basic_info_xq(self, symbol):
+        self._inject('fund_individual_basic_info_xq', symbol)
+        return self.inner.fund_individual_basic_info_xq(symbol)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'injectedFailures': self.injected_failures,
+                'injectedSeconds': round(self.injected_seconds, 2)
+            }
+
+
+def create_source(kind=FUND_DATA_SOURCE, fixture_dir=FUND_DATA_FIXTURES, latency=FUND_DATA_LATENCY,
+                  jitter=FUND_DATA_JITTER, failure_rate=FUND_DATA_FAILURE_RATE, seed=FUND_DATA_SEED):
+    """按配置组合数据源"""
+    if kind == 'akshare':
+        source = AkshareSource()
+    elif kind == 'record':
+        source = RecordingSource(AkshareSource(), fixture_dir)
+    elif kind == 'replay':
+        source = ReplaySource(fixture_dir)
+    else:
+        raise ValueError(f"未知的数据源: {kind}，可选 akshare、record、replay")
+
+    if latency > 0 or jitter > 0 or failure_rate > 0:
+        source = FaultInjectingSource(source, latency, jitter, failure_rate, seed)
+    return source
+
+
+def source_stats(source):
+    """数据源配置和注入统计，供 /api/cache/stats 展示"""
+    stats = {'source': source.name}
+    if isinstance(source, FaultInjectingSource):
+        stats.update({
+            'latency': source.latency,
+            'jitter': source.jitter,
+            'failureRate': source.failure_rate,
+            **source.stats()
+        })
+    return stats
+
+
+# 进程内共享的数据源
+fund_data_source = create_source()
+
+
+def record_funds(fund_codes, fixture_dir=FUND_DATA_FIXTURES):
+    """录制基金近三年的持仓和基金基本信息"""
+    recorder = RecordingSource(AkshareSource(), fixture_dir)
+    current_year = datetime.now().year
+    for fund_code in fund_codes:
+        for year in range(current_year, current_year - 3, -1):
+            try:
+                df = recorder.fund_portfolio_hold_em(fund_code, str(year))
+                print(f"已录制 {fund_code} {year} 年持仓: {len(df)} 条")
+            except Exception as e:
+                print(f"获取 {fund_code} {year} 年持仓失败（不录制）: {str(e)}")
+        try:
+            recorder.fund_individual_basic_info_xq(fund_code)
+            print(f"已录制 {fund_code} 基本信息")
+        except Exception as e:
+            print(f"获取 {fund_code} 基本信息失败（不录制）: {str(e)}")
+    print(f"共录制 {recorder.recorded} 个 fixture 到 {fixture_dir}")
+
+
+if __name__ == '__main__':
+    record_funds([code.zfill(6) for code in sys.argv[1:]])
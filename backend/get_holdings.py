@@ -2,99 +2,58 @@
 # -*- coding: utf-8 -*-
 """
 通过命令行获取基金持仓数据
+
+用法：
+    python get_holdings.py <基金代码>    查询一只基金后退出
+    python get_holdings.py --worker      常驻进程模式，按行读取JSON请求并按行输出JSON结果
+                                         请求: {"id": 1, "fundCode": "005550"}
+                                         响应: {"id": 1, "success": true, "fundCode": "005550", "holdings": [...]}
 """
 import sys
 import json
-import pandas as pd
-import akshare as ak
-from datetime import datetime
 import io
+import os
+
+from holdings_normalize import normalize_holdings
+from holdings_source import fetch_latest_holdings
+from holdings_store import holdings_store
 
 # 设置标准输出为UTF-8编码
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 def get_fund_holdings(fund_code):
-    """获取基金持仓数据"""
+    """获取基金持仓数据（优先使用本地持仓库）"""
     try:
-        # 获取当前年份
-        current_year = datetime.now().year
-        
-        # 尝试获取当年和前几年的数据
-        for year in [str(current_year), str(current_year - 1), str(current_year - 2)]:
-            try:
-                df = ak.fund_portfolio_hold_em(symbol=fund_code, date=year)
-                if df is not None and not df.empty:
-                    # 获取最新季度数据和上一季度数据
-                    latest_quarter_holdings = None
-                    previous_quarter_holdings = None
-                    
-                    if '季度' in df.columns:
-                        # 获取所有季度并排序
-                        quarters = sorted(df['季度'].unique())
-                        
-                        # 找出最新的季度和上一季度
-                        if len(quarters) > 0:
-                            latest_quarter = quarters[-1]
-                            latest_quarter_holdings = df[df['季度'] == latest_quarter].copy()
-                        
-                        if len(quarters) > 1:
-                            previous_quarter = quarters[-2]
-                            previous_quarter_holdings = df[df['季度'] == previous_quarter].copy()
-                    
-                    # 如果没有最新季度数据，使用全部数据
-                    if latest_quarter_holdings is None:
-                        latest_quarter_holdings = df
-                    
-                    # 创建上一季度的持仓占比字典（股票代码 -> 占净值比例）
-                    prev_hold_percent_map = {}
-                    if previous_quarter_holdings is not None:
-                        for _, row in previous_quarter_holdings.iterrows():
-                            stock_code = str(row['股票代码']).zfill(6)
-                            prev_hold_percent_map[stock_code] = row['占净值比例'] if pd.notna(row['占净值比例']) else 0
-                    
-                    # 转换为JSON格式
-                    holdings = []
-                    for _, row in latest_quarter_holdings.iterrows():
-                        stock_code = str(row['股票代码']).zfill(6)
-                        
-                        # 判断市场
-                        if stock_code.startswith('6'):
-                            market = 'XSHG'
-                        else:
-                            market = 'XSHE'
-                        
-                        current_hold_percent = row['占净值比例'] if pd.notna(row['占净值比例']) else 0
-                        prev_hold_percent = prev_hold_percent_map.get(stock_code, 0)
-                        
-                        # 计算变化和是否新增
-                        hold_percent_change = current_hold_percent - prev_hold_percent
-                        is_new = stock_code not in prev_hold_percent_map
-                        
-                        holdings.append({
-                            'stockCode': f"{stock_code}.{market}",
-                            'stockName': row['股票名称'],
-                            'shares': float(row['持股数']) if pd.notna(row['持股数']) else 0,
-                            'marketValue': float(row['持仓市值']) if pd.notna(row['持仓市值']) else 0,
-                            'holdPercent': current_hold_percent,
-                            'quarter': row['季度'] if '季度' in row else '',
-                            'prevHoldPercent': prev_hold_percent,
-                            'holdPercentChange': hold_percent_change,
-                            'isNew': is_new
-                        })
-                    
-                    return {
-                        'success': True,
-                        'fundCode': fund_code,
-                        'holdings': holdings
-                    }
-            except Exception as e:
-                continue
-        
-        # 如果所有年份都失败
+        # 本地持仓库中的数据未过期时直接返回
+        record = holdings_store.get_latest(fund_code)
+        if record is not None and holdings_store.is_fresh(record):
+            return {
+                'success': True,
+                'fundCode': fund_code,
+                'holdings': record['holdings']
+            }
+
+        # 当年、前一年、前两年并发请求，取最近一年的非空数据
+        _, holdings_df = fetch_latest_holdings(fund_code)
+
+        # 如果所有年份都失败，退回使用过期的本地数据
+        if holdings_df is None or holdings_df.empty:
+            return {
+                'success': True,
+                'fundCode': fund_code,
+                'holdings': record['holdings'] if record is not None else []
+            }
+
+        # 转换为JSON格式（最新一期持仓，并与上一期对比）
+        latest_quarter, holdings = normalize_holdings(holdings_df)
+
+        # 保存到本地持仓库，下次启动无需重新请求
+        holdings_store.put(fund_code, latest_quarter, holdings)
+
         return {
             'success': True,
             'fundCode': fund_code,
-            'holdings': []
+            'holdings': holdings
         }
     except Exception as e:
         return {
@@ -102,12 +61,58 @@ def get_fund_holdings(fund_code):
             'error': str(e)
         }
 
+def open_protocol_stream():
+    """
+    把原来的标准输出复制为专用的结果输出流，之后整个进程的标准输出（文件描述符1和sys.stdout）都指向标准错误：
+    请求结束后仍在运行的持仓请求线程、akshare或C扩展的输出都不会混入按行输出的JSON结果
+    """
+    sys.stdout.flush()
+    protocol_fd = os.dup(1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    return io.TextIOWrapper(os.fdopen(protocol_fd, 'wb'), encoding='utf-8')
+
+
+def run_worker():
+    """
+    常驻进程模式：避免每次请求都重新启动解释器、导入pandas和akshare
+    标准输出只用于返回结果，其他输出都转到标准错误
+    """
+    sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    out = open_protocol_stream()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            message = json.loads(line)
+            request_id = message.get('id')
+            fund_code = str(message.get('fundCode', '')).zfill(6)
+            if not message.get('fundCode'):
+                result = {'success': False, 'error': '缺少基金代码'}
+            else:
+                result = get_fund_holdings(fund_code)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        out.write(json.dumps({'id': request_id, **result}, ensure_ascii=False) + '\n')
+        out.flush()
+
 if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == '--worker':
+        run_worker()
+        sys.exit(0)
+
     if len(sys.argv) < 2:
         print(json.dumps({'success': False, 'error': '缺少基金代码'}))
         sys.exit(1)
     
     fund_code = sys.argv[1].zfill(6)
+    out = open_protocol_stream()
     result = get_fund_holdings(fund_code)
     # 输出JSON，确保不使用ASCII转义，只输出JSON不要有任何其他输出
-    print(json.dumps(result, ensure_ascii=False))
+    out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    out.flush()
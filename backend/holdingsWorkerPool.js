@@ -0,0 +1,138 @@
+const { spawn } = require('child_process')
+const path = require('path')
+const readline = require('readline')
+
+// 常驻的 get_holdings.py --worker 进程池
+// 每个进程只在启动时导入一次pandas和akshare，之后通过标准输入/输出按行收发JSON
+// 请求: {"id": 1, "fundCode": "005550"}  响应: {"id": 1, "success": true, "holdings": [...]}
+
+const SCRIPT_PATH = path.join(__dirname, 'get_holdings.py')
+const DEFAULT_POOL_SIZE = parseInt(process.env.HOLDINGS_WORKERS || '2', 10)
+const DEFAULT_TIMEOUT = parseInt(process.env.HOLDINGS_WORKER_TIMEOUT || '60000', 10)
+const PYTHON = process.env.PYTHON || 'python'
+
+class HoldingsWorker {
+  constructor(index) {
+    this.index = index
+    this.nextId = 1
+    this.pending = new Map()
+    this.alive = true
+
+    this.process = spawn(PYTHON, [SCRIPT_PATH, '--worker'], {
+      cwd: __dirname,
+      stdio: ['pipe', 'pipe', 'pipe']
+    })
+
+    readline.createInterface({ input: this.process.stdout }).on('line', line => this.handleLine(line))
+
+    // Python端的日志都输出到标准错误
+    this.process.stderr.on('data', data => {
+      console.error(`[holdings-worker ${this.index}] ${data.toString().trimEnd()}`)
+    })
+
+    this.process.on('exit', code => {
+      this.alive = false
+      console.error(`持仓worker ${this.index} 已退出，退出码: ${code}`)
+      this.failAll(new Error(`持仓worker已退出，退出码: ${code}`))
+    })
+
+    // 进程退出后继续写入会触发EPIPE，由exit事件统一处理
+    this.process.stdin.on('error', error => {
+      console.error(`持仓worker ${this.index} 写入失败:`, error.message)
+    })
+
+    this.process.on('error', error => {
+      this.alive = false
+      console.error(`持仓worker ${this.index} 启动失败:`, error.message)
+      this.failAll(error)
+    })
+  }
+
+  get busy() {
+    return this.pending.size
+  }
+
+  handleLine(line) {
+    let message
+    try {
+      message = JSON.parse(line)
+    } catch (error) {
+      console.error(`持仓worker ${this.index} 输出无法解析:`, line)
+      return
+    }
+
+    const entry = this.pending.get(message.id)
+    if (!entry) {
+      return
+    }
+    this.pending.delete(message.id)
+    clearTimeout(entry.timer)
+
+    const { id, ...result } = message
+    entry.resolve(result)
+  }
+
+  failAll(error) {
+    for (const entry of this.pending.values()) {
+      clearTimeout(entry.timer)
+      entry.reject(error)
+    }
+    this.pending.clear()
+  }
+
+  request(fundCode, timeout) {
+    return new Promise((resolve, reject) => {
+      const id = this.nextId++
+      const timer = setTimeout(() => {
+        this.pending.delete(id)
+        reject(new Error(`查询基金 ${fundCode} 持仓超时`))
+        // Python进程是单线程的，仍卡在这个请求上，后续请求都会排在它后面；
+        // 直接结束进程（排队中的请求随exit事件失败），由进程池重新拉起
+        this.kill(`查询基金 ${fundCode} 持仓超时`)
+      }, timeout)
+
+      this.pending.set(id, { resolve, reject, timer })
+      this.process.stdin.write(JSON.stringify({ id, fundCode }) + '\n')
+    })
+  }
+
+  kill(reason) {
+    if (!this.alive) {
+      return
+    }
+    this.alive = false
+    console.error(`持仓worker ${this.index} ${reason}，结束进程`)
+    this.process.kill()
+  }
+
+  close() {
+    this.alive = false
+    this.process.stdin.end()
+  }
+}
+
+class HoldingsWorkerPool {
+  constructor({ size = DEFAULT_POOL_SIZE, timeout = DEFAULT_TIMEOUT } = {}) {
+    this.timeout = timeout
+    this.workers = []
+    for (let i = 0; i < size; i++) {
+      this.workers.push(new HoldingsWorker(i))
+    }
+  }
+
+  // 选择待处理请求最少的worker，已退出的worker会被重新拉起
+  pickWorker() {
+    this.workers = this.workers.map((worker, i) => (worker.alive ? worker : new HoldingsWorker(i)))
+    return this.workers.reduce((best, worker) => (worker.busy < best.busy ? worker : best))
+  }
+
+  getFundHoldings(fundCode) {
+    return this.pickWorker().request(fundCode, this.timeout)
+  }
+
+  close() {
+    this.workers.forEach(worker => worker.close())
+  }
+}
+
+module.exports = { HoldingsWorkerPool }
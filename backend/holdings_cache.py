@@ -0,0 +1,167 @@
+"""
+基金持仓数据缓存（进程内共享，TTL + LRU）
+按 (基金代码, 年份) 缓存 ak.fund_portfolio_hold_em 的结果：
+- 季度持仓一年只变化四次，命中缓存时不再请求上游
+- 空结果（如一月份的当年数据）也会缓存，使用较短的TTL
+- 超过容量时淘汰最久未使用的条目
+- 同一 (基金代码, 年份) 同时未命中时只请求一次上游，其余请求等待并共用结果
+
+可通过环境变量配置：
+    HOLDINGS_CACHE_TTL        非空结果的有效期（秒），默认6小时
+    HOLDINGS_CACHE_EMPTY_TTL  空结果的有效期（秒），默认30分钟
+    HOLDINGS_CACHE_MAX_SIZE   最多缓存的条目数，默认2048
+"""
+from collections import OrderedDict
+import os
+import threading
+import time
+
+HOLDINGS_CACHE_TTL = float(os.environ.get('HOLDINGS_CACHE_TTL', 6 * 60 * 60))
+HOLDINGS_CACHE_EMPTY_TTL = float(os.environ.get('HOLDINGS_CACHE_EMPTY_TTL', 30 * 60))
+HOLDINGS_CACHE_MAX_SIZE = int(os.environ.get('HOLDINGS_CACHE_MAX_SIZE', 2048))
+
+
+def _is_empty(holdings_df):
+    return holdings_df is None or holdings_df.empty
+
+
+class _InFlight:
+    """一次正在进行的上游请求，等待方通过 event 得到它的结果或异常"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class HoldingsCache:
+    """线程安全的TTL + LRU缓存，键为 (基金代码, 年份)"""
+
+    def __init__(self, max_size=HOLDINGS_CACHE_MAX_SIZE, ttl=HOLDINGS_CACHE_TTL,
+                 empty_ttl=HOLDINGS_CACHE_EMPTY_TTL, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # (fund_code, year) -> (expires_at, holdings_df)
+        self._inflight = {}  # (fund_code, year) -> 正在请求上游时的 _InFlight
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced_waits = 0
+
+    def get(self, fund_code, year):
+        """
+        查询缓存
+        Returns:
+            (是否命中, 持仓DataFrame)，空结果命中时DataFrame可能为None或空
+        """
+        key = (fund_code, year)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, holdings_df = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if _is_empty(holdings_df):
+                self.negative_hits += 1
+            return True, holdings_df
+
+    def put(self, fund_code, year, holdings_df):
+        """写入缓存，空结果使用较短的有效期"""
+        ttl = self.empty_ttl if _is_empty(holdings_df) else self.ttl
+        if ttl <= 0:
+            return
+
+        key = (fund_code, year)
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, holdings_df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_fetch(self, fund_code, year, fetcher):
+        """
+        优先从缓存读取，未命中时调用fetcher获取并写入缓存
+        同一键同时未命中时只有第一个请求调用fetcher，其余请求等待并共用它的结果（包括抛出的异常）；
+        fetcher抛出的异常不会被缓存，下次请求会重试上游
+        """
+        hit, holdings_df = self.get(fund_code, year)
+        if hit:
+            return holdings_df
+
+        key = (fund_code, year)
+        with self._lock:
+            # 未命中之后、加锁之前其他请求可能已经写入
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                return entry[1]
+            flight = self._inflight.get(key)
+            is_owner = flight is None
+            if is_owner:
+                flight = self._inflight[key] = _InFlight()
+            else:
+                self.coalesced_waits += 1
+
+        if not is_owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fetcher()
+            self.put(fund_code, year, flight.result)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.result
+
+    def invalidate(self, fund_code=None):
+        """清除某只基金的缓存，不传基金代码时清空全部"""
+        with self._lock:
+            if fund_code is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == fund_code]:
+                del self._entries[key]
+
+    def stats(self):
+        """缓存命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxSize': self.max_size,
+                'ttl': self.ttl,
+                'emptyTtl': self.empty_ttl,
+                'hits': self.hits,
+                'negativeHits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'coalescedWaits': self.coalesced_waits,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# 进程内共享的持仓缓存
+holdings_cache = HoldingsCache()
@@ -0,0 +1,138 @@
+"""
+基金持仓数据标准化（列运算）
+将 ak.fund_portfolio_hold_em 返回的DataFrame转换为API使用的持仓列表：
+代码补齐6位、按交易所前缀表添加市场后缀（沪、深、北交所，含科创板和创业板）、缺失值填0、与上一季度合并计算占比变化和是否新增，
+全部用整列运算完成，不再逐行 iterrows
+"""
+import numpy as np
+import pandas as pd
+
+
+# 交易所代码前缀表：(代码前缀, 市场后缀, 板块)
+# 短前缀先写、长前缀后写，展开成三位前缀查找表时长前缀覆盖短前缀
+EXCHANGE_PREFIXES = [
+    # 上交所
+    ('5', 'XSHG', '沪市基金'),
+    ('60', 'XSHG', '沪市主板'),
+    ('688', 'XSHG', '科创板'),
+    ('689', 'XSHG', '科创板'),
+    ('900', 'XSHG', '沪市B股'),
+    # 深交所
+    ('00', 'XSHE', '深市主板'),
+    ('15', 'XSHE', '深市基金'),
+    ('16', 'XSHE', '深市基金'),
+    ('18', 'XSHE', '深市基金'),
+    ('200', 'XSHE', '深市B股'),
+    ('300', 'XSHE', '创业板'),
+    ('301', 'XSHE', '创业板'),
+    # 北交所
+    ('43', 'XBJE', '北交所'),
+    ('83', 'XBJE', '北交所'),
+    ('87', 'XBJE', '北交所'),
+    ('88', 'XBJE', '北交所'),
+    ('920', 'XBJE', '北交所'),
+]
+
+DEFAULT_MARKET = 'XSHE'
+# 市场后缀 -> 新浪/腾讯等行情接口使用的市场前缀
+MARKET_SYMBOL_PREFIXES = {'XSHG': 'sh', 'XSHE': 'sz', 'XBJE': 'bj'}
+DEFAULT_BOARD = '其他'
+
+
+def _build_prefix_tables():
+    """把前缀表展开为 三位前缀 -> 市场后缀 / 板块 的字典，只在导入时执行一次"""
+    markets = {}
+    boards = {}
+    for prefix, market, board in EXCHANGE_PREFIXES:
+        width = 3 - len(prefix)
+        for rest in range(10 ** width):
+            key = prefix + (f"{rest:0{width}d}" if width else '')
+            markets[key] = market
+            boards[key] = board
+    return markets, boards
+
+
+_MARKET_BY_PREFIX, _BOARD_BY_PREFIX = _build_prefix_tables()
+
+
+def get_stock_market_code(stock_code):
+    """将股票代码转换为市场代码（XSHG/XSHE/XBJE），未知前缀按深市处理"""
+    return _MARKET_BY_PREFIX.get(stock_code[:3], DEFAULT_MARKET)
+
+
+def get_stock_symbol(stock_code):
+    """行情接口使用的带市场前缀的代码，如 sh600000、sz000001、bj430047"""
+    return MARKET_SYMBOL_PREFIXES[get_stock_market_code(stock_code)] + stock_code
+
+
+def get_stock_board(stock_code):
+    """股票所属板块，如 沪市主板、科创板、创业板、北交所"""
+    return _BOARD_BY_PREFIX.get(stock_code[:3], DEFAULT_BOARD)
+
+
+def get_market_codes(stock_codes):
+    """get_stock_market_code 的整列版本，stock_codes 为已补齐6位的代码Series"""
+    return stock_codes.str[:3].map(_MARKET_BY_PREFIX).fillna(DEFAULT_MARKET).to_numpy()
+
+
+def _fill_zero(column):
+    return column.fillna(0).to_numpy()
+
+
+def normalize_holdings(holdings_df):
+    """
+    转换为API格式（最新一期持仓，并与上一期对比）
+    代码补齐和缺失值填充对整张表只做一次，上一季度通过一次哈希连接（get_indexer）合并
+    Returns:
+        (最新季度, 持仓列表)
+    """
+    codes = holdings_df['股票代码'].astype(str).str.zfill(6).to_numpy()
+    hold_percents = _fill_zero(holdings_df['占净值比例'])
+    has_quarter = '季度' in holdings_df.columns
+
+    # 找出最新的季度和上一季度
+    latest_quarter = ''
+    latest_mask = np.ones(len(holdings_df), dtype=bool)
+    previous_mask = None
+    if has_quarter:
+        quarter_column = holdings_df['季度'].to_numpy()
+        quarters = sorted(pd.unique(quarter_column))
+        if len(quarters) > 0:
+            latest_quarter = quarters[-1]
+            latest_mask = quarter_column == latest_quarter
+        if len(quarters) > 1:
+            previous_mask = quarter_column == quarters[-2]
+
+    latest_codes = codes[latest_mask]
+    latest_percents = hold_percents[latest_mask]
+
+    # 上一季度的持仓占比（股票代码 -> 占净值比例），同一代码出现多次时以最后一条为准
+    prev_percents = np.zeros(len(latest_codes))
+    is_new = np.ones(len(latest_codes), dtype=bool)
+    if previous_mask is not None:
+        prev_index = pd.Index(codes[previous_mask])
+        keep = ~prev_index.duplicated(keep='last')
+        positions = prev_index[keep].get_indexer(latest_codes)
+        is_new = positions < 0
+        prev_percents = np.where(is_new, 0, hold_percents[previous_mask][keep][positions])
+
+    markets = get_market_codes(pd.Series(latest_codes, dtype=object))
+    latest = holdings_df[latest_mask]
+    row_count = len(latest_codes)
+
+    # 按列组装，最后一次性转换为记录列表（tolist() 得到原生Python类型，可直接JSON序列化）
+    columns = {
+        'stockCode': [f"{code}.{market}" for code, market in zip(latest_codes.tolist(), markets.tolist())],
+        'stockName': latest['股票名称'].tolist(),
+        'shares': _fill_zero(latest['持股数']).tolist(),
+        'costPrice': [0] * row_count,  # AkShare不提供成本价，需要计算
+        'holdPercent': latest_percents.tolist(),
+        'marketValue': _fill_zero(latest['持仓市值']).tolist(),
+        'quarter': latest['季度'].tolist() if has_quarter else [''] * row_count,
+        'prevHoldPercent': prev_percents.tolist(),
+        'holdPercentChange': (latest_percents - prev_percents).tolist(),
+        'isNew': is_new.tolist()
+    }
+    keys = list(columns)
+    holdings = [dict(zip(keys, values)) for values in zip(*columns.values())]
+    return latest_quarter, holdings
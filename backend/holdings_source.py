@@ -0,0 +1,86 @@
+"""
+基金持仓数据获取
+所有对 fund_portfolio_hold_em 的调用都经过进程内缓存（上游由 fund_data_source 决定：akshare、录制或回放），
+多个年份并发请求，最坏耗时取决于最慢的单次请求而不是所有请求之和
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+import os
+
+from fund_data_source import fund_data_source
+from holdings_cache import holdings_cache
+from metrics import holdings_year_attempts, span, upstream_call
+
+HOLDINGS_FETCH_WORKERS = int(os.environ.get('HOLDINGS_FETCH_WORKERS', 8))
+
+
+def _create_executor():
+    return ThreadPoolExecutor(max_workers=HOLDINGS_FETCH_WORKERS, thread_name_prefix='holdings-fetch')
+
+
+# 进程内共享的持仓请求线程池
+_fetch_executor = _create_executor()
+
+
+def _reset_executor_after_fork():
+    """fork出的子进程（如gunicorn worker）不会继承父进程的线程，需要新建线程池"""
+    global _fetch_executor
+    _fetch_executor = _create_executor()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor_after_fork)
+
+
+def candidate_years():
+    """依次尝试的年份：当年、前一年、前两年"""
+    current_year = datetime.now().year
+    return [str(current_year), str(current_year - 1), str(current_year - 2)]
+
+
+def fetch_holdings_year(fund_code, year):
+    """获取基金某一年的持仓数据（带缓存）"""
+    return holdings_cache.get_or_fetch(
+        fund_code, year,
+        lambda: upstream_call('fund_portfolio_hold_em', fund_data_source.fund_portfolio_hold_em, fund_code, year)
+    )
+
+
+def fetch_latest_holdings(fund_code):
+    """
+    获取基金最近一年的持仓数据
+    当年、前一年、前两年同时请求，按年份从新到旧取第一个非空结果，其余未开始的请求直接取消
+    Returns:
+        (年份, 持仓DataFrame)，所有年份都没有数据时返回 (None, None)
+    """
+    years = candidate_years()
+    # 在请求的上下文中执行，上游调用的耗时记入该请求的追踪
+    futures = [
+        _fetch_executor.submit(copy_context().run, fetch_holdings_year, fund_code, year)
+        for year in years
+    ]
+
+    try:
+        for year, future in zip(years, futures):
+            print(f"尝试获取 {year} 年持仓数据...")
+            try:
+                with span('holdings.year', year=year):
+                    holdings_df = future.result()
+            except Exception as e:
+                holdings_year_attempts.inc('error')
+                print(f"获取 {year} 年数据失败: {str(e)}")
+                continue
+
+            if holdings_df is not None and not holdings_df.empty:
+                holdings_year_attempts.inc('data')
+                print(f"成功获取 {year} 年持仓数据，共 {len(holdings_df)} 条")
+                return year, holdings_df
+            holdings_year_attempts.inc('empty')
+            print(f"{year} 年数据为空")
+    finally:
+        # 已经得到结果后，更早年份的请求不再需要
+        for future in futures:
+            future.cancel()
+
+    return None, None
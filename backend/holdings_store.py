@@ -0,0 +1,180 @@
+"""
+基金持仓本地持久化存储（SQLite）
+按 (基金代码, 季度) 保存解析后的持仓列表，服务重启后不再重新请求所有基金的季度持仓：
+- 启动时预加载每只基金最新一期持仓到内存
+- 作为读穿透层：本地数据未过期时直接返回，过期或缺失时才请求上游并回写
+- 上游请求失败时可退回使用已过期的本地数据
+
+可通过环境变量配置：
+    HOLDINGS_STORE_PATH     数据库文件路径，默认 backend/holdings_store.db
+    HOLDINGS_STORE_MAX_AGE  本地数据的有效期（秒），默认24小时
+"""
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+HOLDINGS_STORE_PATH = os.environ.get(
+    'HOLDINGS_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'holdings_store.db')
+)
+HOLDINGS_STORE_MAX_AGE = float(os.environ.get('HOLDINGS_STORE_MAX_AGE', 24 * 60 * 60))
+
+
+def _to_builtin(value):
+    """将numpy标量转换为可JSON序列化的Python类型"""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"无法序列化类型: {type(value)}")
+
+
+class HoldingsStore:
+    """基金持仓的SQLite存储，内存中保留每只基金最新一期的持仓"""
+
+    def __init__(self, path=HOLDINGS_STORE_PATH, max_age=HOLDINGS_STORE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._latest = {}  # fund_code -> {'quarter', 'holdings', 'fetchedAt'}
+        self._lock = threading.Lock()
+        self._init_db()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @contextmanager
+    def _connect(self):
+        """打开数据库连接，事务结束后提交并关闭"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS fund_holdings (
+                    fund_code TEXT NOT NULL,
+                    quarter TEXT NOT NULL,
+                    holdings_json TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (fund_code, quarter)
+                )
+            ''')
+
+    def _remember(self, fund_code, record):
+        """内存中只保留最新一期（季度最大）的持仓"""
+        with self._lock:
+            current = self._latest.get(fund_code)
+            if current is None or record['quarter'] >= current['quarter']:
+                self._latest[fund_code] = record
+
+    def warm_load(self):
+        """启动时把所有基金最新一期的持仓加载到内存，返回加载的基金数量"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT fund_code, quarter, holdings_json, fetched_at FROM fund_holdings'
+            ).fetchall()
+
+        for fund_code, quarter, holdings_json, fetched_at in rows:
+            self._remember(fund_code, {
+                'quarter': quarter,
+                'holdings': json.loads(holdings_json),
+                'fetchedAt': fetched_at
+            })
+        return len(self._latest)
+
+    def _load_latest_from_db(self, fund_code):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT quarter, holdings_json, fetched_at FROM fund_holdings '
+                'WHERE fund_code = ? ORDER BY quarter DESC LIMIT 1',
+                (fund_code,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        record = {'quarter': row[0], 'holdings': json.loads(row[1]), 'fetchedAt': row[2]}
+        self._remember(fund_code, record)
+        return record
+
+    def recent_funds(self, limit):
+        """最近更新过持仓的基金代码（按更新时间从新到旧），用于启动预热"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT fund_code FROM fund_holdings GROUP BY fund_code '
+                'ORDER BY MAX(fetched_at) DESC LIMIT ?',
+                (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def latest_holdings(self):
+        """内存中所有基金最新一期的持仓 {基金代码: 持仓列表}"""
+        with self._lock:
+            return {fund_code: record['holdings'] for fund_code, record in self._latest.items()}
+
+    def is_fresh(self, record):
+        return time.time() - record['fetchedAt'] < self.max_age
+
+    def get_latest(self, fund_code):
+        """
+        获取基金最新一期持仓
+        内存中没有或已过期时会重新读取数据库（其他进程可能已经更新）
+        Returns:
+            {'quarter', 'holdings', 'fetchedAt'}，没有记录时返回None
+        """
+        record = self._latest.get(fund_code)
+        if record is None or not self.is_fresh(record):
+            record = self._load_latest_from_db(fund_code) or record
+
+        with self._lock:
+            if record is None:
+                self.misses += 1
+            elif self.is_fresh(record):
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+        return record
+
+    def put(self, fund_code, quarter, holdings):
+        """保存基金某一季度的持仓"""
+        record = {'quarter': quarter or '', 'holdings': holdings, 'fetchedAt': time.time()}
+        holdings_json = json.dumps(holdings, ensure_ascii=False, default=_to_builtin)
+
+        # 写入失败（如磁盘只读）不影响本次请求，仍保留在内存中
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO fund_holdings (fund_code, quarter, holdings_json, fetched_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    (fund_code, record['quarter'], holdings_json, record['fetchedAt'])
+                )
+            with self._lock:
+                self.writes += 1
+        except sqlite3.Error as e:
+            print(f"保存持仓数据失败: {str(e)}", file=sys.stderr)
+        self._remember(fund_code, record)
+
+    def stats(self):
+        """本地持仓库统计"""
+        with self._lock:
+            return {
+                'path': self.path,
+                'funds': len(self._latest),
+                'maxAge': self.max_age,
+                'hits': self.hits,
+                'staleHits': self.stale_hits,
+                'misses': self.misses,
+                'writes': self.writes
+            }
+
+
+# 进程内共享的持仓库
+holdings_store = HoldingsStore()
@@ -0,0 +1,176 @@
+"""
+市场时钟
+所有接口、报价快照和估值推送都通过 market_clock.now() 获取当前时间：
+- 实时模式（默认）：系统时间
+- 回放模式：从指定交易日的某个时间开始，沿242个交易分钟推进（跳过午休），到15:00停止
+    accelerated  按倍速推进，如60倍速时1秒对应1个交易分钟，一个完整交易日约4分钟回放完
+    stepped      只在调用 step()（或 POST /api/replay/step）时前进，便于逐分钟压测和调试
+
+加速回放以系统时间为基准计算，gunicorn 预加载后 fork 出的多个worker看到的时间一致；
+步进回放的状态在进程内，多worker时需要对每个进程分别步进（建议 SERVER_WORKERS=1）
+
+可通过环境变量配置：
+    MARKET_REPLAY_MODE     回放模式 accelerated 或 stepped，默认不回放
+    MARKET_REPLAY_DATE     回放的交易日 YYYY-MM-DD，默认当天
+    MARKET_REPLAY_START    回放开始时间 HH:MM，默认09:30
+    MARKET_REPLAY_SPEED    加速回放的倍速，默认60
+    MARKET_REPLAY_CONTROL  是否开放 /api/replay 控制接口（1开放），默认不开放
+"""
+from bisect import bisect_left
+from datetime import date, datetime
+import os
+import threading
+import time
+
+from minute_data import CLOSE_SLOT, TRADING_MINUTES
+
+MARKET_REPLAY_MODE = os.environ.get('MARKET_REPLAY_MODE', '')
+MARKET_REPLAY_DATE = os.environ.get('MARKET_REPLAY_DATE', '')
+MARKET_REPLAY_START = os.environ.get('MARKET_REPLAY_START', '09:30')
+MARKET_REPLAY_SPEED = float(os.environ.get('MARKET_REPLAY_SPEED', 60))
+MARKET_REPLAY_CONTROL = os.environ.get('MARKET_REPLAY_CONTROL', '0') == '1'
+
+REPLAY_MODES = ('accelerated', 'stepped')
+
+
+def parse_trade_date(value):
+    """YYYY-MM-DD -> date，空值为当天"""
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else date.today()
+
+
+def start_slot_of(time_str):
+    """回放开始时间对应的交易分钟，非交易时间从下一个交易分钟开始"""
+    time_str = datetime.strptime(time_str, '%H:%M').strftime('%H:%M')
+    return min(bisect_left(TRADING_MINUTES, time_str), CLOSE_SLOT)
+
+
+class MarketClock:
+    """可切换实时/回放的全局时钟，线程安全"""
+
+    def __init__(self, wall_clock=time.time):
+        """
+        Args:
+            wall_clock: 系统时间（秒），加速回放以它为基准，便于测试
+        """
+        self._wall_clock = wall_clock
+        self._lock = threading.Lock()
+        self._listeners = []
+
+        self.mode = 'live'
+        self.trade_date = None
+        self.speed = 0.0
+        self._start_position = 0.0  # 回放开始时的位置（交易分钟，可带小数）
+        self._started_at = 0.0      # 加速回放开始时的系统时间
+        self._position = 0.0        # 步进回放的当前位置
+        self.steps = 0
+
+    def add_listener(self, callback):
+        """时间跳变（开始/停止回放、步进）时回调，如唤醒估值推送线程"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            callback()
+
+    def _current_position(self):
+        if self.mode == 'accelerated':
+            elapsed_minutes = (self._wall_clock() - self._started_at) * self.speed / 60
+            return min(self._start_position + elapsed_minutes, CLOSE_SLOT)
+        return self._position
+
+    def is_replaying(self):
+        """是否处于回放模式"""
+        with self._lock:
+            return self.mode != 'live'
+
+    def now(self):
+        """当前时间：实时模式为系统时间，回放模式为回放交易日中的时间"""
+        with self._lock:
+            if self.mode == 'live':
+                return datetime.now()
+            position = self._current_position()
+            trade_date = self.trade_date
+
+        slot = int(position)
+        hour, minute = TRADING_MINUTES[slot].split(':')
+        seconds = 0 if slot == CLOSE_SLOT else int((position - slot) * 60)
+        return datetime(trade_date.year, trade_date.month, trade_date.day, int(hour), int(minute), seconds)
+
+    def start_replay(self, mode='accelerated', trade_date=None, start='09:30', speed=MARKET_REPLAY_SPEED):
+        """
+        开始回放
+        Args:
+            mode: accelerated 或 stepped
+            trade_date: 交易日（date 或 YYYY-MM-DD），默认当天
+            start: 开始时间 HH:MM
+            speed: 加速回放的倍速
+        """
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"回放模式应为 {' 或 '.join(REPLAY_MODES)}")
+        if mode == 'accelerated' and speed <= 0:
+            raise ValueError("加速回放的倍速必须大于0")
+        if not isinstance(trade_date, date):
+            trade_date = parse_trade_date(trade_date)
+        start_slot = start_slot_of(start)
+
+        with self._lock:
+            self.mode = mode
+            self.trade_date = trade_date
+            self.speed = float(speed) if mode == 'accelerated' else 0.0
+            self._start_position = self._position = float(start_slot)
+            self._started_at = self._wall_clock()
+            self.steps = 0
+        print(f"开始回放 {trade_date} {TRADING_MINUTES[start_slot]}（{mode}"
+              f"{f'，{self.speed:g}倍速' if mode == 'accelerated' else ''}）")
+        self._notify()
+
+    def stop_replay(self):
+        """回到实时模式"""
+        with self._lock:
+            self.mode = 'live'
+        print("停止回放，使用系统时间")
+        self._notify()
+
+    def step(self, minutes=1):
+        """步进回放：前进指定的交易分钟数，返回新的时间"""
+        with self._lock:
+            if self.mode != 'stepped':
+                raise ValueError("只有步进回放模式可以步进")
+            self._position = min(float(int(self._position) + minutes), CLOSE_SLOT)
+            self.steps += 1
+        self._notify()
+        return self.now()
+
+    def seconds_until_next_minute(self):
+        """
+        距离下一个（回放）分钟的系统秒数，供按分钟工作的后台线程等待
+        步进回放返回None：时间只在步进时变化，由 add_listener 的回调唤醒
+        """
+        with self._lock:
+            if self.mode == 'live':
+                return 60 - time.time() % 60
+            if self.mode == 'stepped':
+                return None
+            position = self._current_position()
+            if position >= CLOSE_SLOT:
+                return None
+            return (1 - (position - int(position))) * 60 / self.speed
+
+    def stats(self):
+        """时钟状态"""
+        now = self.now()
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'now': now.strftime('%Y-%m-%d %H:%M:%S'),
+                'tradeDate': self.trade_date.isoformat() if self.mode != 'live' else None,
+                'speed': self.speed if self.mode == 'accelerated' else None,
+                'steps': self.steps if self.mode == 'stepped' else None,
+                'finished': self.mode != 'live' and self._current_position() >= CLOSE_SLOT
+            }
+
+
+market_clock = MarketClock()
+
+if MARKET_REPLAY_MODE:
+    market_clock.start_replay(MARKET_REPLAY_MODE, MARKET_REPLAY_DATE, MARKET_REPLAY_START, MARKET_REPLAY_SPEED)
@@ -0,0 +1,307 @@
+"""
+请求追踪与指标
+- span('holdings.fetch'): 记录一段代码的耗时，写入耗时直方图；在请求中执行时同时记入该请求的追踪
+- 每个请求一条追踪（contextvars，线程和协程各自独立），请求结束时记录请求耗时，
+  并通过 Server-Timing 响应头返回各阶段耗时；超过 TRACE_SLOW_REQUEST_MS 的请求把追踪以一行JSON打印
+- upstream_call(): 上游调用的耗时和按异常类型统计的错误数
+- metrics_registry.render(): Prometheus 文本格式，供 /metrics 抓取
+  缓存命中率等已有统计通过 add_collector 在抓取时读取，不在请求路径上重复计数
+
+指标在进程内统计，gunicorn 多worker时每个worker分别统计（Prometheus按实例抓取后汇总）
+
+可通过环境变量配置：
+    METRICS_ENABLED        是否记录指标和追踪（1记录），默认1
+    TRACE_SLOW_REQUEST_MS  打印耗时超过该值（毫秒）的请求追踪，默认0（不打印）
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+import json
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+TRACE_SLOW_REQUEST_MS = float(os.environ.get('TRACE_SLOW_REQUEST_MS', 0))
+
+# 耗时直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """只增不减的计数，按标签值分别计数"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, tuple(zip(self.labelnames, labels)), value) for labels, value in sorted(values.items())]
+
+
+class Histogram:
+    """固定桶的直方图（累计计数、总和、次数），按标签值分别统计"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # 标签值 -> [各桶计数(最后一个为+Inf), 总和]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series_items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+
+        samples = []
+        for labels, (counts, total) in series_items:
+            label_pairs = tuple(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", label_pairs + (('le', _format_value(float(bound))),), cumulative))
+            samples.append((f"{self.name}_sum", label_pairs, round(total, 6)))
+            samples.append((f"{self.name}_count", label_pairs, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """进程内的指标集合"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """
+        抓取时调用 collect()，返回 [(指标名, 类型, 说明, [(标签dict, 值)])]，
+        用于把缓存等模块已有的 stats() 转为指标
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"收集指标失败: {str(e)}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
+
+request_seconds = metrics_registry.histogram(
+    'fund_api_request_seconds', '请求耗时（秒）', ('endpoint', 'method', 'status')
+)
+span_seconds = metrics_registry.histogram(
+    'fund_api_span_seconds', '请求内各阶段耗时（秒）', ('span',)
+)
+upstream_seconds = metrics_registry.histogram(
+    'fund_upstream_seconds', '上游调用耗时（秒）', ('method',)
+)
+upstream_errors = metrics_registry.counter(
+    'fund_upstream_errors_total', '上游调用失败次数', ('method', 'error')
+)
+holdings_year_attempts = metrics_registry.counter(
+    'fund_holdings_year_attempts_total', '按年份依次尝试持仓数据的结果', ('result',)
+)
+
+
+class RequestTrace:
+    """一个请求内记录的各阶段耗时"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing 响应头：同名阶段的耗时合并"""
+        totals = {}
+        for name, _, _, duration, _ in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration
+        return ', '.join(f"{name};dur={duration * 1000:.1f}" for name, duration in totals.items())
+
+    def to_dict(self, status=None):
+        return {
+            'trace': self.name,
+            'status': status,
+            'durationMs': round(self.elapsed() * 1000, 2),
+            'spans': [
+                {'name': name, 'depth': depth, 'startMs': round(start * 1000, 2),
+                 'durationMs': round(duration * 1000, 2), **attrs}
+                for name, depth, start, duration, attrs in self.spans
+            ]
+        }
+
+
+_current_trace = ContextVar('current_trace', default=None)
+_span_depth = ContextVar('span_depth', default=0)
+
+
+class span:
+    """
+    记录一段代码的耗时
+    用法: with span('holdings.year', year='2025'): ...
+    """
+
+    __slots__ = ('name', 'attrs', '_started', '_depth_token')
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        if METRICS_ENABLED:
+            self._depth_token = _span_depth.set(_span_depth.get() + 1)
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not METRICS_ENABLED:
+            return False
+        finished = time.perf_counter()
+        duration = finished - self._started
+        _span_depth.reset(self._depth_token)
+        span_seconds.observe(duration, self.name)
+
+        trace = _current_trace.get()
+        if trace is not None:
+            attrs = dict(self.attrs, error=exc_type.__name__) if exc_type else self.attrs
+            trace.spans.append((self.name, _span_depth.get(), self._started - trace.started, duration, attrs))
+        return False
+
+
+def upstream_call(method, func, *args, **kwargs):
+    """调用上游并记录耗时；失败按异常类型计数后原样抛出"""
+    started = time.perf_counter()
+    try:
+        with span(f"upstream.{method}"):
+            return func(*args, **kwargs)
+    except Exception as e:
+        upstream_errors.inc(method, type(e).__name__)
+        raise
+    finally:
+        upstream_seconds.observe(time.perf_counter() - started, method)
+
+
+def begin_request(name):
+    """开始一个请求的追踪，返回 (追踪, token)；未启用指标时返回 (None, None)"""
+    if not METRICS_ENABLED:
+        return None, None
+    trace = RequestTrace(name)
+    return trace, _current_trace.set(trace)
+
+
+def end_request(trace, token, endpoint, method, status):
+    """结束请求的追踪：记录请求耗时，慢请求打印追踪，返回 Server-Timing 响应头（未启用时为None）"""
+    if trace is None:
+        return None
+    _current_trace.reset(token)
+    elapsed = trace.elapsed()
+    request_seconds.observe(elapsed, endpoint, method, str(status))
+    if TRACE_SLOW_REQUEST_MS and elapsed * 1000 >= TRACE_SLOW_REQUEST_MS:
+        print(json.dumps(trace.to_dict(status), ensure_ascii=False))
+    return ', '.join(filter(None, [f"total;dur={elapsed * 1000:.1f}", trace.server_timing()]))
+
+
+def instrument_flask(app, skip_paths=('/metrics',)):
+    """为 Flask 应用的每个请求建立追踪"""
+    from flask import g, request
+
+    @app.before_request
+    def _begin_trace():
+        if request.path in skip_paths:
+            return
+        g.metrics_trace = begin_request(f"{request.method} {request.path}")
+
+    @app.after_request
+    def _end_trace(response):
+        trace, token = g.pop('metrics_trace', (None, None))
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        timing = end_request(trace, token, endpoint, request.method, response.status_code)
+        if timing:
+            response.headers['Server-Timing'] = timing
+        return response
+
+    @app.teardown_request
+    def _discard_trace(error=None):
+        # 视图抛出未处理的异常时不会执行 after_request，这里按500结束追踪
+        trace, token = g.pop('metrics_trace', (None, None))
+        if trace is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            end_request(trace, token, endpoint, request.method, 500)
@@ -0,0 +1,377 @@
+"""
+股票分钟级数据索引
+加载时把每只股票的 minute_prices 对齐成按交易分钟偏移 (0..241) 下标的价格数组，
+并提供 datetime -> 分钟偏移 的O(1)映射，查询价格时不再线性扫描
+
+除JSON外还支持紧凑的二进制格式（stock_minute_data.bin，由 convert_minute_data.py 生成），
+以内存映射方式打开，启动时无需解析JSON，多个进程共享同一份页缓存：
+    [0, 64)    文件头：魔数、版本、股票数、每日分钟数、代码索引的偏移和长度
+    [64, ...)  float32 小端数组：昨收价(n)、开盘价(n)、分钟价格(n × 242)，按行存放
+    索引偏移处  UTF-8 JSON：{"codes": [...], "names": [...]}，第i个代码对应第i行
+价格用float32存放：约7位有效数字，足以精确表示到分（ETF到厘）的行情价格，文件和页缓存比float64小一半；
+映射的数组保持float32，取出价格时（take()、price_value()）扩展为float64参与计算。
+版本1的float64文件仍可读取
+"""
+from bisect import bisect_left
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+# 分钟数据文件所在目录，默认为项目根目录，压测时可指向生成的模拟数据
+DATA_DIR = os.path.normpath(os.environ.get(
+    'MINUTE_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+))
+MINUTE_DATA_JSON_PATH = os.path.join(DATA_DIR, 'stock_minute_data.json')
+MINUTE_DATA_BIN_PATH = os.path.join(DATA_DIR, 'stock_minute_data.bin')
+# 检查分钟数据文件是否被更新的间隔（秒），0表示不自动重新加载
+MINUTE_DATA_RELOAD_INTERVAL = float(os.environ.get('MINUTE_DATA_RELOAD_INTERVAL', 5))
+
+
+def _build_trading_minutes():
+    """生成交易分钟序列：上午9:30-11:30 (121分钟) + 下午13:00-15:00 (121分钟)"""
+    times = []
+    for hour in range(9, 12):
+        for minute in range(0, 60):
+            if hour == 9 and minute < 30:
+                continue
+            if hour == 11 and minute > 30:
+                continue
+            times.append(f"{hour:02d}:{minute:02d}")
+    for hour in range(13, 16):
+        for minute in range(0, 60):
+            if hour == 15 and minute > 0:
+                break
+            times.append(f"{hour:02d}:{minute:02d}")
+    return times
+
+
+# 全天242个交易分钟，下标即分钟偏移（0=09:30, 120=11:30, 121=13:00, 241=15:00）
+TRADING_MINUTES = _build_trading_minutes()
+MINUTES_PER_DAY = len(TRADING_MINUTES)
+MINUTE_SLOT = {time_str: slot for slot, time_str in enumerate(TRADING_MINUTES)}
+MORNING_CLOSE_SLOT = MINUTE_SLOT['11:30']
+CLOSE_SLOT = MINUTES_PER_DAY - 1
+
+
+def _build_slot_table():
+    """
+    预计算一天1440分钟到交易分钟偏移的映射表
+    - 交易时间内：对应分钟的偏移
+    - 午休（11:31-12:59）：上午收盘11:30
+    - 收盘后及开盘前：当天15:00收盘价（与原先非交易时间的处理一致）
+    """
+    table = [CLOSE_SLOT] * (24 * 60)
+    for minute_of_day in range(24 * 60):
+        time_str = f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+        if time_str in MINUTE_SLOT:
+            table[minute_of_day] = MINUTE_SLOT[time_str]
+        elif "11:30" < time_str < "13:00":
+            table[minute_of_day] = MORNING_CLOSE_SLOT
+    return table
+
+
+_SLOT_TABLE = _build_slot_table()
+
+
+def time_to_slot(current_time):
+    """O(1) 获取指定时间对应的交易分钟偏移"""
+    return _SLOT_TABLE[current_time.hour * 60 + current_time.minute]
+
+
+def is_trading_minute(current_time):
+    """判断是否在开盘时间内（包含11:30和15:00作为收盘时刻）"""
+    return current_time.strftime('%H:%M') in MINUTE_SLOT
+
+
+def strip_market_suffix(stock_code):
+    """去除市场后缀，如 000001.XSHE -> 000001"""
+    return stock_code.replace('.XSHE', '').replace('.XSHG', '').replace('.XBJE', '')
+
+
+def align_minute_prices(minute_prices, open_price):
+    """
+    将 [{'time': 'HH:MM', 'price': x}, ...] 对齐到242个交易分钟
+    每个分钟取不晚于该分钟的最新价格，开盘前没有价格时使用开盘价
+    Returns:
+        长度为242的float64数组
+    """
+    row = np.full(MINUTES_PER_DAY, np.nan)
+    for price_data in sorted(minute_prices, key=lambda p: p['time']):
+        # 非交易分钟（如11:45）的价格从下一个交易分钟开始生效，15:00之后的忽略
+        slot = bisect_left(TRADING_MINUTES, price_data['time'])
+        if slot < MINUTES_PER_DAY:
+            row[slot] = price_data['price']
+
+    if np.isnan(row[0]):
+        row[0] = open_price
+
+    # 向前填充：缺失的分钟沿用上一个有价格的分钟
+    filled = np.where(np.isnan(row), 0, np.arange(MINUTES_PER_DAY))
+    np.maximum.accumulate(filled, out=filled)
+    return row[filled]
+
+
+# 行情价格的小数位数（股票到分，ETF到厘）
+PRICE_DECIMALS = 3
+
+
+def price_value(price):
+    """取出单个价格：扩展为float并按行情精度取整，去掉float32存放带来的尾差（如10.1读回为10.100000381）"""
+    return round(float(price), PRICE_DECIMALS)
+
+
+# 二进制格式的文件头
+BINARY_MAGIC = b'FVMINUTE'
+BINARY_VERSION = 2
+BINARY_HEADER = struct.Struct('<8sIIIIQQ')
+BINARY_HEADER_SIZE = 64
+BINARY_DTYPE = np.dtype('<f4')
+# 各版本的价格数组类型：版本1为float64
+BINARY_DTYPES = {1: np.dtype('<f8'), BINARY_VERSION: BINARY_DTYPE}
+
+
+class MinuteDataIndex:
+    """按股票行、交易分钟列存放的分钟价格索引"""
+
+    def __init__(self, codes, names, base_prices, open_prices, prices):
+        self.codes = list(codes)
+        self.names = list(names)
+        self.row_of = {code: row for row, code in enumerate(self.codes)}
+        self.base_prices = base_prices
+        self.open_prices = open_prices
+        # 形状 (股票数, 242)
+        self.prices = prices
+
+    @classmethod
+    def from_json_data(cls, data, default_price=100.0):
+        """由 stock_minute_data.json 的内容构建索引"""
+        codes = list(data.keys())
+        base_prices = np.empty(len(codes))
+        open_prices = np.empty(len(codes))
+        prices = np.empty((len(codes), MINUTES_PER_DAY))
+        index = cls(codes, [''] * len(codes), base_prices, open_prices, prices)
+        for row, code in enumerate(codes):
+            index.set_stock(row, data[code], default_price)
+        return index
+
+    def set_stock(self, row, stock_data, default_price=100.0):
+        """用 stock_minute_data.json 中一只股票的内容覆盖第 row 行（只用于内存中构建的索引）"""
+        open_price = stock_data.get('open_price', stock_data.get('base_price', default_price))
+        self.open_prices[row] = open_price
+        self.base_prices[row] = stock_data.get('base_price', open_price)
+        self.prices[row] = align_minute_prices(stock_data.get('minute_prices', []), open_price)
+        self.names[row] = stock_data.get('name', self.codes[row])
+
+    @classmethod
+    def from_binary(cls, path):
+        """以内存映射方式打开二进制分钟数据，价格矩阵只在访问时按页读入"""
+        with open(path, 'rb') as f:
+            header = f.read(BINARY_HEADER.size)
+            magic, version, stock_count, minutes, _, index_offset, index_length = BINARY_HEADER.unpack(header)
+            if magic != BINARY_MAGIC or version not in BINARY_DTYPES:
+                raise ValueError(f"不是有效的分钟数据文件: {path}")
+            if minutes != MINUTES_PER_DAY:
+                raise ValueError(f"分钟数据的每日分钟数为 {minutes}，应为 {MINUTES_PER_DAY}")
+            f.seek(index_offset)
+            index = json.loads(f.read(index_length).decode('utf-8'))
+
+        if stock_count == 0:
+            return cls([], [], np.empty(0), np.empty(0), np.empty((0, MINUTES_PER_DAY)))
+
+        arrays = np.memmap(path, dtype=BINARY_DTYPES[version], mode='r', offset=BINARY_HEADER_SIZE,
+                           shape=(stock_count * (MINUTES_PER_DAY + 2),))
+        base_prices = arrays[:stock_count]
+        open_prices = arrays[stock_count:2 * stock_count]
+        prices = arrays[2 * stock_count:].reshape(stock_count, MINUTES_PER_DAY)
+        return cls(index['codes'], index['names'], base_prices, open_prices, prices)
+
+    def write_binary(self, path):
+        """写入二进制格式（先写临时文件再替换，读取方不会看到写了一半的文件）"""
+        stock_count = len(self.codes)
+        index_bytes = json.dumps({'codes': self.codes, 'names': self.names}, ensure_ascii=False).encode('utf-8')
+        index_offset = BINARY_HEADER_SIZE + stock_count * (MINUTES_PER_DAY + 2) * BINARY_DTYPE.itemsize
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, stock_count, MINUTES_PER_DAY, 0,
+                                        index_offset, len(index_bytes))
+            f.write(header.ljust(BINARY_HEADER_SIZE, b'\0'))
+            for array in (self.base_prices, self.open_prices, self.prices):
+                f.write(np.ascontiguousarray(array, dtype=BINARY_DTYPE).tobytes())
+            f.write(index_bytes)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.row_of
+
+    def get_row(self, code):
+        """获取股票所在行，不存在时返回None"""
+        return self.row_of.get(code)
+
+    def take(self, codes, default_price=100.0):
+        """
+        按股票代码取出价格矩阵，缺失的股票整行填充默认价格（涨跌幅为0）
+        Returns:
+            (prices, open_prices)：形状分别为 (len(codes), 242) 和 (len(codes),)
+        """
+        rows = np.array([self.row_of.get(code, -1) for code in codes], dtype=np.intp)
+        found = rows >= 0
+
+        prices = np.full((len(codes), MINUTES_PER_DAY), default_price)
+        open_prices = np.full(len(codes), default_price)
+        prices[found] = self.prices[rows[found]]
+        open_prices[found] = self.open_prices[rows[found]]
+        return prices, open_prices
+
+
+def load_minute_data():
+    """加载股票分钟级涨跌幅数据"""
+    try:
+        with open(MINUTE_DATA_JSON_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"加载分钟数据失败: {str(e)}")
+        return {}
+
+
+def _binary_is_current():
+    """二进制文件存在且不早于JSON文件时才使用，避免JSON更新后仍读取旧数据"""
+    if not os.path.exists(MINUTE_DATA_BIN_PATH):
+        return False
+    if not os.path.exists(MINUTE_DATA_JSON_PATH):
+        return True
+    return os.path.getmtime(MINUTE_DATA_BIN_PATH) >= os.path.getmtime(MINUTE_DATA_JSON_PATH)
+
+
+def read_minute_index():
+    """加载分钟数据索引（JSON无法解析时抛出异常）：优先内存映射二进制文件，没有或已过时则解析JSON"""
+    if _binary_is_current():
+        try:
+            return MinuteDataIndex.from_binary(MINUTE_DATA_BIN_PATH)
+        except Exception as e:
+            print(f"加载二进制分钟数据失败，改用JSON: {str(e)}")
+    with open(MINUTE_DATA_JSON_PATH, 'r', encoding='utf-8') as f:
+        return MinuteDataIndex.from_json_data(json.load(f))
+
+
+def load_minute_index():
+    """加载分钟数据索引，失败时返回空索引"""
+    try:
+        return read_minute_index()
+    except Exception as e:
+        print(f"加载分钟数据失败: {str(e)}")
+        return MinuteDataIndex.from_json_data({})
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class MinuteDataSource:
+    """
+    可热更新的分钟数据索引
+    读取方每次通过 current() 取得当前索引的引用，一次请求内始终使用同一个索引；
+    current() 最多每隔 check_interval 秒检查一次数据文件的修改时间和大小，
+    有变化时在后台线程中构建新索引，构建完成后整体替换引用：
+    读取方不会被阻塞，也不会看到构建到一半的索引，构建失败（如文件正在写入）时继续使用旧索引
+    """
+
+    def __init__(self, loader=read_minute_index, paths=(MINUTE_DATA_JSON_PATH, MINUTE_DATA_BIN_PATH),
+                 check_interval=MINUTE_DATA_RELOAD_INTERVAL, clock=time.monotonic):
+        self._loader = loader
+        self._paths = paths
+        self._clock = clock
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._next_check = 0.0
+        self._failed_signature = None
+
+        self._signature = self._read_signature()
+        try:
+            self._index = loader()
+        except Exception as e:
+            print(f"加载分钟数据失败: {str(e)}")
+            self._index = MinuteDataIndex.from_json_data({})
+
+        self.reloads = 0
+        self.reload_failures = 0
+        self.last_reload_ms = None
+        self.last_reload_at = None
+
+    def _read_signature(self):
+        return tuple(_file_signature(path) for path in self._paths)
+
+    def current(self):
+        """当前的分钟数据索引，必要时在后台触发重新加载"""
+        if self.check_interval > 0 and self._clock() >= self._next_check:
+            self._check_for_changes()
+        return self._index
+
+    def _check_for_changes(self):
+        with self._lock:
+            if self._reloading or self._clock() < self._next_check:
+                return
+            self._next_check = self._clock() + self.check_interval
+            signature = self._read_signature()
+            if signature in (self._signature, self._failed_signature):
+                return
+            self._reloading = True
+
+        threading.Thread(target=self._reload, args=(signature,), name='minute-data-reload', daemon=True).start()
+
+    def reload(self):
+        """立即在当前线程重新加载，返回是否成功"""
+        with self._lock:
+            if self._reloading:
+                return False
+            self._reloading = True
+        return self._reload(self._read_signature())
+
+    def _reload(self, signature):
+        start = time.perf_counter()
+        try:
+            index = self._loader()
+        except Exception as e:
+            # 文件可能正在写入，写完后签名会再次变化，届时重试
+            with self._lock:
+                self._failed_signature = signature
+                self._reloading = False
+                self.reload_failures += 1
+            print(f"重新加载分钟数据失败，继续使用旧数据: {str(e)}")
+            return False
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._index = index
+            self._signature = signature
+            self._reloading = False
+            self.reloads += 1
+            self.last_reload_ms = round(elapsed_ms, 1)
+            self.last_reload_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        print(f"分钟数据已重新加载: {len(index)} 只股票，耗时 {elapsed_ms:.1f} ms")
+        return True
+
+    def stats(self):
+        """热更新统计"""
+        with self._lock:
+            return {
+                'stocks': len(self._index),
+                'checkInterval': self.check_interval,
+                'reloading': self._reloading,
+                'reloads': self.reloads,
+                'reloadFailures': self.reload_failures,
+                'lastReloadMs': self.last_reload_ms,
+                'lastReloadAt': self.last_reload_at
+            }
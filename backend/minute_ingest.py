@@ -0,0 +1,348 @@
+"""
+真实分钟K线采集
+采集所有已跟踪基金（本地持仓库中的基金）持仓股票并集的1分钟K线，
+整理成 stock_minute_data.json 的格式写回分钟数据文件，
+运行中的服务会通过分钟数据热更新自动读到新数据：
+- 每轮只重写二进制文件（只重新对齐本轮更新的股票），JSON每隔 MINUTE_INGEST_JSON_INTERVAL 秒
+  以及收盘、退出时才写一次；重启后按JSON中的最后一根K线补采中间缺失的部分
+- 跟踪的股票集合（读取本地持仓库）每隔 MINUTE_INGEST_TRACKED_INTERVAL 秒才刷新一次
+- 首次采集某只股票时取当天全部K线，之后每分钟只取上次之后新增的几根
+- 跨日时整只股票的分钟价格重新开始，昨收价取前一交易日最后一根K线
+- 通过 --record 录制采集到的响应，--fixtures 使用录制的响应离线运行
+
+用法:
+    python minute_ingest.py                  交易时间内每分钟增量采集
+    python minute_ingest.py --once           只采集一次
+    python minute_ingest.py --record DIR     采集的同时把响应录制到DIR
+    python minute_ingest.py --fixtures DIR   使用DIR中录制的响应，不访问网络
+
+可通过环境变量配置：
+    MINUTE_INGEST_DELAY    每分钟开始后等待多少秒再采集（等待上一分钟K线收盘），默认3
+    MINUTE_INGEST_OVERLAP  增量采集时多取的K线数，覆盖上次采集时尚未收盘的K线，默认3
+    MINUTE_INGEST_WORKERS  并发采集的线程数，默认8（爬虫共用连接池并按主机限速）
+    MINUTE_INGEST_JSON_INTERVAL     写JSON文件的间隔（秒），默认300；没有二进制文件时每轮都写
+    MINUTE_INGEST_TRACKED_INTERVAL  刷新跟踪股票集合的间隔（秒），默认600
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import sys
+import time
+
+from minute_data import (
+    MINUTE_DATA_BIN_PATH,
+    MINUTE_DATA_JSON_PATH,
+    MINUTE_SLOT,
+    MinuteDataIndex,
+    strip_market_suffix,
+    time_to_slot,
+)
+
+SPIDER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests_and_examples')
+MINUTE_INGEST_DELAY = float(os.environ.get('MINUTE_INGEST_DELAY', 3))
+MINUTE_INGEST_OVERLAP = int(os.environ.get('MINUTE_INGEST_OVERLAP', 3))
+MINUTE_INGEST_WORKERS = int(os.environ.get('MINUTE_INGEST_WORKERS', 8))
+MINUTE_INGEST_JSON_INTERVAL = float(os.environ.get('MINUTE_INGEST_JSON_INTERVAL', 300))
+MINUTE_INGEST_TRACKED_INTERVAL = float(os.environ.get('MINUTE_INGEST_TRACKED_INTERVAL', 600))
+
+# 一个交易日的1分钟K线数（09:31-11:30、13:01-15:00）
+BARS_PER_DAY = 240
+
+
+def tracked_stocks(holdings_store):
+    """所有已跟踪基金持仓股票的并集 {股票代码: 股票名称}"""
+    holdings_store.warm_load()
+    stocks = {}
+    for holdings in holdings_store.latest_holdings().values():
+        for holding in holdings:
+            stocks.setdefault(strip_market_suffix(holding['stockCode']), holding.get('stockName', ''))
+    return stocks
+
+
+class SpiderBarSource:
+    """通过 EastMoneyIntradaySpider 获取1分钟K线，可选把响应录制到目录中"""
+
+    def __init__(self, record_dir=None):
+        if SPIDER_DIR not in sys.path:
+            sys.path.append(SPIDER_DIR)
+        from fetch_eastmoney_intraday import EastMoneyIntradaySpider
+
+        self.spider = EastMoneyIntradaySpider()
+        self.record_dir = record_dir
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+
+    def fetch(self, code, datalen):
+        bars = self.spider.get_intraday_data(code, scale=1, datalen=datalen)
+        if bars and self.record_dir:
+            with open(os.path.join(self.record_dir, f"{code}.json"), 'w', encoding='utf-8') as f:
+                json.dump(bars, f, ensure_ascii=False, indent=2)
+        return bars
+
+
+class FixtureBarSource:
+    """
+    从录制的响应（每只股票一个 {代码}.json）读取K线，用于离线运行和测试
+    传入 clock 时只返回不晚于该时间的K线，可以按时间回放录制的一整天
+    """
+
+    def __init__(self, fixture_dir, clock=None):
+        self.fixture_dir = fixture_dir
+        self._clock = clock
+
+    def fetch(self, code, datalen):
+        path = os.path.join(self.fixture_dir, f"{code}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            bars = json.load(f)
+
+        items = bars['分时数据']
+        if self._clock is not None:
+            now = self._clock().strftime('%Y-%m-%d %H:%M:%S')
+            items = [bar for bar in items if bar['时间'] <= now]
+        # 与真实接口一致，只返回最近 datalen 根K线
+        bars['分时数据'] = items[-datalen:]
+        return bars
+
+
+def normalize_bars(bars):
+    """
+    把爬虫返回的1分钟K线整理为最近一个交易日的分钟价格
+    Returns:
+        (交易日, 当日开盘价, 前一交易日收盘价或None, [{'time': 'HH:MM', 'price': 收盘价}, ...])，
+        没有K线时返回None
+    """
+    items = sorted(bars.get('分时数据') or [], key=lambda bar: bar['时间'])
+    if not items:
+        return None
+
+    trade_date = items[-1]['时间'][:10]
+    today = [bar for bar in items if bar['时间'][:10] == trade_date]
+    previous = [bar for bar in items if bar['时间'][:10] < trade_date]
+
+    minute_prices = [{'time': bar['时间'][11:16], 'price': bar['收盘价']} for bar in today]
+    prev_close = previous[-1]['收盘价'] if previous else None
+    return trade_date, today[0]['开盘价'], prev_close, minute_prices
+
+
+def merge_stock_entry(entry, name, trade_date, open_price, prev_close, minute_prices):
+    """
+    把新采集的K线合并进分钟数据文件中的一只股票
+    同一交易日按时间合并（新K线覆盖同一分钟的旧K线），跨日时重新开始
+    """
+    entry = dict(entry or {})
+    if entry.get('trade_date') == trade_date:
+        merged = {price['time']: price for price in entry.get('minute_prices', [])}
+        merged.update((price['time'], price) for price in minute_prices)
+        minute_prices = [merged[time_str] for time_str in sorted(merged)]
+        base_price = prev_close or entry.get('base_price') or open_price
+        open_price = entry.get('open_price', open_price)
+    else:
+        # 跨日：没有取到前一交易日K线时，用文件中前一交易日的最后价格作为昨收
+        previous_prices = entry.get('minute_prices') or []
+        base_price = prev_close or (previous_prices[-1]['price'] if entry.get('trade_date') and previous_prices else None) or open_price
+
+    entry.update({
+        'name': name or entry.get('name') or '',
+        'trade_date': trade_date,
+        'base_price': base_price,
+        'open_price': open_price,
+        'minute_prices': minute_prices
+    })
+    return entry
+
+
+class MinuteBarIngestor:
+    """增量采集分钟K线并写入分钟数据文件"""
+
+    def __init__(self, source, data_path=MINUTE_DATA_JSON_PATH, bin_path=MINUTE_DATA_BIN_PATH,
+                 clock=datetime.now, max_workers=MINUTE_INGEST_WORKERS, json_interval=MINUTE_INGEST_JSON_INTERVAL):
+        self.source = source
+        self.max_workers = max_workers
+        self.data_path = data_path
+        self.bin_path = bin_path
+        self.json_interval = json_interval
+        self._clock = clock
+        self.data = self._load()
+        # 写二进制文件用的索引，只重新对齐更新过的股票；JSON是否有未写出的更新
+        self._index = None
+        self._json_dirty = False
+        self._json_saved_at = None
+
+    def _load(self):
+        if not os.path.exists(self.data_path):
+            return {}
+        with open(self.data_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _bars_to_fetch(self, entry, now):
+        """本次需要请求的K线数：当天已采集过的股票只取上次之后的K线"""
+        today = now.strftime('%Y-%m-%d')
+        if not entry or entry.get('trade_date') != today or not entry.get('minute_prices'):
+            return BARS_PER_DAY
+
+        last_slot = MINUTE_SLOT.get(entry['minute_prices'][-1]['time'], 0)
+        missing = max(time_to_slot(now) - last_slot, 0)
+        return min(missing + MINUTE_INGEST_OVERLAP, BARS_PER_DAY)
+
+    def ingest(self, stocks):
+        """
+        采集一轮
+        Args:
+            stocks: {股票代码: 股票名称}
+        Returns:
+            本轮统计 {'stocks', 'updated', 'failed', 'bars', 'elapsedMs'}
+        """
+        start = time.perf_counter()
+        now = self._clock()
+        failed = bar_count = 0
+
+        def fetch(code):
+            try:
+                bars = self.source.fetch(code, self._bars_to_fetch(self.data.get(code), now))
+                return normalize_bars(bars) if bars else None
+            except Exception as e:
+                print(f"采集股票 {code} 的分钟K线失败: {str(e)}")
+                return None
+
+        # 并发请求，合并和写文件仍在当前线程顺序进行
+        codes = list(stocks)
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix='minute-ingest') as executor:
+            fetched = dict(zip(codes, executor.map(fetch, codes)))
+
+        updated_codes = []
+        for code, name in stocks.items():
+            entry = self.data.get(code)
+            normalized = fetched[code]
+            if normalized is None:
+                failed += 1
+                continue
+
+            trade_date, open_price, prev_close, minute_prices = normalized
+            self.data[code] = merge_stock_entry(entry, name, trade_date, open_price, prev_close, minute_prices)
+            updated_codes.append(code)
+            bar_count += len(minute_prices)
+        updated = len(updated_codes)
+
+        if updated:
+            self._save(updated_codes)
+
+        summary = {
+            'stocks': len(stocks),
+            'updated': updated,
+            'failed': failed,
+            'bars': bar_count,
+            'elapsedMs': round((time.perf_counter() - start) * 1000, 1)
+        }
+        print(f"分钟K线采集完成: {summary}")
+        return summary
+
+    def _json_due(self):
+        if not self.bin_path or self._json_saved_at is None:
+            return True
+        return time.monotonic() - self._json_saved_at >= self.json_interval
+
+    def _save(self, updated_codes, write_json=None):
+        """
+        写出本轮的更新：二进制文件每轮都重写，JSON到了写入间隔才写
+        先写JSON再写二进制文件（二进制文件不早于JSON时服务才使用它），都先写临时文件再替换，
+        服务热更新时不会读到写了一半的文件
+        """
+        if write_json if write_json is not None else self._json_due():
+            tmp_path = f"{self.data_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.data_path)
+            self._json_saved_at = time.monotonic()
+            self._json_dirty = False
+        else:
+            self._json_dirty = True
+
+        if self.bin_path:
+            self._update_index(updated_codes)
+            self._index.write_binary(self.bin_path)
+
+    def _update_index(self, codes):
+        """只重新对齐更新过的股票；出现新股票时整体重建"""
+        if self._index is None or any(code not in self._index for code in codes):
+            self._index = MinuteDataIndex.from_json_data(self.data)
+            return
+        for code in codes:
+            self._index.set_stock(self._index.get_row(code), self.data[code])
+
+    def flush(self):
+        """把尚未写出的更新写入JSON（收盘和退出时调用）"""
+        if self._json_dirty:
+            self._save([], write_json=True)
+
+
+class TrackedStocks:
+    """跟踪的股票集合，每隔 interval 秒才重新读取本地持仓库"""
+
+    def __init__(self, holdings_store, interval=MINUTE_INGEST_TRACKED_INTERVAL, clock=time.monotonic):
+        self.holdings_store = holdings_store
+        self.interval = interval
+        self._clock = clock
+        self._stocks = None
+        self._refreshed_at = None
+
+    def get(self):
+        now = self._clock()
+        if self._stocks is None or now - self._refreshed_at >= self.interval:
+            self._stocks = tracked_stocks(self.holdings_store)
+            self._refreshed_at = now
+        return self._stocks
+
+
+def in_ingest_window(now):
+    """工作日的交易时间内以及午休、收盘后的第一分钟（采集11:30和15:00那根K线）"""
+    if now.weekday() >= 5:
+        return False
+    time_str = now.strftime('%H:%M')
+    return time_str in MINUTE_SLOT or time_str in ('11:31', '15:01')
+
+
+def run_forever(ingestor, holdings_store):
+    """交易时间内每分钟采集一轮，收盘后和退出时把更新写入JSON"""
+    tracked = TrackedStocks(holdings_store)
+    try:
+        while True:
+            now = datetime.now()
+            if in_ingest_window(now):
+                ingestor.ingest(tracked.get())
+                if now.strftime('%H:%M') == '15:01':
+                    ingestor.flush()
+            time.sleep(60 - time.time() % 60 + MINUTE_INGEST_DELAY)
+    finally:
+        ingestor.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采集持仓股票的1分钟K线')
+    parser.add_argument('--once', action='store_true', help='只采集一次')
+    parser.add_argument('--fixtures', help='使用该目录中录制的响应，不访问网络')
+    parser.add_argument('--record', help='把采集到的响应录制到该目录')
+    parser.add_argument('--codes', help='只采集这些股票（逗号分隔），默认为所有已跟踪基金的持仓股票')
+    args = parser.parse_args()
+
+    source = FixtureBarSource(args.fixtures) if args.fixtures else SpiderBarSource(record_dir=args.record)
+    ingestor = MinuteBarIngestor(source)
+
+    from holdings_store import holdings_store
+
+    if args.codes:
+        stocks = {code.strip(): '' for code in args.codes.split(',') if code.strip()}
+        ingestor.ingest(stocks)
+        ingestor.flush()
+    elif args.once:
+        ingestor.ingest(tracked_stocks(holdings_store))
+        ingestor.flush()
+    else:
+        run_forever(ingestor, holdings_store)
+
+
+if __name__ == '__main__':
+    main()
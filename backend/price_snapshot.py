@@ -0,0 +1,92 @@
+"""
+股票报价快照（按交易分钟合并请求）
+同一个交易分钟内，无论多少基金、多少客户端查询，每只股票的报价最多只计算一次：
+- 快照以 (日期, 交易分钟偏移) 为键，进入新的分钟时整体丢弃上一分钟的报价
+- 分钟数据热更新后（索引对象变化）同样丢弃快照，收盘后重新生成/采集的数据立即生效
+- 多个线程同时查询同一只股票时，只有一个线程计算，其余线程等待其结果
+"""
+import threading
+
+from minute_data import TRADING_MINUTES, strip_market_suffix, time_to_slot
+
+
+class PriceSnapshot:
+    """按交易分钟缓存的股票报价"""
+
+    def __init__(self, quote_fn, index_fn=None):
+        """
+        Args:
+            quote_fn: 计算单只股票报价的函数 quote_fn(stock_code, current_time)
+            index_fn: 返回当前分钟数据索引的函数（如 MinuteDataSource.current），索引对象变化时丢弃快照
+        """
+        self._quote_fn = quote_fn
+        self._index_fn = index_fn
+        self._lock = threading.Lock()
+        self._minute_key = None
+        self._minute_index = None
+        self._quotes = {}    # code -> 报价
+        self._inflight = {}  # code -> 正在计算时的 threading.Event
+
+        self.requests_served = 0
+        self.quotes_computed = 0
+        self.coalesced_waits = 0
+        self.snapshot_minutes = 0
+
+    def get_quote(self, stock_code, current_time):
+        """获取股票在指定时间所属交易分钟的报价"""
+        code = strip_market_suffix(stock_code)
+        minute_key = (current_time.date(), time_to_slot(current_time))
+        minute_index = self._index_fn() if self._index_fn else None
+
+        with self._lock:
+            if minute_key != self._minute_key or minute_index is not self._minute_index:
+                self._minute_key = minute_key
+                self._minute_index = minute_index
+                self._quotes = {}
+                self._inflight = {}
+                self.snapshot_minutes += 1
+
+            self.requests_served += 1
+            # 持有本分钟的字典引用，计算期间即使进入下一分钟也写回原快照
+            quotes = self._quotes
+            inflight = self._inflight
+            if code in quotes:
+                return quotes[code]
+
+            event = inflight.get(code)
+            is_owner = event is None
+            if is_owner:
+                event = threading.Event()
+                inflight[code] = event
+            else:
+                self.coalesced_waits += 1
+
+        if not is_owner:
+            event.wait()
+            return quotes.get(code)
+
+        try:
+            quote = self._quote_fn(stock_code, current_time)
+        except Exception:
+            quote = None
+
+        with self._lock:
+            quotes[code] = quote
+            inflight.pop(code, None)
+            self.quotes_computed += 1
+        event.set()
+        return quote
+
+    def stats(self):
+        """合并统计：请求次数与实际计算次数"""
+        with self._lock:
+            return {
+                'minute': f"{self._minute_key[0]} {TRADING_MINUTES[self._minute_key[1]]}" if self._minute_key else None,
+                'cachedQuotes': len(self._quotes),
+                'requestsServed': self.requests_served,
+                'quotesComputed': self.quotes_computed,
+                'coalescedWaits': self.coalesced_waits,
+                'snapshotMinutes': self.snapshot_minutes,
+                'coalescingRatio': round(1 - self.quotes_computed / self.requests_served, 4)
+                if self.requests_served else 0.0
+            }
@@ -0,0 +1,108 @@
+"""
+生产环境启动入口（gunicorn多进程）
+fund_api.py 中的 app.run(debug=True) 只适合开发调试，生产环境使用本脚本启动多个worker进程：
+- 主进程先加载应用（分钟数据索引、本地持仓库），再fork出worker，
+  只读的分钟价格矩阵由所有worker共享同一份物理内存（写时复制），不会随worker数成倍增长
+- worker之间只共享本地SQLite持仓库：任一worker请求上游后写入，其他worker之后未命中时直接读库；
+  按年份的持仓缓存（holdings_cache）是每个进程各自的，多个worker同时冷启动未命中同一基金时各自请求一次上游
+- gthread worker 中每个估值推送(SSE)长连接占用一个线程，每个worker的订阅数默认限制为线程数的一半，
+  超出时返回503，其余线程留给普通请求
+- 开始接受请求前先预热热门基金的持仓，避免刚启动时所有请求都打到上游
+
+需要安装: pip install gunicorn（仅支持Linux/macOS，Windows请使用 python fund_api.py）
+启动: python serve.py
+
+可通过环境变量配置：
+    SERVER_BIND           监听地址，默认 127.0.0.1:8001
+    SERVER_WORKERS        worker进程数，默认CPU核数（最多8）
+    SERVER_THREADS        每个worker的线程数，默认8
+    VALUATION_STREAM_MAX_SUBSCRIBERS  每个worker最多的估值推送连接数，默认 SERVER_THREADS 的一半
+    SERVER_TIMEOUT        worker无响应多久后重启（秒），默认120
+    WARMUP_FUNDS          启动时预热的基金代码，逗号分隔
+    WARMUP_RECENT_FUNDS   另外预热本地持仓库中最近更新的基金数，默认20
+    WARMUP_CONCURRENCY    预热时同时请求的基金数，默认4
+"""
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import os
+import time
+
+from gunicorn.app.base import BaseApplication
+
+SERVER_BIND = os.environ.get('SERVER_BIND', '127.0.0.1:8001')
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', min(multiprocessing.cpu_count(), 8)))
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))
+SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 120))
+WARMUP_FUNDS = [code.strip().zfill(6) for code in os.environ.get('WARMUP_FUNDS', '').split(',') if code.strip()]
+WARMUP_RECENT_FUNDS = int(os.environ.get('WARMUP_RECENT_FUNDS', 20))
+WARMUP_CONCURRENCY = int(os.environ.get('WARMUP_CONCURRENCY', 4))
+# 在导入 fund_api 之前设置，valuation_stream 导入时读取
+os.environ.setdefault('VALUATION_STREAM_MAX_SUBSCRIBERS', str(max(1, SERVER_THREADS // 2)))
+
+
+def hot_funds(holdings_store):
+    """需要预热的基金：显式配置的基金 + 本地持仓库中最近更新的基金"""
+    recent = holdings_store.recent_funds(WARMUP_RECENT_FUNDS) if WARMUP_RECENT_FUNDS > 0 else []
+    return list(dict.fromkeys(WARMUP_FUNDS + recent))
+
+
+def warm_up(fund_api):
+    """
+    预热热门基金的持仓：本地数据过期或缺失的基金会请求上游并写回持仓库
+    在主进程fork worker之前执行，预热线程池在返回前关闭
+    """
+    fund_codes = hot_funds(fund_api.holdings_store)
+    if not fund_codes:
+        print("没有需要预热的基金")
+        return
+
+    print(f"开始预热 {len(fund_codes)} 只基金的持仓...")
+    start = time.perf_counter()
+
+    def load(fund_code):
+        try:
+            return len(fund_api.load_fund_holdings(fund_code)) > 0
+        except Exception as e:
+            print(f"预热基金 {fund_code} 失败: {str(e)}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=WARMUP_CONCURRENCY, thread_name_prefix='warmup') as executor:
+        loaded = sum(executor.map(load, fund_codes))
+
+    print(f"预热完成：{loaded}/{len(fund_codes)} 只基金有持仓数据，耗时 {time.perf_counter() - start:.1f} 秒")
+
+
+class FundApiServer(BaseApplication):
+    """以预加载模式运行 fund_api 的gunicorn应用"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # preload_app 模式下在主进程中执行一次，之后fork出的worker直接继承
+        import fund_api
+        warm_up(fund_api)
+        return fund_api.app
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("启动基金API服务（生产模式）...")
+    print("=" * 50)
+    print(f"服务地址: http://{SERVER_BIND}")
+    print(f"worker进程数: {SERVER_WORKERS}，每个worker线程数: {SERVER_THREADS}")
+    print("=" * 50)
+    FundApiServer({
+        'bind': SERVER_BIND,
+        'workers': SERVER_WORKERS,
+        'threads': SERVER_THREADS,
+        # 多线程worker：每个估值推送(SSE)长连接占用一个线程，订阅数由 VALUATION_STREAM_MAX_SUBSCRIBERS 限制
+        'worker_class': 'gthread',
+        'timeout': SERVER_TIMEOUT,
+        'preload_app': True,
+    }).run()
@@ -1,14 +1,14 @@
 const express = require('express')
 const cors = require('cors')
 const { auth, get_price, get_fundamentals } = require('jqdatasdk')
-const { exec } = require('child_process')
-const path = require('path')
-const { promisify } = require('util')
-const execAsync = promisify(exec)
+const { HoldingsWorkerPool } = require('./holdingsWorkerPool')
 
 const app = express()
 const PORT = 8000
 
+// 常驻的Python持仓查询进程池
+const holdingsPool = new HoldingsWorkerPool()
+
 app.use(cors())
 app.use(express.json())
 
@@ -40,17 +40,8 @@ app.get('/api/fund/holdings', async (req, res) => {
       return res.status(400).json({ error: '基金代码不能为空' })
     }
 
-    // 调用akshare Python脚本获取真实持仓数据
-    const scriptPath = path.join(__dirname, 'get_holdings.py')
-    const { stdout, stderr } = await execAsync(`python "${scriptPath}" ${fundCode}`, {
-      encoding: 'utf8'
-    })
-
-    if (stderr) {
-      console.error('执行Python脚本错误:', stderr)
-    }
-
-    const holdingsData = JSON.parse(stdout)
+    // 通过常驻的akshare Python进程获取真实持仓数据
+    const holdingsData = await holdingsPool.getFundHoldings(fundCode)
     return res.json(holdingsData)
   } catch (error) {
     console.error('获取基金持仓失败:', error)
@@ -1,14 +1,14 @@
 const express = require('express')
 const cors = require('cors')
 const axios = require('axios')
-const { exec } = require('child_process')
-const { promisify } = require('util')
-
-const execAsync = promisify(exec)
+const { HoldingsWorkerPool } = require('./holdingsWorkerPool')
 
 const app = express()
 const PORT = 8000
 
+// 常驻的Python持仓查询进程池，避免每次请求都启动解释器并导入pandas/akshare
+const holdingsPool = new HoldingsWorkerPool()
+
 app.use(cors())
 app.use(express.json())
 
@@ -22,6 +22,13 @@ const AKSHARE_API = {
   fundQuote: 'http://fundgz.eastmoney.com/js/000001.js'
 }
 
+// 持仓代码的交易所后缀 -> 东方财富 secid 中的市场编号（北交所与深市同为0）
+const EASTMONEY_MARKET_IDS = {
+  XSHG: '1',
+  XSHE: '0',
+  XBJE: '0'
+}
+
 // 获取基金持仓
 app.get('/api/fund/holdings', async (req, res) => {
   try {
@@ -33,19 +40,8 @@ app.get('/api/fund/holdings', async (req, res) => {
 
     console.log(`查询基金持仓: ${fundCode}`)
 
-    // 调用Python脚本获取持仓数据
-    const scriptPath = path.join(__dirname, 'get_holdings.py')
-    const { stdout, stderr } = await execAsync(`python "${scriptPath}" ${fundCode}`, {
-      encoding: 'utf8',
-      cwd: __dirname,
-      shell: true
-    })
-
-    if (stderr) {
-      console.error('Python脚本执行错误:', stderr)
-    }
-
-    const result = JSON.parse(stdout)
+    // 通过常驻的Python进程获取持仓数据
+    const result = await holdingsPool.getFundHoldings(fundCode)
 
     if (!result.success) {
       throw new Error(result.error || '获取持仓数据失败')
@@ -76,11 +72,9 @@ app.post('/api/stock/prices', async (req, res) => {
 
     for (const code of codes) {
       try {
-        // 解析股票代码（去除.XSHG或.XSHE后缀）
-        const stockCode = code.replace('.XSHG', '').replace('.XSHE', '')
-
-        // 判断市场（上海或深圳）
-        const market = code.includes('XSHG') ? '1' : '0'
+        // 解析股票代码（去除.XSHG、.XSHE或.XBJE后缀），按后缀判断市场，没有后缀时按深市处理
+        const [stockCode, exchange = 'XSHE'] = code.split('.')
+        const market = EASTMONEY_MARKET_IDS[exchange] || '0'
         const secid = `${market}.${stockCode}`
 
         console.log(`查询股票 ${code}, secid=${secid}`)
@@ -0,0 +1,114 @@
+"""
+基金日内估值曲线缓存（增量计算）
+已经过去的分钟估值不会再变化，每只基金只保留当天已算出的估值点，
+每次请求只计算上一次之后新增的分钟，而不是从09:30重新算起：
+- 持仓变化、分钟数据重新加载或跨日时，整条曲线重新计算
+- 超过容量时淘汰最久未使用的基金
+
+可通过环境变量配置：
+    VALUATION_CURVE_MAX_FUNDS  最多缓存的基金数，默认512
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+import os
+import threading
+
+from minute_data import TRADING_MINUTES
+from valuation_engine import compute_curve_points, prepare_curve_inputs
+
+VALUATION_CURVE_MAX_FUNDS = int(os.environ.get('VALUATION_CURVE_MAX_FUNDS', 512))
+
+
+def holdings_signature(holdings):
+    """持仓的指纹，持仓股票或市值变化时曲线需要重新计算"""
+    return tuple((holding['stockCode'], holding['marketValue']) for holding in holdings)
+
+
+def slots_after(since):
+    """'HH:MM' 之后第一个交易分钟的偏移，用于只返回增量的估值点"""
+    return bisect_right(TRADING_MINUTES, since)
+
+
+class _FundCurve:
+    """单只基金当天的估值曲线"""
+
+    def __init__(self, key, minute_index, holdings):
+        self.key = key
+        self.minute_index = minute_index
+        self.curve_inputs = prepare_curve_inputs(holdings, minute_index)
+        self.points = []
+
+
+class ValuationCurveStore:
+    """线程安全的日内估值曲线缓存，键为基金代码"""
+
+    def __init__(self, max_funds=VALUATION_CURVE_MAX_FUNDS):
+        self.max_funds = max_funds
+        self._curves = OrderedDict()  # fund_code -> _FundCurve
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.rebuilds = 0
+        self.points_computed = 0
+        self.evictions = 0
+
+    def get_curve(self, fund_code, holdings, minute_index, trade_date, end_slot):
+        """
+        获取基金截至 end_slot（包含）的估值曲线，只计算尚未算过的分钟
+        Args:
+            fund_code: 基金代码
+            holdings: 持仓列表，每项包含 stockCode 和 marketValue
+            minute_index: 分钟数据索引（MinuteDataIndex）
+            trade_date: 交易日，跨日时曲线重新计算
+            end_slot: 截止的分钟偏移（包含）
+        Returns:
+            [{'time': 'HH:MM', 'changePercent': x}, ...]
+        """
+        key = (trade_date, holdings_signature(holdings))
+
+        with self._lock:
+            self.requests += 1
+            curve = self._curves.get(fund_code)
+            if curve is None or curve.key != key or curve.minute_index is not minute_index:
+                curve = _FundCurve(key, minute_index, holdings)
+                self._curves[fund_code] = curve
+                self.rebuilds += 1
+            self._curves.move_to_end(fund_code)
+
+            while len(self._curves) > self.max_funds:
+                self._curves.popitem(last=False)
+                self.evictions += 1
+
+            if curve.curve_inputs is None:
+                return []
+
+            start_slot = len(curve.points)
+            if end_slot >= start_slot:
+                curve.points.extend(compute_curve_points(curve.curve_inputs, start_slot, end_slot))
+                self.points_computed += end_slot - start_slot + 1
+
+            return curve.points[:end_slot + 1]
+
+    def invalidate(self, fund_code=None):
+        """清除指定基金（或全部）的曲线"""
+        with self._lock:
+            if fund_code is None:
+                self._curves.clear()
+            else:
+                self._curves.pop(fund_code, None)
+
+    def stats(self):
+        """缓存统计：请求次数与实际计算的估值点数"""
+        with self._lock:
+            return {
+                'funds': len(self._curves),
+                'maxFunds': self.max_funds,
+                'requests': self.requests,
+                'rebuilds': self.rebuilds,
+                'pointsComputed': self.points_computed,
+                'evictions': self.evictions
+            }
+
+
+# 进程内共享的估值曲线缓存
+valuation_curve_store = ValuationCurveStore()
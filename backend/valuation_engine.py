@@ -0,0 +1,108 @@
+"""
+基金分时估值计算引擎（NumPy向量化）
+把所有持仓股票的分钟价格一次性对齐成 (股票数 × 242) 的矩阵，
+再用一次矩阵-向量乘法得到整条估值曲线，替代逐分钟、逐股票的Python循环
+"""
+import numpy as np
+
+from minute_data import MINUTES_PER_DAY, TRADING_MINUTES, strip_market_suffix
+
+
+def compute_change_matrix(prices, open_prices):
+    """计算相对开盘价的涨跌幅矩阵（%），开盘价无效的股票涨跌幅记为0"""
+    open_column = open_prices[:, None]
+    return np.divide(
+        (prices - open_column) * 100,
+        open_column,
+        out=np.zeros_like(prices),
+        where=open_column > 0
+    )
+
+
+def prepare_curve_inputs(holdings, minute_index):
+    """
+    取出计算估值曲线所需的数据：市值权重和持仓股票的分钟价格矩阵
+    Returns:
+        (市值权重, 总市值, 价格矩阵, 开盘价)，无持仓或总市值为0时返回None
+    """
+    if not holdings:
+        return None
+
+    weights = np.array([holding['marketValue'] for holding in holdings], dtype=float)
+    total_market_value = weights.sum()
+    if total_market_value <= 0:
+        return None
+
+    stock_codes = [strip_market_suffix(holding['stockCode']) for holding in holdings]
+    prices, open_prices = minute_index.take(stock_codes)
+    return weights, total_market_value, prices, open_prices
+
+
+def compute_curve_points(curve_inputs, start_slot, end_slot):
+    """计算 [start_slot, end_slot] 区间内每分钟的估值点"""
+    weights, total_market_value, prices, open_prices = curve_inputs
+    changes = compute_change_matrix(prices[:, start_slot:end_slot + 1], open_prices)
+
+    # 一次矩阵-向量乘法得到每分钟的加权涨跌幅
+    curve = weights @ changes / total_market_value
+
+    return [
+        {'time': time_str, 'changePercent': round(float(change), 2)}
+        for time_str, change in zip(TRADING_MINUTES[start_slot:end_slot + 1], curve)
+    ]
+
+
+def compute_valuation_curve(holdings, minute_index, end_slot=None):
+    """
+    计算基金全天（或截至end_slot）的估值曲线
+    按持仓市值加权：估算涨跌幅 = Σ(市值 × 涨跌幅) / Σ市值
+    Args:
+        holdings: 持仓列表，每项包含 stockCode 和 marketValue
+        minute_index: 分钟数据索引（MinuteDataIndex）
+        end_slot: 截止的分钟偏移（包含），None表示全天
+    Returns:
+        [{'time': 'HH:MM', 'changePercent': x}, ...]
+    """
+    curve_inputs = prepare_curve_inputs(holdings, minute_index)
+    if curve_inputs is None:
+        return []
+
+    if end_slot is None:
+        end_slot = MINUTES_PER_DAY - 1
+    return compute_curve_points(curve_inputs, 0, end_slot)
+
+
+def compute_fund_changes(fund_holdings, stock_changes):
+    """
+    同时计算多只基金的估算涨跌幅
+    各基金的持仓市值组成 (基金数 × 股票数) 的权重矩阵，与股票涨跌幅向量相乘一次得到所有基金的结果
+    Args:
+        fund_holdings: {基金代码: 持仓列表}，持仓包含 stockCode 和 marketValue
+        stock_changes: {股票代码: 涨跌幅(%)}，覆盖所有基金持仓股票的并集
+    Returns:
+        {基金代码: (估算涨跌幅, 持仓总市值)}
+    """
+    fund_codes = list(fund_holdings.keys())
+    stock_codes = list(stock_changes.keys())
+    column_of = {code: column for column, code in enumerate(stock_codes)}
+
+    weights = np.zeros((len(fund_codes), len(stock_codes)))
+    for row, fund_code in enumerate(fund_codes):
+        for holding in fund_holdings[fund_code]:
+            column = column_of.get(holding['stockCode'])
+            if column is not None and holding['marketValue']:
+                weights[row, column] += holding['marketValue']
+
+    changes = np.array([stock_changes[code] for code in stock_codes], dtype=float)
+    total_market_values = weights.sum(axis=1)
+    estimated_changes = np.divide(
+        weights @ changes,
+        total_market_values,
+        out=np.zeros(len(fund_codes)),
+        where=total_market_values > 0
+    )
+
+    return {
+        fund_code: (float(estimated_changes[row]), float(total_market_values[row]))
+        for row, fund_code in enumerate(fund_codes)
+    }
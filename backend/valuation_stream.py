@@ -0,0 +1,184 @@
+"""
+基金估值推送（Server-Sent Events）
+所有客户端的订阅共享一个生产者线程：
+- 每个交易分钟对所有订阅基金的并集只计算一次估值，再分发给各个订阅者
+- 每个订阅者有自己的有界队列，客户端读取过慢时丢弃最旧的消息，不阻塞生产者
+- 没有订阅者时生产者空闲等待，不计算
+- 每个连接在多线程服务器中占用一个线程，订阅数有上限，超出时拒绝新订阅，避免长连接占满进程的线程
+
+可通过环境变量配置：
+    VALUATION_STREAM_HEARTBEAT  无推送时发送心跳的间隔（秒），默认15
+    VALUATION_STREAM_QUEUE_SIZE 每个订阅者最多积压的消息数，默认10
+    VALUATION_STREAM_MAX_FUNDS  单个订阅最多的基金数，默认50
+    VALUATION_STREAM_MAX_SUBSCRIBERS  每个进程最多的订阅（长连接）数，默认0表示不限制；serve.py 默认设为线程数的一半
+"""
+from datetime import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+from minute_data import time_to_slot
+
+VALUATION_STREAM_HEARTBEAT = float(os.environ.get('VALUATION_STREAM_HEARTBEAT', 15))
+VALUATION_STREAM_QUEUE_SIZE = int(os.environ.get('VALUATION_STREAM_QUEUE_SIZE', 10))
+VALUATION_STREAM_MAX_FUNDS = int(os.environ.get('VALUATION_STREAM_MAX_FUNDS', 50))
+VALUATION_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('VALUATION_STREAM_MAX_SUBSCRIBERS', 0))
+
+
+def format_event(event, data):
+    """编码为一条SSE消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    """一个SSE连接的订阅"""
+
+    def __init__(self, broadcaster, fund_codes, queue_size=VALUATION_STREAM_QUEUE_SIZE,
+                 heartbeat=VALUATION_STREAM_HEARTBEAT):
+        self.fund_codes = fund_codes
+        self.heartbeat = heartbeat
+        self.minute_key = None  # 最近一次推送的交易分钟
+        self.dropped = 0
+        self._broadcaster = broadcaster
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def push(self, message):
+        """放入一条消息，队列已满时丢弃最旧的一条"""
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def events(self):
+        """SSE消息生成器，连接断开时自动取消订阅"""
+        try:
+            while True:
+                try:
+                    yield self._queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    # 心跳，保持连接并及时发现已断开的客户端
+                    yield ': keep-alive\n\n'
+        finally:
+            self._broadcaster.unsubscribe(self)
+
+
+class ValuationBroadcaster:
+    """单生产者、多订阅者的估值推送"""
+
+    def __init__(self, compute_fn, clock=datetime.now, next_minute=None,
+                 max_subscribers=VALUATION_STREAM_MAX_SUBSCRIBERS):
+        """
+        Args:
+            compute_fn: 批量估值函数 compute_fn(fund_codes, now)，
+                        返回 {'time': 'HH:MM', 'valuations': {基金代码: 估值}}
+            clock: 当前时间，便于测试
+            next_minute: 距离下一分钟的秒数，返回None时一直等到 wake()；默认按系统时间计算
+            max_subscribers: 最多的订阅数，0表示不限制
+        """
+        self._compute_fn = compute_fn
+        self.max_subscribers = max_subscribers
+        self._clock = clock
+        self._next_minute = next_minute or (lambda: 60 - time.time() % 60)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._subscribers = set()
+        self._thread = None
+
+        self._minute_key = None
+        self._time = None
+        self._valuations = {}  # 本分钟已计算的 基金代码 -> 估值
+
+        self.computations = 0
+        self.funds_computed = 0
+        self.messages_sent = 0
+        self.rejected = 0
+
+    def subscribe(self, fund_codes):
+        """新增订阅，立即唤醒生产者为其推送当前分钟的估值；订阅数已达上限时返回None"""
+        subscriber = Subscriber(self, fund_codes)
+        with self._lock:
+            if self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='valuation-stream', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return subscriber
+
+    def wake(self):
+        """时间跳变（如回放时钟步进）时唤醒生产者立即推送"""
+        self._wakeup.set()
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _run(self):
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"估值推送计算失败: {str(e)}")
+
+            # 等到下一个整分钟，或有新订阅者、时钟跳变时提前唤醒
+            self._wakeup.wait(timeout=self._next_minute())
+            self._wakeup.clear()
+
+    def publish(self):
+        """为尚未收到本分钟估值的订阅者计算并推送，同一分钟内每只基金只计算一次"""
+        now = self._clock()
+        minute_key = (now.date(), time_to_slot(now))
+
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.minute_key != minute_key]
+            if minute_key != self._minute_key:
+                self._minute_key = minute_key
+                self._time = now.strftime('%H:%M')
+                self._valuations = {}
+            valuations = self._valuations
+
+        if not subscribers:
+            return
+
+        missing = list(dict.fromkeys(
+            code for s in subscribers for code in s.fund_codes if code not in valuations
+        ))
+        if missing:
+            result = self._compute_fn(missing, now)
+            valuations.update(result['valuations'])
+            with self._lock:
+                self.computations += 1
+                self.funds_computed += len(missing)
+
+        for subscriber in subscribers:
+            subscriber.push(format_event('valuations', {
+                'time': self._time,
+                'valuations': {code: valuations[code] for code in subscriber.fund_codes if code in valuations}
+            }))
+            subscriber.minute_key = minute_key
+
+        with self._lock:
+            self.messages_sent += len(subscribers)
+
+    def stats(self):
+        """推送统计：订阅数、计算次数与发送的消息数"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'maxSubscribers': self.max_subscribers,
+                'rejected': self.rejected,
+                'computations': self.computations,
+                'fundsComputed': self.funds_computed,
+                'messagesSent': self.messages_sent,
+                'droppedMessages': sum(s.dropped for s in self._subscribers)
+            }
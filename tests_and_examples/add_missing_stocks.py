@@ -1,8 +1,12 @@
 """
 添加缺失的股票数据：688120, 301611, 601138
+分钟价格由 minute_data_generator 一次向量化生成
 """
 import json
-import random
+
+import numpy as np
+
+from minute_data_generator import generate_price_paths, minute_price_list
 
 # 加载现有数据
 print("加载现有数据...")
@@ -36,108 +40,36 @@ new_stocks = [
     }
 ]
 
-for stock in new_stocks:
+prices, target_change = generate_price_paths(
+    np.array([stock["base_price"] for stock in new_stocks]),
+    np.array([stock["open_price"] for stock in new_stocks]),
+    [stock["trend"] for stock in new_stocks]
+)
+
+for i, stock in enumerate(new_stocks):
     code = stock["code"]
-    name = stock["name"]
-    base_price = stock["base_price"]
     open_price = stock["open_price"]
-    trend = stock["trend"]
-    
-    print(f"\n添加股票 {code}: {name}")
-    print(f"  基准价: {base_price:.2f}, 开盘价: {open_price:.2f}, 趋势: {trend}")
-    
-    # 生成新的分钟价格数据
-    minute_prices = []
-    
-    # 时间范围：上午9:30-11:30 (121分钟) + 下午13:00-15:00 (121分钟) = 242分钟
-    morning_times = []
-    for hour in range(9, 12):
-        for minute in range(0, 60):
-            if hour == 9 and minute < 30:
-                continue
-            if hour == 11 and minute > 30:
-                continue
-            morning_times.append(f"{hour:02d}:{minute:02d}")
-    
-    afternoon_times = []
-    for hour in range(13, 16):  # 13, 14, 15
-        for minute in range(0, 60):
-            if hour == 15 and minute > 0:
-                break
-            afternoon_times.append(f"{hour:02d}:{minute:02d}")
-    
-    all_times = morning_times + afternoon_times
-    
-    # 根据趋势设置目标涨跌幅（限制在±10%范围内）
-    if trend == "震荡上行":
-        target_change = random.uniform(2, 5)  # 2%到5%的上涨
-    elif trend == "震荡下行":
-        target_change = random.uniform(-5, -2)  # -5%到-2%的下跌
-    elif trend == "箱体震荡":
-        target_change = random.uniform(-3, 3)  # -3%到3%的震荡
-    elif trend == "快速拉升":
-        target_change = random.uniform(5, 10)  # 5%到10%的上涨
-    elif trend == "瞬间拉升":
-        target_change = random.uniform(5, 10)  # 5%到10%的上涨
-    elif trend == "快速下跌":
-        target_change = random.uniform(-10, -5)  # -10%到-5%的下跌
-    elif trend == "瞬间下跌":
-        target_change = random.uniform(-10, -5)  # -10%到-5%的下跌
-    else:
-        target_change = random.uniform(-5, 5)  # -5%到5%的随机
-    
-    print(f"  目标涨跌幅: {target_change:.2f}%")
-    
-    current_price = open_price
-    price_history = [open_price]
-    
-    # 为每分钟生成价格
-    for i, time_str in enumerate(all_times):
-        progress = i / len(all_times)
-        
-        target_price = open_price * (1 + target_change / 100)
-        
-        # 基础波动（0.3%到1%）
-        base_volatility = random.uniform(-1.0, 1.0)
-        
-        # 趋势倾向
-        trend_force = (target_price - current_price) * 0.08
-        
-        # 偶尔的突发波动（5%概率）
-        if random.random() < 0.05:
-            sudden_change = random.uniform(-1.5, 1.5)
-        else:
-            sudden_change = 0
-        
-        # 计算新价格
-        price_change_percent = base_volatility + trend_force / open_price * 100 + sudden_change
-        current_price = current_price * (1 + price_change_percent / 100)
-        
-        # 确保价格在±10%范围内
-        current_price = max(current_price, base_price * 0.9)
-        current_price = min(current_price, base_price * 1.1)
-        
-        minute_prices.append({
-            "time": time_str,
-            "price": round(current_price, 2)
-        })
-    
+
+    print(f"\n添加股票 {code}: {stock['name']}")
+    print(f"  基准价: {stock['base_price']:.2f}, 开盘价: {open_price:.2f}, 趋势: {stock['trend']}")
+    print(f"  目标涨跌幅: {target_change[i]:.2f}%")
+
     # 添加到数据中
     data[code] = {
-        "name": name,
-        "base_price": base_price,
+        "name": stock["name"],
+        "base_price": stock["base_price"],
         "open_price": open_price,
-        "trend": trend,
-        "minute_prices": minute_prices
+        "trend": stock["trend"],
+        "minute_prices": minute_price_list(prices[i])
     }
-    
-    final_price = minute_prices[-1]["price"]
+
+    final_price = prices[i, -1]
     actual_change = (final_price - open_price) / open_price * 100
     print(f"  收盘价: {final_price:.2f}, 实际涨跌幅: {actual_change:.2f}%")
 
 # 保存数据
 print(f"\n保存数据...")
 with open('stock_minute_data.json', 'w', encoding='utf-8') as f:
-    json.dump(data, f, ensure_ascii=False, indent=2)
+    f.write(json.dumps(data, ensure_ascii=False, indent=2))
 
 print(f"完成！共 {len(data)} 只股票")
@@ -0,0 +1,411 @@
+"""
+Flask API 端到端压测
+在子进程中启动 fund_api.py（akshare 替换为本地替身 fake_akshare 或回放录制的 fixture，
+上游耗时和失败由 fund_data_source 注入，分钟数据为 minute_data_generator 生成的模拟数据，
+市场时钟按倍速回放一个交易日），用多个并发客户端按比例混合请求：
+    holdings   GET  /api/fund/holdings
+    prices     POST /api/stock/prices（一只基金的全部持仓股票）
+    history    GET  /api/fund/valuation-history
+    valuations POST /api/funds/valuations（5只基金）
+基金按热度分布（少数基金占大部分请求）。输出每类请求的 p50/p95/p99 延迟、RPS、错误数以及服务进程的内存（RSS），
+可与保存的基准结果比较，超出容差时以非0状态退出。
+基准与机器相关，不提交到仓库：第一次 --check 时把本次结果保存为本机基准；
+基准记录了压测机器和场景，与本次不一致时拒绝比较（退出码2），需要用 --save-baseline 重新生成
+
+用法:
+    python tests_and_examples/benchmark_api.py                              默认场景
+    python tests_and_examples/benchmark_api.py --concurrency 32 --duration 30 --mix holdings=1,prices=4,history=4,valuations=1
+    python tests_and_examples/benchmark_api.py --failure-rate 0.1           10%的上游调用失败
+    python tests_and_examples/benchmark_api.py --fixtures tests_and_examples/fixtures/akshare   回放录制的数据
+    python tests_and_examples/benchmark_api.py --save-baseline              把本次结果保存为基准
+    python tests_and_examples/benchmark_api.py --check                      与基准比较，退化时退出码为1（没有基准时保存本次结果）
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+EXAMPLES_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(EXAMPLES_DIR, '..', 'backend')
+DEFAULT_BASELINE_PATH = os.path.join(EXAMPLES_DIR, 'benchmark_baseline.json')
+
+DEFAULT_MIX = 'holdings=2,prices=4,history=3,valuations=1'
+# 回放的交易日（模拟数据与日期无关，固定日期使结果可复现）
+REPLAY_DATE = '2025-01-15'
+# 基准比较的默认容差：延迟和内存最多变差25%，RPS最多下降25%；p99波动较大，容差加倍
+DEFAULT_TOLERANCE = 0.25
+P99_TOLERANCE_FACTOR = 2
+
+
+def run_server(port):
+    """子进程：替换akshare后启动 fund_api（多线程 werkzeug 服务）"""
+    sys.path.insert(0, EXAMPLES_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    import fake_akshare
+    fake_akshare.install()
+
+    from werkzeug.serving import make_server
+    from fund_api import app
+
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_rss_mb(pid):
+    """进程常驻内存（MB），优先使用psutil，否则读取 /proc；都不可用时返回None"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler(threading.Thread):
+    """定期采样服务进程内存，记录峰值"""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            rss = read_rss_mb(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def parse_mix(mix):
+    """holdings=2,prices=4 -> {'holdings': 2.0, 'prices': 4.0}"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in REQUEST_BUILDERS:
+            raise ValueError(f"未知的请求类型: {name}，可选 {', '.join(REQUEST_BUILDERS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def build_holdings(rng, fund_code, funds):
+    return 'GET', f"/api/fund/holdings?fundCode={fund_code}", None
+
+
+def build_prices(rng, fund_code, funds):
+    import fake_akshare
+    return 'POST', '/api/stock/prices', {'codes': fake_akshare.fund_stock_codes(fund_code)}
+
+
+def build_history(rng, fund_code, funds):
+    return 'GET', f"/api/fund/valuation-history?fundCode={fund_code}", None
+
+
+def build_valuations(rng, fund_code, funds):
+    return 'POST', '/api/funds/valuations', {'fundCodes': [fund_code] + rng.sample(funds, 4)}
+
+
+REQUEST_BUILDERS = {
+    'holdings': build_holdings,
+    'prices': build_prices,
+    'history': build_history,
+    'valuations': build_valuations,
+}
+
+
+def fund_universe(count):
+    """压测使用的基金代码和热度权重（Zipf分布）"""
+    funds = [f"{100001 + i * 7:06d}" for i in range(count)]
+    weights = [1 / (rank + 1) for rank in range(count)]
+    return funds, weights
+
+
+def run_client(base_url, weights, funds, fund_weights, deadline, seed):
+    """一个并发客户端：在截止时间前不断发送请求，返回 [(类型, 耗时秒, 是否成功), ...]"""
+    rng = random.Random(seed)
+    session = requests.Session()
+    names, name_weights = list(weights), list(weights.values())
+    samples = []
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, name_weights)[0]
+        fund_code = rng.choices(funds, fund_weights)[0]
+        method, path, body = REQUEST_BUILDERS[name](rng, fund_code, funds)
+
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body, timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        samples.append((name, time.perf_counter() - start, ok))
+    return samples
+
+
+def run_load(base_url, weights, funds, fund_weights, concurrency, duration, seed):
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(run_client, base_url, weights, funds, fund_weights, deadline, seed + i)
+            for i in range(concurrency)
+        ]
+        return [sample for future in futures for sample in future.result()]
+
+
+def summarize(samples, duration):
+    """按请求类型汇总延迟分位数（毫秒）和吞吐"""
+    def stats(group):
+        latencies = np.array([latency for _, latency, _ in group]) * 1000
+        return {
+            'requests': len(group),
+            'errors': sum(1 for _, _, ok in group if not ok),
+            'rps': round(len(group) / duration, 1),
+            'p50Ms': round(float(np.percentile(latencies, 50)), 2) if len(group) else None,
+            'p95Ms': round(float(np.percentile(latencies, 95)), 2) if len(group) else None,
+            'p99Ms': round(float(np.percentile(latencies, 99)), 2) if len(group) else None,
+        }
+
+    result = {'all': stats(samples)}
+    for name in REQUEST_BUILDERS:
+        group = [sample for sample in samples if sample[0] == name]
+        if group:
+            result[name] = stats(group)
+    return result
+
+
+def print_report(result):
+    print(f"\n{'请求':<12} {'次数':>8} {'错误':>6} {'RPS':>8} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10}")
+    print("-" * 70)
+    for name, stats in result['endpoints'].items():
+        print(f"{name:<12} {stats['requests']:>8} {stats['errors']:>6} {stats['rps']:>8} "
+              f"{stats['p50Ms']:>10} {stats['p95Ms']:>10} {stats['p99Ms']:>10}")
+    rss = result['rssMb']
+    print(f"\n服务进程内存: 启动后 {rss['start']} MB，峰值 {rss['peak']} MB，结束 {rss['end']} MB")
+
+
+def host_info():
+    """压测机器的信息，基准只在同一台机器、同样的环境下才有可比性"""
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpuCount': os.cpu_count(),
+        'python': platform.python_version()
+    }
+
+
+def baseline_mismatch(result, baseline):
+    """基准与本次压测不可比的原因列表：机器或场景不同"""
+    reasons = []
+    for key, label in (('host', '机器'), ('scenario', '场景')):
+        if baseline.get(key) != result[key]:
+            reasons.append(f"{label}不同: 基准 {baseline.get(key)}，本次 {result[key]}")
+    return reasons
+
+
+def save_baseline(result, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"已保存基准: {path}")
+
+
+def compare_with_baseline(result, baseline, tolerance):
+    """返回退化项列表：延迟和内存不得高于基准的 (1+容差) 倍，RPS不得低于基准的 (1-容差) 倍"""
+    latency_tolerances = {'p50Ms': tolerance, 'p95Ms': tolerance, 'p99Ms': tolerance * P99_TOLERANCE_FACTOR}
+    regressions = []
+    for name, base in baseline['endpoints'].items():
+        current = result['endpoints'].get(name)
+        if current is None:
+            continue
+        for key, key_tolerance in latency_tolerances.items():
+            if base.get(key) and current[key] > base[key] * (1 + key_tolerance):
+                regressions.append(f"{name} {key}: {current[key]} > 基准 {base[key]}")
+        if base.get('rps') and current['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name} rps: {current['rps']} < 基准 {base['rps']}")
+        if current['errors'] > base.get('errors', 0):
+            regressions.append(f"{name} errors: {current['errors']} > 基准 {base.get('errors', 0)}")
+
+    base_peak, peak = baseline['rssMb'].get('peak'), result['rssMb']['peak']
+    if base_peak and peak and peak > base_peak * (1 + tolerance):
+        regressions.append(f"RSS峰值: {peak} MB > 基准 {base_peak} MB")
+    return regressions
+
+
+def prepare_data(data_dir, stock_count, seed):
+    """生成模拟分钟数据（二进制格式）"""
+    sys.path.insert(0, EXAMPLES_DIR)
+    from minute_data_generator import generate_universe
+
+    start = time.perf_counter()
+    index = generate_universe(stock_count, seed=seed)
+    index.write_binary(os.path.join(data_dir, 'stock_minute_data.bin'))
+    print(f"生成 {stock_count} 只股票的模拟分钟数据: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def start_server(data_dir, args):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'MINUTE_DATA_DIR': data_dir,
+        'HOLDINGS_STORE_PATH': os.path.join(data_dir, 'holdings_store.db'),
+        'MARKET_REPLAY_MODE': 'accelerated',
+        'MARKET_REPLAY_DATE': REPLAY_DATE,
+        'MARKET_REPLAY_START': args.replay_start,
+        'MARKET_REPLAY_SPEED': str(args.replay_speed),
+        'FAKE_AKSHARE_STOCKS': str(args.stocks),
+        'FUND_DATA_LATENCY': str(args.akshare_latency),
+        'FUND_DATA_FAILURE_RATE': str(args.failure_rate),
+        'FUND_DATA_SEED': str(args.seed),
+    })
+    if args.fixtures:
+        env.update({'FUND_DATA_SOURCE': 'replay', 'FUND_DATA_FIXTURES': os.path.abspath(args.fixtures)})
+    log = open(os.path.join(data_dir, 'server.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务启动失败，日志: {log.name}")
+        try:
+            if requests.get(base_url + '/api/health', timeout=1).status_code == 200:
+                return process, base_url, log
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("服务启动超时")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flask API 端到端压测')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--duration', type=float, default=20, help='计入统计的压测时长（秒）')
+    parser.add_argument('--warmup', type=float, default=3, help='预热时长（秒），不计入统计')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='请求比例')
+    parser.add_argument('--funds', type=int, default=200, help='基金数量')
+    parser.add_argument('--stocks', type=int, default=5000, help='模拟股票数量')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--akshare-latency', type=float, default=0.05, help='每次上游调用注入的耗时（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0, help='上游调用注入失败的比例（0~1）')
+    parser.add_argument('--fixtures', help='回放录制的 akshare fixture 目录，不使用 fake_akshare')
+    parser.add_argument('--replay-start', default='09:30', help='回放开始时间')
+    parser.add_argument('--replay-speed', type=float, default=60, help='回放倍速')
+    parser.add_argument('--output', help='把结果保存为JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='基准结果文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基准')
+    parser.add_argument('--check', action='store_true', help='与基准比较，退化时退出码为1')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='与基准比较的容差')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.serve)
+        return 0
+
+    weights = parse_mix(args.mix)
+    funds, fund_weights = fund_universe(args.funds)
+    sys.path.insert(0, EXAMPLES_DIR)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        prepare_data(data_dir, args.stocks, args.seed)
+        process, base_url, log = start_server(data_dir, args)
+        try:
+            rss_start = read_rss_mb(process.pid)
+            print(f"服务已启动: {base_url}（pid {process.pid}），并发 {args.concurrency}，比例 {weights}")
+
+            run_load(base_url, weights, funds, fund_weights, args.concurrency, args.warmup, args.seed + 10000)
+            sampler = RssSampler(process.pid)
+            sampler.start()
+            samples = run_load(base_url, weights, funds, fund_weights, args.concurrency, args.duration, args.seed)
+            sampler.stop()
+
+            server_stats = requests.get(base_url + '/api/cache/stats', timeout=10).json()
+            rss_end = read_rss_mb(process.pid)
+        finally:
+            process.terminate()
+            process.wait()
+            log.close()
+
+    result = {
+        'scenario': {
+            'concurrency': args.concurrency, 'duration': args.duration, 'mix': weights,
+            'funds': args.funds, 'stocks': args.stocks, 'akshareLatency': args.akshare_latency,
+            'failureRate': args.failure_rate, 'fixtures': args.fixtures
+        },
+        'host': host_info(),
+        'endpoints': summarize(samples, args.duration),
+        'rssMb': {
+            'start': round(rss_start, 1) if rss_start else None,
+            'peak': round(sampler.peak, 1) if sampler.peak else None,
+            'end': round(rss_end, 1) if rss_end else None
+        },
+        'marketClock': server_stats.get('marketClock')
+    }
+    print_report(result)
+    print(f"回放时钟: {result['marketClock']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        save_baseline(result, args.baseline)
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print("没有基准结果，本次结果作为本机基准，之后的 --check 与它比较")
+            save_baseline(result, args.baseline)
+            return 0
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        mismatch = baseline_mismatch(result, baseline)
+        if mismatch:
+            print("\n基准与本次压测不可比，拒绝比较（用 --save-baseline 重新生成本机基准）:")
+            for line in mismatch:
+                print(f"  {line}")
+            return 2
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\n性能退化（容差 {args.tolerance:.0%}）:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n与基准相比没有超过 {args.tolerance:.0%} 的退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+持仓数据转换性能对比：逐行 iterrows vs 整列运算
+用法: python tests_and_examples/benchmark_holdings_normalize.py [每季度持仓数] [季度数] [重复次数]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from holdings_normalize import get_stock_market_code, normalize_holdings
+
+
+def generate_holdings_frame(rows_per_quarter, quarter_count):
+    """生成多季度的模拟持仓数据，包含缺失值和季度间的调仓"""
+    universe = [random.choice(['6', '0', '3', '5', '8', '4']) + f"{i:05d}" for i in range(rows_per_quarter * 2)]
+    frames = []
+    for q in range(quarter_count):
+        codes = random.sample(universe, rows_per_quarter)
+        percents = np.round(np.random.uniform(0.1, 10, rows_per_quarter), 2)
+        percents[np.random.rand(rows_per_quarter) < 0.05] = np.nan
+        frames.append(pd.DataFrame({
+            '序号': range(1, rows_per_quarter + 1),
+            # AkShare返回的代码可能丢失前导0
+            '股票代码': [code.lstrip('0') or '0' for code in codes],
+            '股票名称': [f"股票{code}" for code in codes],
+            '占净值比例': percents,
+            '持股数': np.random.uniform(1e4, 1e7, rows_per_quarter),
+            '持仓市值': np.random.uniform(1e6, 1e9, rows_per_quarter),
+            '季度': f"{2020 + q // 4}年{q % 4 + 1}季度股票投资明细",
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def legacy_normalize_holdings(holdings_df):
+    """原实现：按季度拆分后逐行 iterrows 转换"""
+    latest_quarter_holdings = None
+    previous_quarter_holdings = None
+    quarters = sorted(holdings_df['季度'].unique())
+    if len(quarters) > 0:
+        latest_quarter_holdings = holdings_df[holdings_df['季度'] == quarters[-1]].copy()
+    if len(quarters) > 1:
+        previous_quarter_holdings = holdings_df[holdings_df['季度'] == quarters[-2]].copy()
+
+    prev_hold_percent_map = {}
+    if previous_quarter_holdings is not None:
+        for _, row in previous_quarter_holdings.iterrows():
+            stock_code = str(row['股票代码']).zfill(6)
+            prev_hold_percent_map[stock_code] = row['占净值比例'] if pd.notna(row['占净值比例']) else 0
+
+    holdings = []
+    for _, row in latest_quarter_holdings.iterrows():
+        stock_code = str(row['股票代码']).zfill(6)
+        market = get_stock_market_code(stock_code)
+        current_hold_percent = row['占净值比例'] if pd.notna(row['占净值比例']) else 0
+        prev_hold_percent = prev_hold_percent_map.get(stock_code, 0)
+        holdings.append({
+            'stockCode': f"{stock_code}.{market}",
+            'stockName': row['股票名称'],
+            'shares': row['持股数'] if pd.notna(row['持股数']) else 0,
+            'costPrice': 0,
+            'holdPercent': current_hold_percent,
+            'marketValue': row['持仓市值'] if pd.notna(row['持仓市值']) else 0,
+            'quarter': row['季度'] if '季度' in row else '',
+            'prevHoldPercent': prev_hold_percent,
+            'holdPercentChange': current_hold_percent - prev_hold_percent,
+            'isNew': stock_code not in prev_hold_percent_map
+        })
+    return holdings
+
+
+def benchmark(func, repeat):
+    """返回单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    rows_per_quarter = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    quarter_count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    random.seed(42)
+    np.random.seed(42)
+    holdings_df = generate_holdings_frame(rows_per_quarter, quarter_count)
+
+    print("=" * 60)
+    print(f"持仓转换性能对比：{quarter_count} 个季度 × {rows_per_quarter} 条 = {len(holdings_df)} 行，重复 {repeat} 次")
+    print("=" * 60)
+
+    legacy_ms, legacy_result = benchmark(lambda: legacy_normalize_holdings(holdings_df), repeat)
+    vectorized_ms, (_, vectorized_result) = benchmark(lambda: normalize_holdings(holdings_df), repeat)
+
+    mismatches = sum(1 for a, b in zip(legacy_result, vectorized_result) if a != b)
+    print(f"原实现（iterrows）: {legacy_ms:10.2f} ms")
+    print(f"整列运算          : {vectorized_ms:10.2f} ms")
+    print(f"加速比            : {legacy_ms / vectorized_ms:10.1f}x")
+    print(f"结果一致性        : {len(vectorized_result)} 条，{mismatches} 条不一致")
+
+
+if __name__ == '__main__':
+    main()
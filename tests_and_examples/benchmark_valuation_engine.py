@@ -0,0 +1,137 @@
+"""
+估值曲线计算性能对比：逐分钟Python循环 vs NumPy矩阵引擎
+用法: python tests_and_examples/benchmark_valuation_engine.py [持仓数量] [重复次数]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from minute_data import TRADING_MINUTES, MinuteDataIndex, time_to_slot
+from valuation_engine import compute_valuation_curve
+
+
+def generate_minute_data(stock_codes):
+    """生成随机游走的分钟级模拟数据"""
+    data = {}
+    for code in stock_codes:
+        open_price = random.uniform(5, 200)
+        price = open_price
+        minute_prices = []
+        for time_str in TRADING_MINUTES:
+            price *= 1 + random.uniform(-0.01, 0.01)
+            minute_prices.append({'time': time_str, 'price': round(price, 2)})
+        data[code] = {
+            'name': code,
+            'base_price': open_price,
+            'open_price': open_price,
+            'minute_prices': minute_prices
+        }
+    return data
+
+
+def legacy_valuation_at_time(time_str, holdings, minute_data):
+    """原实现：每个时间点遍历所有持仓，并线性扫描该股票的全部分钟价格"""
+    total_market_value = 0
+    weighted_change = 0
+
+    for holding in holdings:
+        stock_code_simple = holding['stockCode'].replace('.XSHE', '').replace('.XSHG', '').replace('.XBJE', '')
+        market_value = holding['marketValue']
+
+        stock_data = minute_data.get(stock_code_simple, {})
+        minute_prices = stock_data.get('minute_prices', [])
+        open_price = stock_data.get('open_price', stock_data.get('base_price', 100.0))
+
+        current_price = open_price
+        current_change = 0
+        for price_data in minute_prices:
+            if price_data['time'] <= time_str:
+                current_price = price_data['price']
+
+        if open_price > 0:
+            current_change = (current_price - open_price) / open_price * 100
+
+        total_market_value += market_value
+        weighted_change += market_value * current_change
+
+    if total_market_value > 0:
+        return [{'time': time_str, 'changePercent': round(weighted_change / total_market_value, 2)}]
+    return []
+
+
+def legacy_valuation_curve(holdings, minute_data):
+    """原实现：逐分钟计算全天估值曲线"""
+    valuation_history = []
+    for time_str in TRADING_MINUTES:
+        valuation_history.extend(legacy_valuation_at_time(time_str, holdings, minute_data))
+    return valuation_history
+
+
+def benchmark(func, repeat):
+    """返回单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    holding_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    random.seed(42)
+    stock_codes = [f"{600000 + i:06d}" for i in range(holding_count)]
+    minute_data = generate_minute_data(stock_codes)
+    holdings = [
+        {'stockCode': f"{code}.XSHG", 'marketValue': random.uniform(1e6, 1e8)}
+        for code in stock_codes
+    ]
+
+    print("=" * 60)
+    print(f"估值曲线性能对比：{holding_count} 只持仓 × {len(TRADING_MINUTES)} 分钟，重复 {repeat} 次")
+    print("=" * 60)
+
+    legacy_ms, legacy_result = benchmark(lambda: legacy_valuation_curve(holdings, minute_data), repeat)
+    # 分钟索引在服务启动时构建一次，不计入单次请求耗时
+    index_start = time.perf_counter()
+    minute_index = MinuteDataIndex.from_json_data(minute_data)
+    index_ms = (time.perf_counter() - index_start) * 1000
+    engine_ms, engine_result = benchmark(lambda: compute_valuation_curve(holdings, minute_index), repeat)
+
+    mismatches = sum(1 for a, b in zip(legacy_result, engine_result) if a != b)
+    print(f"原实现（Python循环）: {legacy_ms:10.2f} ms/请求")
+    print(f"NumPy引擎          : {engine_ms:10.2f} ms/请求")
+    print(f"加速比             : {legacy_ms / engine_ms:10.1f}x")
+    print(f"结果一致性         : {len(engine_result)} 个点，{mismatches} 个不一致")
+    print(f"分钟索引构建（启动时一次）: {index_ms:.2f} ms")
+
+    # 单只股票报价：线性扫描 vs 分钟下标直接取价
+    query_time = datetime(2026, 2, 9, 14, 30)
+    time_str = query_time.strftime('%H:%M')
+    lookups = repeat * 1000
+
+    def scan_lookup():
+        for code in stock_codes:
+            price = None
+            for price_data in minute_data[code]['minute_prices']:
+                if price_data['time'] <= time_str:
+                    price = price_data['price']
+        return price
+
+    def index_lookup():
+        slot = time_to_slot(query_time)
+        for code in stock_codes:
+            price = minute_index.prices[minute_index.get_row(code), slot]
+        return price
+
+    scan_ms, _ = benchmark(scan_lookup, max(lookups // holding_count, 1))
+    index_lookup_ms, _ = benchmark(index_lookup, max(lookups // holding_count, 1))
+    print(f"单股报价（线性扫描）: {scan_ms / holding_count * 1000:10.2f} us/次")
+    print(f"单股报价（分钟下标）: {index_lookup_ms / holding_count * 1000:10.2f} us/次")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+本地 akshare 替身，供压测使用（不访问网络）
+实现 fund_api.py 用到的两个接口，返回与真实接口同样列名的DataFrame：
+- fund_portfolio_hold_em: 每只基金的持仓由基金代码确定性地生成，股票取自 minute_data_generator 生成的股票集合，
+  包含最近两个季度，季度间部分股票有变动
+- fund_individual_basic_info_xq: 基金名称
+替身本身不耗时，上游耗时和失败由后端 fund_data_source 注入（FUND_DATA_LATENCY、FUND_DATA_FAILURE_RATE）
+
+install() 把本模块注册为 sys.modules['akshare']，须在导入 fund_api 之前调用
+
+可通过环境变量配置：
+    FAKE_AKSHARE_STOCKS    股票集合的大小，应与服务使用的模拟分钟数据一致，默认5000
+    FAKE_AKSHARE_HOLDINGS  每只基金每个季度的持仓数，默认10
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from minute_data_generator import universe_code
+
+FAKE_AKSHARE_STOCKS = int(os.environ.get('FAKE_AKSHARE_STOCKS', 5000))
+FAKE_AKSHARE_HOLDINGS = int(os.environ.get('FAKE_AKSHARE_HOLDINGS', 10))
+
+QUARTERS = ['2季度', '3季度']
+
+
+def fund_stock_codes(fund_code, stock_count=FAKE_AKSHARE_STOCKS, holding_count=FAKE_AKSHARE_HOLDINGS):
+    """基金最新一个季度持有的股票代码（压测客户端也用它构造股票价格请求）"""
+    rng = np.random.default_rng(int(fund_code))
+    picks = rng.choice(stock_count, size=holding_count + 2, replace=False)
+    return [universe_code(i) for i in picks[:holding_count]]
+
+
+def fund_portfolio_hold_em(symbol, date):
+    """基金持仓：最近两个季度，上一季度与最新季度有两只股票不同"""
+    rng = np.random.default_rng(int(symbol))
+    picks = rng.choice(FAKE_AKSHARE_STOCKS, size=FAKE_AKSHARE_HOLDINGS + 2, replace=False)
+    quarter_picks = [picks[2:], picks[:FAKE_AKSHARE_HOLDINGS]]
+
+    rows = []
+    for quarter, stock_rows in zip(QUARTERS, quarter_picks):
+        percents = np.sort(rng.uniform(1, 9, len(stock_rows)))[::-1]
+        for i, (row, percent) in enumerate(zip(stock_rows, percents)):
+            code = universe_code(row)
+            shares = int(rng.integers(10, 500)) * 10000
+            rows.append({
+                '序号': i + 1,
+                '股票代码': code,
+                '股票名称': f"模拟股票{code}",
+                '占净值比例': round(float(percent), 2),
+                '持股数': shares / 10000,
+                '持仓市值': round(shares * float(rng.uniform(5, 100)) / 10000, 2),
+                '季度': f"{date}年{quarter}股票投资明细"
+            })
+    return pd.DataFrame(rows)
+
+
+def fund_individual_basic_info_xq(symbol):
+    """基金基本信息（item/value两列）"""
+    return pd.DataFrame({'item': ['基金代码', '基金名称'], 'value': [symbol, f"模拟基金{symbol}"]})
+
+
+def install():
+    """替换 akshare 模块"""
+    sys.modules['akshare'] = sys.modules[__name__]
@@ -5,15 +5,27 @@
 获取股票的分时数据（开盘价、最高价、最低价、收盘价、成交量等）
 """
 
-import requests
 import json
 import datetime
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from holdings_normalize import get_stock_symbol
+from http_pool import DEFAULT_POOL_SIZE, PooledSession, fetch_all
 
 
 class EastMoneyIntradaySpider:
     """东方财富股票分时数据爬虫"""
 
-    def __init__(self):
+    # 新浪分时数据接口
+    KLINE_URL = "https://quotes.sina.cn/cn/api/json_v2.php/CN_MarketDataService.getKLineData"
+
+    def __init__(self, session=None):
+        """
+        Args:
+            session: 共享的HTTP会话，默认新建带连接池、限速和重试的 PooledSession
+        """
         # 多个备用User-Agent
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -21,7 +33,7 @@ class EastMoneyIntradaySpider:
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0',
         ]
 
-        self.session = requests.Session()
+        self.session = session or PooledSession()
         self._update_headers(0)
 
     def _update_headers(self, index):
@@ -41,7 +53,7 @@ class EastMoneyIntradaySpider:
         Args:
             code: 股票代码 (6位数字)
         Returns:
-            带市场后缀的代码，如 sz000001 或 sh600000
+            带市场前缀的代码，如 sz000001、sh600000、sh510300、bj430047
         """
         code = str(code).strip()
 
@@ -49,14 +61,8 @@ class EastMoneyIntradaySpider:
         if '.' in code:
             return code.lower()
 
-        # 判断市场
-        if code.startswith('6'):
-            return f'sh{code}'  # 上海证券交易所
-        elif code.startswith('0') or code.startswith('3'):
-            return f'sz{code}'  # 深圳证券交易所
-        else:
-            # 默认深圳
-            return f'sz{code}'
+        # 按代码前缀判断交易所，与持仓数据的市场判断一致（沪市基金5开头、北交所4/8/920开头）
+        return get_stock_symbol(code)
 
     def get_intraday_data(self, code, scale=1, datalen=240):
         """
@@ -71,8 +77,7 @@ class EastMoneyIntradaySpider:
         formatted_code = self.format_stock_code(code)
 
         # 构造API URL
-        # 新浪分时数据接口
-        api_url = f"https://quotes.sina.cn/cn/api/json_v2.php/CN_MarketDataService.getKLineData?symbol={formatted_code}&scale={scale}&ma=no&datalen={datalen}"
+        api_url = f"{self.KLINE_URL}?symbol={formatted_code}&scale={scale}&ma=no&datalen={datalen}"
 
         try:
             print(f"正在获取股票 {code} 的分时数据...")
@@ -119,6 +124,15 @@ class EastMoneyIntradaySpider:
             print(f"获取分时数据时出错: {e}")
             return None
 
+    def get_intraday_data_batch(self, codes, scale=1, datalen=240, max_workers=DEFAULT_POOL_SIZE):
+        """
+        并发获取多只股票的分时数据
+        所有线程共用同一个连接池，请求受按主机的限速和连接数上限约束
+        Returns:
+            {股票代码: 分时数据}，获取失败的股票值为None
+        """
+        return fetch_all(lambda code: self.get_intraday_data(code, scale, datalen), codes, max_workers)
+
     def print_intraday_data(self, intraday_data, show_all=False):
         """打印分时数据
 
@@ -5,17 +5,49 @@
 获取股票的详细信息：最新价、均价、涨幅、涨跌、总手、金额、换手、最高、最低、今开、昨收、涨停、跌停
 """
 
-import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 import json
+import os
 import re
+import sys
 import time
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from holdings_normalize import get_stock_symbol
+from hedged_request import SourceScoreboard, hedged_call
+from http_pool import DEFAULT_POOL_SIZE, PooledSession, fetch_all
+
+# 批量查询时每次请求最多包含的股票数（代码放在URL中，过多会超出URL长度限制）
+BATCH_SIZE = 60
+
+# 批量响应中的一行：v_sh600000="...";  /  var hq_str_sh600000="...";
+TENCENT_LINE_PATTERN = re.compile(r'v_((?:sh|sz|bj)\d{6})="([^"]*)"')
+SINA_LINE_PATTERN = re.compile(r'hq_str_((?:sh|sz|bj)\d{6})="([^"]*)"')
+
+# 行情请求的重试次数：一个接口卡住时重试只会成倍拉长查询耗时，由对冲或下一个接口兜底
+QUOTE_RETRIES = 0
+
+# 东方财富接口 secid 中的市场编号
+EASTMONEY_MARKET_IDS = {'sh': 1, 'sz': 0, 'bj': 0}
+
 
 class EastMoneyStockSpider:
     """东方财富股票数据爬虫"""
-    
-    def __init__(self):
+
+    # 行情接口地址，测试时可以指向本地的桩服务
+    TENCENT_URL = "https://qt.gtimg.cn/q="
+    SINA_URL = "https://hq.sinajs.cn/list="
+    EASTMONEY_URL = "https://push2.eastmoney.com/api/qt/stock/get"
+
+    def __init__(self, session=None, hedged=True, hedge_delay=None, retries=QUOTE_RETRIES):
+        """
+        Args:
+            session: 共享的HTTP会话，默认新建带连接池、限速和重试的 PooledSession
+            hedged: 单只股票查询是否使用对冲请求
+            hedge_delay: 固定的对冲等待秒数，默认使用主接口最近的p95耗时
+            retries: 每次行情请求的重试次数，默认不重试（不使用会话的重试设置）
+        """
         # 多个备用User-Agent
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -24,11 +56,25 @@ class EastMoneyStockSpider:
             'Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1',
         ]
 
-        self.session = requests.Session()
+        self.session = session or PooledSession()
         self._update_headers(0)
 
+        # 单只股票的行情接口，按评分排序后请求
+        self.quote_sources = {
+            '腾讯': self.fetch_tencent_quote,
+            '新浪': self.fetch_sina_quote,
+            '东方财富': self.fetch_eastmoney_quote,
+        }
+        self.scoreboard = SourceScoreboard(self.quote_sources)
+        self.hedged = hedged
+        self.hedge_delay = hedge_delay
+        self.retries = retries
+        # 每次查询最多同时请求所有接口，批量查询的逐只回退也会并发调用
+        self._hedge_executor = ThreadPoolExecutor(max_workers=DEFAULT_POOL_SIZE * len(self.quote_sources),
+                                                  thread_name_prefix='quote-hedge')
+
     def _update_headers(self, index):
-        """更新请求头"""
+        """设置会话的默认请求头，只在创建爬虫时调用；之后每次请求的User-Agent通过 _get 传入"""
         self.headers = {
             'User-Agent': self.user_agents[index % len(self.user_agents)],
             'Accept': '*/*',
@@ -44,7 +90,7 @@ class EastMoneyStockSpider:
         Args:
             code: 股票代码 (6位数字)
         Returns:
-            带市场后缀的代码，如 sz000001 或 sh600000
+            带市场前缀的代码，如 sz000001、sh600000、sh510300、bj430047
         """
         code = str(code).strip()
         
@@ -52,205 +98,276 @@ class EastMoneyStockSpider:
         if '.' in code:
             return code.lower()
         
-        # 判断市场
-        if code.startswith('6'):
-            return f'sh{code}'  # 上海证券交易所
-        elif code.startswith('0') or code.startswith('3'):
-            return f'sz{code}'  # 深圳证券交易所
-        else:
-            # 默认深圳
-            return f'sz{code}'
-    
-    def get_stock_data_api(self, code):
+        # 按代码前缀判断交易所，与持仓数据的市场判断一致（沪市基金5开头、北交所4/8/920开头）
+        return get_stock_symbol(code)
+
+    def get_stock_data_api(self, code, hedged=None):
         """
         通过API接口获取股票数据（推荐方法）
+        依次尝试腾讯、新浪、东方财富接口，顺序由各接口最近的耗时和错误率决定；
+        对冲模式下主接口超过其p95耗时仍未返回时，同时请求下一个接口，采用最先返回的有效结果
         Args:
             code: 股票代码
+            hedged: 是否使用对冲请求，默认使用创建爬虫时的设置
         Returns:
             股票数据字典
         """
         formatted_code = self.format_stock_code(code)
         market, stock_code = formatted_code[:2], formatted_code[2:]
+        tasks = {
+            name: (lambda fetch=fetch: fetch(market, stock_code))
+            for name, fetch in self.quote_sources.items()
+        }
 
-        # 多个备用API接口
-        api_urls = [
-            # 接口1：腾讯接口
-            f"https://qt.gtimg.cn/q={market}{stock_code}",
-            # 接口2：新浪接口
-            f"https://hq.sinajs.cn/list={market}{stock_code}",
-            # 接口3：东方财富API
-            f"https://push2.eastmoney.com/api/qt/stock/get?ut=fa5fd1943c7b386f172d6893dbfba10b&invt=2&fltt=2&fields=f43,f44,f45,f46,f47,f48,f49,f50,f51,f52,f57,f58,f60,f107,f116,f117,f152,f162,f168,f169,f170,f174,f175,f184,f204,f205,f208,f209,f210,f211,f212,f213,f214,f215&secid={market}.{stock_code}",
-        ]
-
-        for idx, api_url in enumerate(api_urls):
-            # 每个接口使用不同的User-Agent
-            self._update_headers(idx)
-
-            try:
-                print(f"尝试接口 {idx + 1}...")
-                response = self.session.get(api_url, timeout=10)
-
-                if response.status_code == 200:
-                    # 处理不同的接口格式
-                    if 'push2.eastmoney.com' in api_url:
-                        # 东方财富API
-                        data = response.json()
-
-                        if data and 'data' in data and data['data']:
-                            stock_info = data['data']
-
-                            result = {
-                                '股票代码': stock_code,
-                                '股票名称': stock_info.get('f58', '-'),  # 股票名称
-                                '最新': stock_info.get('f43', '-'),  # 最新价
-                                '今开': stock_info.get('f46', '-'),  # 开盘价
-                                '昨收': stock_info.get('f60', '-'),  # 昨收价
-                                '最高': stock_info.get('f44', '-'),  # 最高价
-                                '最低': stock_info.get('f45', '-'),  # 最低价
-                                '成交量': stock_info.get('f47', '-'),  # 成交量（手）
-                                '成交额': stock_info.get('f48', '-'),  # 成交额（元）
-                                '涨幅': stock_info.get('f170', '-'),  # 涨跌幅
-                                '涨跌': stock_info.get('f169', '-'),  # 涨跌额
-                                '换手': stock_info.get('f168', '-'),  # 换手率
-                                '均价': stock_info.get('f117', '-'),  # 均价
-                                '涨停': stock_info.get('f51', '-'),  # 涨停价
-                                '跌停': stock_info.get('f52', '-'),  # 跌停价
-                                '总手': stock_info.get('f47', '-'),  # 总手
-                                '金额': stock_info.get('f48', '-'),  # 金额
-                            }
-
-                            return self._format_result(result)
-
-                    elif 'gtimg.cn' in api_url:
-                        # 腾讯接口
-                        content = response.text.strip()
-                        if content and '=' in content:
-                            data_str = content.split('=')[1].strip('";')
-                            if data_str and '~' in data_str:
-                                values = data_str.split('~')
-                                # 腾讯接口字段索引说明：
-                                # 0: 股票ID, 1: 股票名称, 2: 股票代码, 3: 最新价, 4: 昨收, 5: 今开, 6: 成交量(股)
-                                # 31: 涨跌, 32: 涨幅(%), 33: 最高, 34: 最低
-                                # 35: 格式为"最新价/成交量/成交额"或空
-                                # 36: 成交量, 37: 成交额(万元), 38: 换手率(%)
-                                if len(values) > 40 and values[3]:  # 确保有价格数据
-                                    latest_price = float(values[3])
-                                    pre_close = float(values[4]) if values[4] else latest_price
-                                    volume = float(values[6]) if values[6] else 0
-
-                                    # 解析成交额 - 从索引35或索引57
-                                    amount = 0
-                                    if values[35] and '/' in values[35]:
-                                        parts = values[35].split('/')
-                                        if len(parts) >= 3:
-                                            amount = float(parts[2]) if parts[2] else 0
-                                    elif values[57]:
-                                        amount = float(values[57]) * 10000 if values[57] else 0  # 转换为元
-
-                                    # 计算均价
-                                    avg_price = round(amount / volume / 100, 2) if volume > 0 and amount > 0 else latest_price
-
-                                    result = {
-                                        '股票代码': stock_code,
-                                        '股票名称': values[1],
-                                        '最新': latest_price,
-                                        '今开': float(values[5]) if values[5] else '-',
-                                        '昨收': pre_close,
-                                        '最高': float(values[33]) if values[33] else '-',
-                                        '最低': float(values[34]) if values[34] else '-',
-                                        '成交量': volume,
-                                        '成交额': amount,
-                                        '涨幅': float(values[32]) if values[32] and values[32] != '' else '-',
-                                        '涨跌': round(latest_price - pre_close, 2),
-                                        '换手': float(values[38]) if values[38] and values[38] != '' else '-',
-                                        '均价': avg_price,
-                                        '涨停': round(pre_close * 1.1, 2),
-                                        '跌停': round(pre_close * 0.9, 2),
-                                        '总手': volume,
-                                        '金额': f"{amount / 100000000:.2f}亿" if amount > 0 else '0.00亿',
-                                    }
-                                    return result
-
-                    elif 'sinajs.cn' in api_url:
-                        # 新浪接口
-                        content = response.text.strip()
-                        if content and '=' in content:
-                            # 去除空行和空格
-                            content = content.replace('\r\n', '').replace('\n', '')
-                            if '"' in content:
-                                data_str = content.split('"')[1]
-                                if data_str and ',' in data_str:
-                                    values = data_str.split(',')
-                                    # 新浪接口字段索引：
-                                    # 0: 股票名称, 1: 开盘价, 2: 昨收价, 3: 最新价, 4: 最高价, 5: 最低价,
-                                    # 6: 买一, 7: 卖一, 8: 成交量(股), 9: 成交额(元)
-                                    if len(values) > 30 and values[3]:
-                                        try:
-                                            latest_price = float(values[3])
-                                            pre_close = float(values[2]) if values[2] else latest_price
-                                            volume = float(values[8]) if values[8] else 0
-                                            amount = float(values[9]) if values[9] else 0
-
-                                            # 计算均价
-                                            avg_price = round(amount / (volume / 100) / 10000, 2) if volume > 0 and amount > 0 else latest_price
-
-                                            result = {
-                                                '股票代码': stock_code,
-                                                '股票名称': values[0],
-                                                '最新': latest_price,
-                                                '今开': float(values[1]) if values[1] else '-',
-                                                '昨收': pre_close,
-                                                '最高': float(values[4]) if values[4] else '-',
-                                                '最低': float(values[5]) if values[5] else '-',
-                                                '成交量': volume / 100,  # 转换为手
-                                                '成交额': amount,
-                                                '涨幅': round((latest_price - pre_close) / pre_close * 100, 2) if pre_close > 0 else '-',
-                                                '涨跌': round(latest_price - pre_close, 2),
-                                                '换手': '-',
-                                                '均价': avg_price,
-                                                '涨停': round(pre_close * 1.1, 2),
-                                                '跌停': round(pre_close * 0.9, 2),
-                                                '总手': volume / 100,
-                                                '金额': f"{amount / 100000000:.2f}亿" if amount > 0 else '0.00亿',
-                                            }
-                                            return result
-                                        except ValueError as e:
-                                            print(f"解析新浪数据出错: {e}")
-                                            continue
-
-            except Exception as e:
-                print(f"接口 {idx + 1} 出错: {e}")
-                continue
+        if self.hedged if hedged is None else hedged:
+            source, result = hedged_call(tasks, self.scoreboard, self._hedge_executor, self.hedge_delay)
+            if result is not None:
+                return result
+        else:
+            for name in self.scoreboard.ranked():
+                print(f"尝试{name}接口...")
+                start = time.perf_counter()
+                try:
+                    result = tasks[name]()
+                except Exception as e:
+                    print(f"{name}接口出错: {e}")
+                    result = None
+                self.scoreboard.record(name, time.perf_counter() - start, result is not None)
+                if result is not None:
+                    self.scoreboard.record_win(name)
+                    return result
 
         print("所有接口都尝试失败")
         return None
 
-    def _format_result(self, result):
-        """格式化返回结果"""
-        # 转换单位和格式
-        if result['最新'] != '-':
-            result['最新'] = round(result['最新'] / 100, 2)
-        if result['今开'] != '-':
-            result['今开'] = round(result['今开'] / 100, 2)
-        if result['昨收'] != '-':
-            result['昨收'] = round(result['昨收'] / 100, 2)
-        if result['最高'] != '-':
-            result['最高'] = round(result['最高'] / 100, 2)
-        if result['最低'] != '-':
-            result['最低'] = round(result['最低'] / 100, 2)
-        if result['均价'] != '-':
-            result['均价'] = round(result['均价'] / 100, 2)
-        if result['涨停'] != '-':
-            result['涨停'] = round(result['涨停'] / 100, 2)
-        if result['跌停'] != '-':
-            result['跌停'] = round(result['跌停'] / 100, 2)
-        if result['涨跌'] != '-':
-            result['涨跌'] = round(result['涨跌'] / 100, 2)
-        if result['涨幅'] != '-':
-            result['涨幅'] = round(result['涨幅'] / 100, 2)
-        if result['换手'] != '-':
-            result['换手'] = round(result['换手'] / 100, 2)
+    def _get(self, url, index):
+        """请求接口，每个接口使用不同的User-Agent（按请求传入，不修改共享会话的请求头）"""
+        return self.session.get(url, timeout=10, retries=self.retries,
+                                headers={'User-Agent': self.user_agents[index % len(self.user_agents)]})
+
+    def fetch_tencent_quote(self, market, stock_code):
+        """腾讯接口查询一只股票"""
+        response = self._get(f"{self.TENCENT_URL}{market}{stock_code}", 0)
+        if response.status_code != 200:
+            return None
+        content = response.text.strip()
+        if content and '=' in content:
+            data_str = content.split('=')[1].strip('";')
+            return self.parse_tencent_values(stock_code, data_str)
+        return None
 
+    def fetch_sina_quote(self, market, stock_code):
+        """新浪接口查询一只股票"""
+        response = self._get(f"{self.SINA_URL}{market}{stock_code}", 1)
+        if response.status_code != 200:
+            return None
+        content = response.text.strip()
+        if content and '=' in content:
+            # 去除空行和空格
+            content = content.replace('\r\n', '').replace('\n', '')
+            if '"' in content:
+                return self.parse_sina_values(stock_code, content.split('"')[1])
+        return None
+
+    def fetch_eastmoney_quote(self, market, stock_code):
+        """东方财富接口查询一只股票"""
+        secid = f"{EASTMONEY_MARKET_IDS.get(market, 0)}.{stock_code}"
+        response = self._get(f"{self.EASTMONEY_URL}?ut=fa5fd1943c7b386f172d6893dbfba10b&invt=2&fltt=2&fields=f43,f44,f45,f46,f47,f48,f49,f50,f51,f52,f57,f58,f60,f107,f116,f117,f152,f162,f168,f169,f170,f174,f175,f184,f204,f205,f208,f209,f210,f211,f212,f213,f214,f215&secid={secid}", 2)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if not data or not data.get('data'):
+            return None
+        stock_info = data['data']
+
+        result = {
+            '股票代码': stock_code,
+            '股票名称': stock_info.get('f58', '-'),  # 股票名称
+            '最新': stock_info.get('f43', '-'),  # 最新价
+            '今开': stock_info.get('f46', '-'),  # 开盘价
+            '昨收': stock_info.get('f60', '-'),  # 昨收价
+            '最高': stock_info.get('f44', '-'),  # 最高价
+            '最低': stock_info.get('f45', '-'),  # 最低价
+            '成交量': stock_info.get('f47', '-'),  # 成交量（手）
+            '成交额': stock_info.get('f48', '-'),  # 成交额（元）
+            '涨幅': stock_info.get('f170', '-'),  # 涨跌幅
+            '涨跌': stock_info.get('f169', '-'),  # 涨跌额
+            '换手': stock_info.get('f168', '-'),  # 换手率
+            '均价': stock_info.get('f117', '-'),  # 均价
+            '涨停': stock_info.get('f51', '-'),  # 涨停价
+            '跌停': stock_info.get('f52', '-'),  # 跌停价
+            '总手': stock_info.get('f47', '-'),  # 总手
+            '金额': stock_info.get('f48', '-'),  # 金额
+        }
+        return self._format_result(result)
+
+    def source_stats(self):
+        """各行情接口的请求数、错误率、耗时和对冲次数"""
+        return self.scoreboard.stats()
+
+    def parse_tencent_values(self, stock_code, data_str):
+        """
+        解析腾讯接口一只股票的数据（引号内以~分隔的字段）
+        Returns:
+            股票数据字典，没有价格数据时返回None
+        """
+        if not data_str or '~' not in data_str:
+            return None
+
+        values = data_str.split('~')
+        # 腾讯接口字段索引说明：
+        # 0: 股票ID, 1: 股票名称, 2: 股票代码, 3: 最新价, 4: 昨收, 5: 今开, 6: 成交量(股)
+        # 31: 涨跌, 32: 涨幅(%), 33: 最高, 34: 最低
+        # 35: 格式为"最新价/成交量/成交额"或空
+        # 36: 成交量, 37: 成交额(万元), 38: 换手率(%)
+        if len(values) <= 40 or not values[3]:  # 确保有价格数据
+            return None
+
+        latest_price = float(values[3])
+        pre_close = float(values[4]) if values[4] else latest_price
+        volume = float(values[6]) if values[6] else 0
+
+        # 解析成交额 - 从索引35或索引57
+        amount = 0
+        if values[35] and '/' in values[35]:
+            parts = values[35].split('/')
+            if len(parts) >= 3:
+                amount = float(parts[2]) if parts[2] else 0
+        elif values[57]:
+            amount = float(values[57]) * 10000 if values[57] else 0  # 转换为元
+
+        # 计算均价
+        avg_price = round(amount / volume / 100, 2) if volume > 0 and amount > 0 else latest_price
+
+        return {
+            '股票代码': stock_code,
+            '股票名称': values[1],
+            '最新': latest_price,
+            '今开': float(values[5]) if values[5] else '-',
+            '昨收': pre_close,
+            '最高': float(values[33]) if values[33] else '-',
+            '最低': float(values[34]) if values[34] else '-',
+            '成交量': volume,
+            '成交额': amount,
+            '涨幅': float(values[32]) if values[32] and values[32] != '' else '-',
+            '涨跌': round(latest_price - pre_close, 2),
+            '换手': float(values[38]) if values[38] and values[38] != '' else '-',
+            '均价': avg_price,
+            '涨停': round(pre_close * 1.1, 2),
+            '跌停': round(pre_close * 0.9, 2),
+            '总手': volume,
+            '金额': f"{amount / 100000000:.2f}亿" if amount > 0 else '0.00亿',
+        }
+
+    def parse_sina_values(self, stock_code, data_str):
+        """
+        解析新浪接口一只股票的数据（引号内以,分隔的字段）
+        Returns:
+            股票数据字典，没有价格数据时返回None
+        """
+        if not data_str or ',' not in data_str:
+            return None
+
+        values = data_str.split(',')
+        # 新浪接口字段索引：
+        # 0: 股票名称, 1: 开盘价, 2: 昨收价, 3: 最新价, 4: 最高价, 5: 最低价,
+        # 6: 买一, 7: 卖一, 8: 成交量(股), 9: 成交额(元)
+        if len(values) <= 30 or not values[3]:
+            return None
+
+        latest_price = float(values[3])
+        pre_close = float(values[2]) if values[2] else latest_price
+        volume = float(values[8]) if values[8] else 0
+        amount = float(values[9]) if values[9] else 0
+
+        # 计算均价
+        avg_price = round(amount / (volume / 100) / 10000, 2) if volume > 0 and amount > 0 else latest_price
+
+        return {
+            '股票代码': stock_code,
+            '股票名称': values[0],
+            '最新': latest_price,
+            '今开': float(values[1]) if values[1] else '-',
+            '昨收': pre_close,
+            '最高': float(values[4]) if values[4] else '-',
+            '最低': float(values[5]) if values[5] else '-',
+            '成交量': volume / 100,  # 转换为手
+            '成交额': amount,
+            '涨幅': round((latest_price - pre_close) / pre_close * 100, 2) if pre_close > 0 else '-',
+            '涨跌': round(latest_price - pre_close, 2),
+            '换手': '-',
+            '均价': avg_price,
+            '涨停': round(pre_close * 1.1, 2),
+            '跌停': round(pre_close * 0.9, 2),
+            '总手': volume / 100,
+            '金额': f"{amount / 100000000:.2f}亿" if amount > 0 else '0.00亿',
+        }
+
+    def get_stock_data_batch(self, codes, batch_size=BATCH_SIZE, max_workers=DEFAULT_POOL_SIZE):
+        """
+        批量获取多只股票的数据
+        腾讯和新浪接口都支持一次查询多只股票（代码以逗号分隔），每批只发一次请求：
+        先用腾讯接口批量查询，未取到的再用新浪接口批量查询，
+        两个批量接口都没有取到的股票才逐只调用 get_stock_data_api
+        同一接口的多个批次以及逐只查询都通过线程池并发请求
+        Args:
+            codes: 股票代码列表
+            batch_size: 每次请求最多包含的股票数
+            max_workers: 并发请求数
+        Returns:
+            {股票代码: 股票数据字典}，所有接口都失败的股票值为None
+        """
+        # 带市场前缀的代码 -> 调用方传入的代码
+        pending = {}
+        for code in codes:
+            pending.setdefault(self.format_stock_code(code), code)
+        results = {}
+
+        batch_sources = [
+            ('腾讯', self.TENCENT_URL, TENCENT_LINE_PATTERN, self.parse_tencent_values),
+            ('新浪', self.SINA_URL, SINA_LINE_PATTERN, self.parse_sina_values),
+        ]
+        for idx, (source_name, base_url, line_pattern, parse_values) in enumerate(batch_sources):
+            if not pending:
+                break
+            symbols = list(pending)
+            chunks = [tuple(symbols[start:start + batch_size]) for start in range(0, len(symbols), batch_size)]
+
+            def fetch_chunk(chunk):
+                print(f"{source_name}接口批量查询 {len(chunk)} 只股票...")
+                response = self._get(base_url + ','.join(chunk), idx)
+                if response.status_code != 200:
+                    print(f"{source_name}接口请求失败，状态码: {response.status_code}")
+                    return None
+                return response.text
+
+            for text in fetch_all(fetch_chunk, chunks, max_workers).values():
+                if not text:
+                    continue
+                # 一次遍历解析多行响应，每行一只股票
+                for symbol, data_str in line_pattern.findall(text):
+                    if symbol not in pending:
+                        continue
+                    try:
+                        result = parse_values(symbol[2:], data_str)
+                    except ValueError as e:
+                        print(f"解析{source_name}数据出错 {symbol}: {e}")
+                        continue
+                    if result:
+                        results[pending.pop(symbol)] = result
+
+        # 批量接口都没有取到的股票逐只查询
+        if pending:
+            print(f"批量接口未取到 {len(pending)} 只股票，逐只查询...")
+            results.update(fetch_all(self.get_stock_data_api, pending.values(), max_workers))
+
+        return results
+
+    def _format_result(self, result):
+        """
+        格式化返回结果
+        请求参数 fltt=2 时接口直接返回小数形式的价格和百分比（如 f43=10.5、f170=5.0），不需要再换算
+        """
         # 转换成交额单位
         if result['成交额'] != '-':
             amount = result['成交额'] / 100000000  # 转换为亿元
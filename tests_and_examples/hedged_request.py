@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多数据源对冲请求
+- SourceScoreboard: 记录每个数据源最近的耗时和成败，按“健康优先、耗时越短越靠前”排序，
+  最快的健康数据源自动成为主数据源
+- hedged_call: 先请求主数据源，超过它的p95耗时仍没有结果（或已失败）就再请求下一个数据源，
+  采用最先返回的有效结果；落选请求结束后同样计入评分
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+import threading
+import time
+
+# 每个数据源保留的最近请求数
+SCORE_WINDOW = 50
+# 样本不足时使用的对冲等待时间，以及对冲等待时间的上下限（秒）
+DEFAULT_HEDGE_DELAY = 0.5
+MIN_HEDGE_DELAY = 0.05
+MAX_HEDGE_DELAY = 2.0
+# 估算p95至少需要的样本数
+MIN_SAMPLES = 5
+# 错误率超过该值的数据源视为不健康，排到健康数据源之后
+UNHEALTHY_ERROR_RATE = 0.5
+# 排序时失败请求按该耗时计入（秒），与行情接口的请求超时一致：快速失败的数据源不会因为耗时短而排到前面
+FAILURE_LATENCY = 10.0
+
+
+def percentile(values, pct):
+    """最近样本的分位数（取最接近的样本）"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class SourceScore:
+    """一个数据源最近 SCORE_WINDOW 次请求的耗时和成败"""
+
+    def __init__(self, window=SCORE_WINDOW, failure_latency=FAILURE_LATENCY):
+        self.failure_latency = failure_latency
+        self.latencies = deque(maxlen=window)
+        # 排序用的耗时，失败请求按 failure_latency 计入
+        self.ranking_latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def expected_latency(self):
+        """
+        用于排序的耗时：最近请求的平均耗时，失败请求按 failure_latency 计入，
+        即平均要等多久才能拿到可用结果；没有样本时为0，让新数据源有机会被尝试
+        """
+        if not self.ranking_latencies:
+            return 0.0
+        return sum(self.ranking_latencies) / len(self.ranking_latencies)
+
+    def record(self, latency, ok):
+        self.requests += 1
+        self.latencies.append(latency)
+        self.ranking_latencies.append(latency if ok else max(latency, self.failure_latency))
+        self.outcomes.append(ok)
+        if not ok:
+            self.errors += 1
+
+
+class SourceScoreboard:
+    """线程安全的数据源评分表"""
+
+    def __init__(self, sources, window=SCORE_WINDOW, failure_latency=FAILURE_LATENCY):
+        self._order = list(sources)
+        self._scores = {name: SourceScore(window, failure_latency) for name in self._order}
+        self._lock = threading.Lock()
+        self.hedges = 0
+
+    def record(self, name, latency, ok):
+        with self._lock:
+            self._scores[name].record(latency, ok)
+
+    def record_win(self, name):
+        with self._lock:
+            self._scores[name].wins += 1
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedges += 1
+
+    def ranked(self):
+        """数据源排序：健康的在前，同样健康时耗时短的在前，其余保持配置顺序"""
+        with self._lock:
+            return sorted(self._order, key=lambda name: (
+                self._scores[name].error_rate() > UNHEALTHY_ERROR_RATE,
+                self._scores[name].expected_latency()
+            ))
+
+    def hedge_delay(self, name):
+        """数据源的p95耗时，作为等待它多久后发起对冲请求"""
+        with self._lock:
+            latencies = self._scores[name].latencies
+            if len(latencies) < MIN_SAMPLES:
+                return DEFAULT_HEDGE_DELAY
+            return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, percentile(latencies, 95)))
+
+    def stats(self):
+        with self._lock:
+            sources = {}
+            for name in self._order:
+                score = self._scores[name]
+                sources[name] = {
+                    'requests': score.requests,
+                    'errors': score.errors,
+                    'wins': score.wins,
+                    'errorRate': round(score.error_rate(), 3),
+                    'p50Ms': round(percentile(score.latencies, 50) * 1000, 1) if score.latencies else None,
+                    'p95Ms': round(percentile(score.latencies, 95) * 1000, 1) if score.latencies else None
+                }
+            return {'hedges': self.hedges, 'sources': sources}
+
+
+def hedged_call(tasks, scoreboard, executor, hedge_delay=None):
+    """
+    对冲执行多个等价的数据源请求
+    Args:
+        tasks: {数据源名称: 无参函数}，函数返回None或抛出异常视为失败
+        scoreboard: SourceScoreboard，决定请求顺序并记录结果
+        executor: 执行请求的线程池
+        hedge_delay: 固定的对冲等待秒数，默认使用当前数据源的p95耗时
+    Returns:
+        (数据源名称, 结果)，全部失败时为 (None, None)
+    """
+    def run(name, func):
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            print(f"数据源 {name} 出错: {e}")
+            result = None
+        scoreboard.record(name, time.perf_counter() - start, result is not None)
+        return result
+
+    queue = [name for name in scoreboard.ranked() if name in tasks]
+    running = {}
+    delay = None
+    while queue or running:
+        if queue:
+            name = queue.pop(0)
+            if running:
+                scoreboard.record_hedge()
+            running[executor.submit(run, name, tasks[name])] = name
+            delay = hedge_delay if hedge_delay is not None else scoreboard.hedge_delay(name)
+
+        # 等待任一请求结束；还有备选数据源时最多等待 delay 秒就发起对冲请求
+        while running:
+            done, _ = wait(running, timeout=delay if queue else None, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                name = running.pop(future)
+                result = future.result()
+                if result is not None:
+                    scoreboard.record_win(name)
+                    return name, result
+            # 有请求失败：立即尝试下一个数据源
+            if queue:
+                break
+
+    return None, None
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+爬虫共用的HTTP连接池、限速和重试
+- PooledSession: 复用连接的 requests.Session，每个主机的连接数有上限，
+  每次请求前按主机从令牌桶取令牌限速，网络错误和429/5xx按带抖动的指数退避重试，
+  重试次数可以按请求指定（retries=），对延迟敏感的调用可以不重试
+- fetch_all: 用线程池并发执行抓取函数，单个失败不影响其他
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 默认参数：每个主机每秒最多10个请求、突发20个、最多8个并发连接
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
+DEFAULT_POOL_SIZE = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 8.0
+
+# 需要重试的状态码：限流和服务端错误
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """线程安全的令牌桶：平均每秒 rate 个令牌，最多积攒 capacity 个"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，没有令牌时等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF, cap=DEFAULT_MAX_BACKOFF):
+    """第 attempt 次重试前的等待时间：指数退避 + 全抖动，避免大量请求同时重试"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class PooledSession(requests.Session):
+    """带连接池上限、按主机限速和重试的 Session，可在多个线程间共享"""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, pool_size=DEFAULT_POOL_SIZE,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+        # pool_block=True：某个主机的连接都在使用时等待空闲连接，而不是新建连接
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size, pool_block=True)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+        self.requests_sent = 0
+        self.retried = 0
+        self.throttled_seconds = 0.0
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def request(self, method, url, *args, retries=None, **kwargs):
+        """retries: 本次请求的最多重试次数，默认使用创建会话时的设置"""
+        retries = self.retries if retries is None else retries
+        bucket = self._bucket(url)
+        for attempt in range(retries + 1):
+            waited = bucket.acquire()
+            with self._buckets_lock:
+                self.requests_sent += 1
+                self.throttled_seconds += waited
+
+            try:
+                response = super().request(method, url, *args, **kwargs)
+                if response.status_code not in RETRY_STATUS or attempt == retries:
+                    return response
+                reason = f"状态码 {response.status_code}"
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == retries:
+                    raise
+                reason = type(e).__name__
+
+            with self._buckets_lock:
+                self.retried += 1
+            delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+            print(f"请求失败（{reason}），{delay:.2f} 秒后第 {attempt + 1} 次重试: {url}")
+            time.sleep(delay)
+
+    def stats(self):
+        """请求统计"""
+        with self._buckets_lock:
+            return {
+                'requestsSent': self.requests_sent,
+                'retried': self.retried,
+                'throttledSeconds': round(self.throttled_seconds, 2)
+            }
+
+
+def fetch_all(func, items, max_workers=DEFAULT_POOL_SIZE):
+    """
+    并发执行 func(item)
+    Returns:
+        {item: 结果}，抛出异常的项结果为None
+    """
+    def run(item):
+        try:
+            return func(item)
+        except Exception as e:
+            print(f"抓取 {item} 失败: {e}")
+            return None
+
+    items = list(dict.fromkeys(items))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='spider') as executor:
+        return dict(zip(items, executor.map(run, items)))
@@ -0,0 +1,179 @@
+"""
+模拟分钟数据生成器（NumPy向量化）
+所有股票的242个分钟价格一次生成为 (股票数 × 242) 矩阵：
+随机波动和突发波动一次性抽样，逐分钟迭代时对所有股票同时计算趋势拉力和±10%涨跌停限制，
+时间标签使用 minute_data.TRADING_MINUTES，不再为每只股票重新生成
+
+价格模型与原先逐只生成的脚本一致，每分钟：
+    涨跌幅(%) = U(-1, 1) + 8 × (目标价 - 当前价) / 开盘价 + 突发波动(5%概率 U(-1.5, 1.5))
+    价格限制在昨收的 ±10% 以内
+
+用法:
+    python minute_data_generator.py 5000                         生成5000只股票的测试数据（stock_minute_data.json）
+    python minute_data_generator.py 5000 --seed 1 --output x.json --binary x.bin
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from minute_data import MINUTES_PER_DAY, TRADING_MINUTES, MinuteDataIndex
+
+# 各趋势的目标涨跌幅区间（%），未知趋势使用 DEFAULT_TARGET_RANGE
+TREND_TARGET_RANGES = {
+    '震荡上行': (2, 5),
+    '震荡下行': (-5, -2),
+    '箱体震荡': (-3, 3),
+    '快速拉升': (5, 10),
+    '瞬间拉升': (5, 10),
+    '快速下跌': (-10, -5),
+    '瞬间下跌': (-10, -5),
+}
+DEFAULT_TARGET_RANGE = (-5, 5)
+TRENDS = list(TREND_TARGET_RANGES)
+
+# 每分钟基础波动（%）、突发波动的概率和幅度（%）、趋势拉力系数、涨跌停幅度
+BASE_VOLATILITY = 1.0
+SUDDEN_PROBABILITY = 0.05
+SUDDEN_VOLATILITY = 1.5
+TREND_PULL = 0.08
+LIMIT_RATIO = 0.1
+
+# 生成测试股票代码时使用的两位前缀（沪市主板、深市主板、创业板、科创板），后接4位序号，
+# 每个前缀最多 UNIVERSE_CODES_PER_PREFIX 只，保证都是6位代码且不重复
+UNIVERSE_PREFIXES = ['60', '00', '30', '68']
+UNIVERSE_CODES_PER_PREFIX = 9999
+UNIVERSE_CAPACITY = len(UNIVERSE_PREFIXES) * UNIVERSE_CODES_PER_PREFIX
+
+
+def target_changes(trends, rng):
+    """按趋势抽取每只股票的目标涨跌幅（%）"""
+    ranges = np.array([TREND_TARGET_RANGES.get(trend, DEFAULT_TARGET_RANGE) for trend in trends], dtype=float)
+    if len(ranges) == 0:
+        return np.empty(0)
+    return rng.uniform(ranges[:, 0], ranges[:, 1])
+
+
+def generate_price_paths(base_prices, open_prices, trends, rng=None, seed=None):
+    """
+    生成所有股票的分钟价格
+    Args:
+        base_prices: 昨收价数组，决定涨跌停价格
+        open_prices: 开盘价数组
+        trends: 每只股票的趋势名称
+        rng: numpy Generator，不传时用 seed 创建
+    Returns:
+        (prices, target_change)：形状 (股票数, 242) 的价格矩阵（保留两位小数）和目标涨跌幅数组
+    """
+    rng = rng or np.random.default_rng(seed)
+    base_prices = np.asarray(base_prices, dtype=float)
+    open_prices = np.asarray(open_prices, dtype=float)
+    count = len(base_prices)
+
+    change = target_changes(trends, rng)
+    target_prices = open_prices * (1 + change / 100)
+    pull = TREND_PULL / open_prices
+    # 涨跌停价与交易所一样保留两位小数，四舍五入后的价格不会越过涨跌停
+    lower = np.round(base_prices * (1 - LIMIT_RATIO), 2)
+    upper = np.round(base_prices * (1 + LIMIT_RATIO), 2)
+
+    # 与趋势无关的随机部分一次抽样，单位换算为比例
+    shape = (count, MINUTES_PER_DAY)
+    shocks = rng.uniform(-BASE_VOLATILITY, BASE_VOLATILITY, shape)
+    sudden = rng.random(shape) < SUDDEN_PROBABILITY
+    shocks[sudden] += rng.uniform(-SUDDEN_VOLATILITY, SUDDEN_VOLATILITY, int(sudden.sum()))
+    shocks /= 100
+
+    # 趋势拉力取决于上一分钟的价格，按分钟迭代，每步同时计算所有股票
+    prices = np.empty(shape)
+    current = open_prices.copy()
+    for slot in range(MINUTES_PER_DAY):
+        current *= 1 + shocks[:, slot] + (target_prices - current) * pull
+        np.clip(current, lower, upper, out=current)
+        prices[:, slot] = current
+
+    return np.round(prices, 2), change
+
+
+def minute_price_list(row):
+    """价格行 -> [{'time': 'HH:MM', 'price': x}, ...]"""
+    return [{'time': time_str, 'price': price} for time_str, price in zip(TRADING_MINUTES, row.tolist())]
+
+
+def universe_code(i):
+    """测试股票集合中第i只股票的代码（前缀轮流使用）"""
+    if not 0 <= i < UNIVERSE_CAPACITY:
+        raise ValueError(f"测试股票集合最多 {UNIVERSE_CAPACITY} 只，第 {i} 只超出范围")
+    return f"{UNIVERSE_PREFIXES[i % len(UNIVERSE_PREFIXES)]}{i // len(UNIVERSE_PREFIXES) + 1:04d}"
+
+
+def generate_universe(count, seed=None):
+    """
+    生成测试用的股票集合
+    Returns:
+        MinuteDataIndex，可以直接交给估值引擎，或通过 write_binary 写成二进制文件；
+        trends 属性为每只股票的趋势
+    """
+    if count > UNIVERSE_CAPACITY:
+        raise ValueError(f"测试股票集合最多 {UNIVERSE_CAPACITY} 只，请求了 {count} 只")
+    rng = np.random.default_rng(seed)
+    codes = [universe_code(i) for i in range(count)]
+    names = [f"模拟股票{code}" for code in codes]
+    trends = [TRENDS[i] for i in rng.integers(0, len(TRENDS), count)]
+
+    base_prices = np.round(np.maximum(rng.lognormal(np.log(30), 0.8, count), 2.0), 2)
+    open_prices = np.round(base_prices * rng.uniform(0.98, 1.02, count), 2)
+    prices, _ = generate_price_paths(base_prices, open_prices, trends, rng)
+
+    index = MinuteDataIndex(codes, names, base_prices, open_prices, prices)
+    index.trends = trends
+    return index
+
+
+def index_to_json_data(index):
+    """转换为 stock_minute_data.json 的格式"""
+    trends = getattr(index, 'trends', None) or [None] * len(index.codes)
+    data = {}
+    for row, code in enumerate(index.codes):
+        entry = {
+            'name': index.names[row],
+            'base_price': float(index.base_prices[row]),
+            'open_price': float(index.open_prices[row]),
+            'minute_prices': minute_price_list(index.prices[row])
+        }
+        if trends[row]:
+            entry['trend'] = trends[row]
+        data[code] = entry
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成模拟分钟数据')
+    parser.add_argument('count', type=int, help='股票数量')
+    parser.add_argument('--seed', type=int, help='随机种子，相同种子生成相同数据')
+    parser.add_argument('--output', default='stock_minute_data.json', help='输出的JSON文件')
+    parser.add_argument('--binary', help='同时输出二进制文件')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = generate_universe(args.count, seed=args.seed)
+    generate_ms = (time.perf_counter() - start) * 1000
+    print(f"生成 {args.count} 只股票 × {MINUTES_PER_DAY} 分钟: {generate_ms:.0f} ms")
+
+    start = time.perf_counter()
+    # json.dumps 使用C实现的编码器，比 json.dump 直接写文件快很多
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(index_to_json_data(index), ensure_ascii=False))
+    print(f"写入 {args.output}: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if args.binary:
+        index.write_binary(args.binary)
+        print(f"写入 {args.binary}")
+
+
+if __name__ == '__main__':
+    main()
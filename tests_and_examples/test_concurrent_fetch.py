@@ -0,0 +1,210 @@
+"""
+爬虫并发抓取测试
+在本地启动一个模拟新浪/腾讯接口的HTTP桩服务，检查：
+- 并发抓取的结果与逐只抓取一致
+- 每个主机的并发连接数不超过连接池上限
+- 令牌桶限速生效
+- 503 等服务端错误会按退避重试后成功
+- 股票代码的市场前缀（沪市基金、北交所）
+用法: python tests_and_examples/test_concurrent_fetch.py
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fetch_eastmoney_intraday import EastMoneyIntradaySpider
+from fetch_eastmoney_stock import EastMoneyStockSpider
+from http_pool import PooledSession, TokenBucket
+
+# 桩服务每个请求的处理时间，用于制造并发
+STUB_DELAY = 0.05
+
+
+class StubState:
+    """桩服务的计数器"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+        self.failed_once = set()
+        self.flaky = set()
+
+    def enter(self):
+        with self.lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def should_fail(self, symbol):
+        """flaky 中的股票第一次请求返回503"""
+        with self.lock:
+            if symbol in self.flaky and symbol not in self.failed_once:
+                self.failed_once.add(symbol)
+                return True
+            return False
+
+
+def stub_bars(symbol):
+    """按股票代码生成确定的K线"""
+    base = int(symbol[2:]) % 100 + 10
+    return [{
+        'day': f"2025-01-15 09:{31 + i:02d}:00",
+        'open': f"{base + i * 0.01:.2f}",
+        'high': f"{base + i * 0.01 + 0.05:.2f}",
+        'low': f"{base + i * 0.01 - 0.05:.2f}",
+        'close': f"{base + i * 0.01 + 0.02:.2f}",
+        'volume': str(1000 * (i + 1)),
+        'amount': f"{10000.0 * (i + 1):.1f}"
+    } for i in range(5)]
+
+
+def tencent_line(symbol):
+    base = int(symbol[2:]) % 100 + 10
+    fields = [''] * 60
+    fields[:7] = ['1', f'股票{symbol[2:]}', symbol[2:], f'{base + 0.5:.2f}', f'{base:.2f}', f'{base + 0.1:.2f}', '12345']
+    fields[33], fields[34] = f'{base + 1:.2f}', f'{base - 1:.2f}'
+    return f'v_{symbol}="{"~".join(fields)}";'
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            # 在写响应前离开计数，避免客户端收到响应后发起的下一个请求被重复计入
+            state.enter()
+            try:
+                time.sleep(STUB_DELAY)
+                status, body = self.handle_path(urlparse(self.path))
+            finally:
+                state.leave()
+            self.reply(status, body)
+
+        def handle_path(self, url):
+            if url.path == '/kline':
+                symbol = parse_qs(url.query)['symbol'][0]
+                if state.should_fail(symbol):
+                    return 503, ''
+                return 200, json.dumps(stub_bars(symbol))
+            if url.path == '/tencent':
+                return 200, '\n'.join(tencent_line(symbol) for symbol in url.query.split(','))
+            return 404, ''
+
+        def reply(self, status, body):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return StubHandler
+
+
+def start_stub_server(state):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_token_bucket():
+    """用假时钟检查令牌桶：突发用完后按速率放行"""
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=5, capacity=2, clock=lambda: now[0], sleep=sleep)
+    waits = [bucket.acquire() for _ in range(6)]
+    assert waits[:2] == [0.0, 0.0], waits
+    assert abs(now[0] - 4 / 5) < 1e-9, now[0]  # 后4个令牌每个0.2秒
+    print(f"令牌桶: 6个请求共等待 {now[0]:.2f} 秒")
+
+
+def test_format_stock_code():
+    spider = EastMoneyStockSpider(session=PooledSession())
+    for code, symbol in [('600000', 'sh600000'), ('688981', 'sh688981'), ('510300', 'sh510300'),
+                         ('000001', 'sz000001'), ('300750', 'sz300750'), ('159915', 'sz159915'),
+                         ('430047', 'bj430047'), ('830799', 'bj830799'), ('920001', 'bj920001')]:
+        assert spider.format_stock_code(code) == symbol, (code, spider.format_stock_code(code))
+    print("股票代码市场前缀: 沪市基金、北交所判断正确")
+
+
+def main():
+    test_token_bucket()
+    test_format_stock_code()
+
+    state = StubState()
+    server = start_stub_server(state)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    codes = [f"{600000 + i}" for i in range(24)] + [f"{1 + i:06d}" for i in range(16)]
+    state.flaky = {'sh600003', 'sz000005'}
+
+    # 并发抓取分时数据：连接池上限4，503会重试
+    pool_size = 4
+    session = PooledSession(rate=1000, burst=1000, pool_size=pool_size, backoff=0.01)
+    spider = EastMoneyIntradaySpider(session=session)
+    spider.KLINE_URL = f"{base_url}/kline"
+
+    start = time.perf_counter()
+    results = spider.get_intraday_data_batch(codes, max_workers=16)
+    concurrent_s = time.perf_counter() - start
+
+    assert all(results[code] for code in codes), [code for code in codes if not results[code]]
+    sample = results['600001']['分时数据'][-1]
+    assert sample['收盘价'] == float(stub_bars('sh600001')[-1]['close']), sample
+    assert state.max_active <= pool_size, state.max_active
+    stats = session.stats()
+    assert stats['retried'] == len(state.flaky), stats
+    print(f"并发抓取 {len(codes)} 只股票: {concurrent_s * 1000:.0f} ms，"
+          f"最大并发连接 {state.max_active}/{pool_size}，统计 {stats}")
+
+    # 逐只抓取作为对照，结果应一致
+    serial = EastMoneyIntradaySpider(session=PooledSession(rate=1000, burst=1000))
+    serial.KLINE_URL = spider.KLINE_URL
+    start = time.perf_counter()
+    for code in codes[:8]:
+        assert serial.get_intraday_data(code) == results[code]
+    serial_s = (time.perf_counter() - start) / 8 * len(codes)
+    print(f"逐只抓取（按前8只估算）: {serial_s * 1000:.0f} ms，并发加速 {serial_s / concurrent_s:.1f}x")
+
+    # 限速：每秒20个、突发5个，25个请求至少需要1秒
+    state.max_active = 0
+    limited = EastMoneyIntradaySpider(session=PooledSession(rate=20, burst=5, pool_size=8))
+    limited.KLINE_URL = spider.KLINE_URL
+    start = time.perf_counter()
+    limited.get_intraday_data_batch(codes[:25], max_workers=8)
+    limited_s = time.perf_counter() - start
+    assert limited_s >= 0.95, limited_s
+    print(f"限速 20/s 抓取25只股票: {limited_s:.2f} 秒，统计 {limited.session.stats()}")
+
+    # 批量行情：多个批次并发请求，不修改共享会话的请求头
+    stock_spider = EastMoneyStockSpider(session=PooledSession(rate=1000, burst=1000, pool_size=pool_size))
+    stock_spider.TENCENT_URL = f"{base_url}/tencent?"
+    session_headers = dict(stock_spider.session.headers)
+    requests_before = state.requests
+    quotes = stock_spider.get_stock_data_batch(codes, batch_size=10)
+    assert all(quotes[code] for code in codes), [code for code in codes if not quotes[code]]
+    assert state.requests - requests_before == 4, state.requests - requests_before
+    assert dict(stock_spider.session.headers) == session_headers
+    print(f"批量行情: {len(codes)} 只股票 4 个批次，600000 最新价 {quotes['600000']['最新']}")
+
+    server.shutdown()
+    print("\n爬虫并发抓取测试通过")
+
+
+if __name__ == '__main__':
+    main()
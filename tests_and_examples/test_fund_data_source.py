@@ -0,0 +1,100 @@
+"""
+基金数据源录制/回放离线测试
+用 fake_akshare 代替 akshare 录制 fixture，再只从 fixture 回放，检查：
+- 回放的DataFrame与录制时完全一致（列顺序、股票代码保持字符串）
+- 未录制的调用抛出 FixtureNotFound
+- 注入的失败和耗时由种子决定，可复现
+- 持仓缓存不缓存注入的失败，重试后可以取到数据
+用法: python tests_and_examples/test_fund_data_source.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+import fake_akshare
+
+fake_akshare.install()
+
+from fund_data_source import (
+    AkshareSource, FaultInjectingSource, FixtureNotFound, InjectedFailure, RecordingSource, ReplaySource
+)
+from holdings_cache import HoldingsCache
+
+FUND_CODES = ['005550', '000001']
+YEAR = '2025'
+
+
+def run_injection(seed, calls=40):
+    """按固定顺序调用，返回每次是否失败以及注入的耗时"""
+    delays = []
+    source = FaultInjectingSource(AkshareSource(), latency=0.01, jitter=0.02, failure_rate=0.3,
+                                  seed=seed, sleep=delays.append)
+    outcomes = []
+    for i in range(calls):
+        try:
+            source.fund_individual_basic_info_xq(FUND_CODES[i % len(FUND_CODES)])
+            outcomes.append(True)
+        except InjectedFailure:
+            outcomes.append(False)
+    return outcomes, delays, source
+
+
+def main():
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        recorder = RecordingSource(AkshareSource(), fixture_dir)
+        recorded = {}
+        for fund_code in FUND_CODES:
+            recorded[fund_code] = (
+                recorder.fund_portfolio_hold_em(fund_code, YEAR),
+                recorder.fund_individual_basic_info_xq(fund_code)
+            )
+        print(f"录制 {recorder.recorded} 个 fixture")
+        assert recorder.recorded == 2 * len(FUND_CODES)
+
+        replay = ReplaySource(fixture_dir)
+        for fund_code, (holdings_df, info_df) in recorded.items():
+            replayed = replay.fund_portfolio_hold_em(fund_code, YEAR)
+            assert replayed.columns.tolist() == holdings_df.columns.tolist()
+            assert replayed.equals(holdings_df), f"{fund_code} 持仓回放不一致"
+            assert replayed['股票代码'].map(type).eq(str).all()
+            assert replay.fund_individual_basic_info_xq(fund_code).equals(info_df)
+        print("回放结果与录制一致")
+
+        try:
+            replay.fund_portfolio_hold_em(FUND_CODES[0], '2024')
+            raise AssertionError("未录制的调用应该失败")
+        except FixtureNotFound as e:
+            print(f"未录制的调用: {e}")
+
+        # 持仓缓存不缓存失败：前几次注入失败，重试直到成功
+        flaky = FaultInjectingSource(replay, failure_rate=0.5, seed=3)
+        cache = HoldingsCache()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                df = cache.get_or_fetch(FUND_CODES[0], YEAR, lambda: flaky.fund_portfolio_hold_em(FUND_CODES[0], YEAR))
+                break
+            except InjectedFailure:
+                assert attempts < 20
+        assert df.equals(recorded[FUND_CODES[0]][0])
+        print(f"注入失败后第 {attempts} 次取到持仓，注入统计: {flaky.stats()}")
+
+    outcomes, delays, source = run_injection(seed=7)
+    outcomes_again, delays_again, _ = run_injection(seed=7)
+    outcomes_other, _, _ = run_injection(seed=8)
+    assert outcomes == outcomes_again and delays == delays_again, "相同种子的注入结果应一致"
+    assert outcomes != outcomes_other, "不同种子的注入结果应不同"
+    assert all(0.01 <= delay <= 0.03 for delay in delays)
+    failures = outcomes.count(False)
+    assert 0 < failures < len(outcomes)
+    assert source.stats()['injectedFailures'] == failures
+    print(f"注入可复现: {len(outcomes)} 次调用失败 {failures} 次，统计 {source.stats()}")
+
+    print("\n全部通过")
+
+
+if __name__ == '__main__':
+    main()
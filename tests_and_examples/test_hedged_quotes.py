@@ -0,0 +1,162 @@
+"""
+行情接口对冲请求测试
+在本地启动模拟腾讯/新浪/东方财富行情接口的HTTP桩服务，检查：
+- 主接口卡住时，超过对冲等待时间就改用下一个接口，单次查询不再等满超时
+- 慢接口和出错接口的评分下降，最快的健康接口自动成为主接口
+- 关闭对冲时按评分顺序逐个尝试，出错的接口不重试
+- 东方财富接口（fltt=2）的价格和百分比不被错误地缩小100倍
+- 快速失败的接口（错误率未超过不健康阈值）排序时失败按超时计入，排在慢但可用的接口之后
+用法: python tests_and_examples/test_hedged_quotes.py
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fetch_eastmoney_stock import EastMoneyStockSpider
+from hedged_request import SourceScoreboard
+from http_pool import PooledSession
+
+# 各接口当前的行为：(延迟秒数, 状态码)
+BEHAVIOR = {
+    '/tencent': (0.01, 200),
+    '/sina': (0.01, 200),
+    '/eastmoney': (0.01, 200),
+}
+
+
+def tencent_body(query):
+    fields = [''] * 60
+    fields[:7] = ['1', '浦发银行', '600000', '10.50', '10.00', '10.10', '12345']
+    fields[33], fields[34] = '10.80', '9.90'
+    return f'v_{query}="{"~".join(fields)}";'
+
+
+def sina_body(query):
+    fields = ['浦发银行', '10.10', '10.00', '10.50', '10.80', '9.90', '10.49', '10.50', '1234500', '12962250'] + ['0'] * 22
+    return f'var hq_str_{query}="{",".join(fields)}";'
+
+
+def eastmoney_body(query):
+    # 与真实接口在 fltt=2 时一致：价格和百分比为小数
+    return json.dumps({'data': {
+        'f58': '浦发银行', 'f43': 10.5, 'f46': 10.1, 'f60': 10.0, 'f44': 10.8, 'f45': 9.9,
+        'f47': 12345, 'f48': 12962250.0, 'f51': 11.0, 'f52': 9.0, 'f117': 10.49,
+        'f168': 0.35, 'f169': 0.5, 'f170': 5.0
+    }})
+
+
+BODIES = {'/tencent': tencent_body, '/sina': sina_body, '/eastmoney': eastmoney_body}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        delay, status = BEHAVIOR[url.path]
+        time.sleep(delay)
+        data = BODIES[url.path](url.query).encode('utf-8') if status == 200 else b''
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_spider(base_url, **kwargs):
+    # 会话保留默认的重试设置，行情请求本身不应重试
+    spider = EastMoneyStockSpider(session=PooledSession(rate=1000, burst=1000), **kwargs)
+    spider.TENCENT_URL = f"{base_url}/tencent?"
+    spider.SINA_URL = f"{base_url}/sina?"
+    spider.EASTMONEY_URL = f"{base_url}/eastmoney"
+    return spider
+
+
+def timed_quote(spider, **kwargs):
+    start = time.perf_counter()
+    result = spider.get_stock_data_api('600000', **kwargs)
+    return result, time.perf_counter() - start
+
+
+def test_fast_failure_ranks_last():
+    scoreboard = SourceScoreboard(['快速失败', '正常', '较慢'])
+    for i in range(10):
+        # 快速失败的接口每次1ms返回，40%的请求失败（未超过不健康阈值）
+        scoreboard.record('快速失败', 0.001, i % 5 >= 2)
+        scoreboard.record('正常', 0.03, True)
+        scoreboard.record('较慢', 0.08, True)
+    ranked = scoreboard.ranked()
+    print(f"快速失败的接口排序: {ranked}，评分 {scoreboard.stats()['sources']['快速失败']}")
+    assert ranked == ['正常', '较慢', '快速失败'], ranked
+
+
+def main():
+    test_fast_failure_ranks_last()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # 东方财富接口（fltt=2）返回的价格和百分比不再除以100
+    quote = make_spider(base_url).fetch_eastmoney_quote('sh', '600000')
+    print(f"东方财富接口: {quote}")
+    assert quote['最新'] == 10.5 and quote['昨收'] == 10.0 and quote['涨停'] == 11.0, quote
+    assert quote['涨幅'] == 5.0 and quote['涨跌'] == 0.5 and quote['换手'] == 0.35, quote
+
+    print("=" * 60)
+    print("腾讯接口卡住1.5秒，新浪正常")
+    print("=" * 60)
+    BEHAVIOR['/tencent'] = (1.5, 200)
+    spider = make_spider(base_url)
+    result, elapsed = timed_quote(spider)
+    assert result and result['最新'] == 10.5, result
+    assert elapsed < 1.0, elapsed  # 默认0.5秒后对冲，不用等腾讯返回
+    print(f"首次查询: {elapsed * 1000:.0f} ms（对冲后由新浪返回）")
+
+    time.sleep(1.2)  # 等落选的腾讯请求结束并计入评分
+    assert spider.scoreboard.ranked()[0] != '腾讯', spider.scoreboard.ranked()
+    elapsed_list = [timed_quote(spider)[1] for _ in range(10)]
+    assert max(elapsed_list) < 0.3, elapsed_list
+    stats = spider.source_stats()
+    print(f"之后10次查询最慢 {max(elapsed_list) * 1000:.0f} ms，主接口 {spider.scoreboard.ranked()[0]}")
+    print(f"评分: {stats}")
+    assert stats['hedges'] == 1, stats
+    assert stats['sources']['腾讯']['requests'] == 1, stats
+
+    print("=" * 60)
+    print("新浪接口返回500，东方财富较慢，腾讯恢复")
+    print("=" * 60)
+    BEHAVIOR['/tencent'] = (0.03, 200)
+    BEHAVIOR['/sina'] = (0.01, 500)
+    BEHAVIOR['/eastmoney'] = (0.08, 200)
+    spider = make_spider(base_url)
+    for _ in range(12):
+        result, _ = timed_quote(spider)
+        assert result and result['最新'] == 10.5, result
+    ranked = spider.scoreboard.ranked()
+    stats = spider.source_stats()
+    print(f"接口排序: {ranked}")
+    print(f"评分: {stats}")
+    assert ranked[0] == '腾讯' and ranked[-1] == '新浪', ranked
+
+    print("=" * 60)
+    print("关闭对冲：按评分逐个尝试")
+    print("=" * 60)
+    BEHAVIOR['/tencent'] = (0.01, 503)
+    result, elapsed = timed_quote(spider, hedged=False)
+    assert result and result['最新'] == 10.5, result
+    print(f"腾讯503后依次尝试: {elapsed * 1000:.0f} ms，评分 {spider.source_stats()['sources']['腾讯']}")
+    assert spider.session.stats()['retried'] == 0, spider.session.stats()  # 503不重试，直接尝试下一个接口
+
+    server.shutdown()
+    print("\n行情接口对冲请求测试通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+持仓缓存的并发未命中测试
+多个线程同时查询同一只基金、同一年份的未缓存持仓，检查只请求一次上游、所有线程拿到同一结果；
+上游出错时所有等待的线程都收到异常、不缓存，下一次查询重新请求上游
+用法: python tests_and_examples/test_holdings_cache.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from holdings_cache import HoldingsCache
+
+THREADS = 16
+
+
+def concurrent_lookups(cache, fetcher):
+    """THREADS 个线程同时查询同一个键，返回 [(结果, 异常)]"""
+    barrier = threading.Barrier(THREADS)
+
+    def lookup(_):
+        barrier.wait()
+        try:
+            return cache.get_or_fetch('000001', '2025', fetcher), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(lookup, range(THREADS)))
+
+
+def main():
+    cache = HoldingsCache()
+    calls = []
+    holdings_df = pd.DataFrame({'股票代码': ['600519'], '占净值比例': [9.5]})
+
+    def fetcher():
+        calls.append(1)
+        time.sleep(0.2)
+        return holdings_df
+
+    results = concurrent_lookups(cache, fetcher)
+    stats = cache.stats()
+    print(f"{THREADS} 个线程同时未命中: 上游请求 {len(calls)} 次，统计 {stats}")
+    assert len(calls) == 1, len(calls)
+    assert all(result is holdings_df and error is None for result, error in results)
+    assert stats['coalescedWaits'] + stats['hits'] == THREADS - 1, stats
+    assert cache.get_or_fetch('000001', '2025', fetcher) is holdings_df and len(calls) == 1
+
+    # 上游出错：等待的线程共用同一个异常，不缓存
+    failing = HoldingsCache()
+    calls.clear()
+
+    def failing_fetcher():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ConnectionError("上游不可用")
+
+    results = concurrent_lookups(failing, failing_fetcher)
+    assert len(calls) == 1, len(calls)
+    assert all(isinstance(error, ConnectionError) for _, error in results), results
+    assert failing.get_or_fetch('000001', '2025', fetcher) is holdings_df and len(calls) == 2
+    print(f"上游出错: {THREADS} 个线程都收到异常，之后重新请求上游")
+
+    print("\n全部通过")
+
+
+if __name__ == '__main__':
+    main()
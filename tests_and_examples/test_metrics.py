@@ -0,0 +1,80 @@
+"""
+请求追踪与指标测试
+检查直方图的累计桶、span 嵌套深度、线程池中的阶段记入所属请求、上游错误按异常类型计数，
+以及 Prometheus 文本格式的输出
+用法: python tests_and_examples/test_metrics.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from metrics import MetricsRegistry, begin_request, end_request, span, upstream_call, upstream_errors
+
+
+def fail():
+    raise ConnectionError("上游不可用")
+
+
+def worker_stage():
+    with span('worker'):
+        pass
+
+
+def main():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('test_seconds', '测试耗时', ('op',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, 'a')
+    counter = registry.counter('test_total', '测试计数', ('result',))
+    counter.inc('ok')
+    counter.inc('ok', amount=2)
+    registry.add_collector(lambda: [('test_ratio', 'gauge', '测试比例', [({'cache': 'x'}, 0.5)])])
+
+    text = registry.render()
+    print(text)
+    for line in [
+        'test_seconds_bucket{op="a",le="0.1"} 1',
+        'test_seconds_bucket{op="a",le="1.0"} 3',
+        'test_seconds_bucket{op="a",le="+Inf"} 4',
+        'test_seconds_count{op="a"} 4',
+        'test_total{result="ok"} 3',
+        'test_ratio{cache="x"} 0.5',
+    ]:
+        assert line in text, f"缺少: {line}"
+
+    # 一个请求的追踪：嵌套 span 的深度，线程池中执行的阶段记入同一请求
+    executor = ThreadPoolExecutor(max_workers=2)
+    trace, token = begin_request('GET /test')
+    with span('outer'):
+        with span('inner', year='2025'):
+            pass
+        executor.submit(copy_context().run, worker_stage).result()
+    try:
+        upstream_call('test_method', fail)
+        raise AssertionError("上游失败应抛出")
+    except ConnectionError:
+        pass
+    timing = end_request(trace, token, '/test', 'GET', 200)
+    executor.shutdown()
+
+    spans = {s['name']: s for s in trace.to_dict()['spans']}
+    print(trace.to_dict())
+    print(f"Server-Timing: {timing}")
+    assert spans['outer']['depth'] == 0 and spans['inner']['depth'] == 1 and spans['worker']['depth'] == 1
+    assert spans['inner']['year'] == '2025'
+    assert spans['upstream.test_method']['error'] == 'ConnectionError'
+    assert timing.startswith('total;dur=') and 'outer;dur=' in timing
+    assert upstream_errors.value('test_method', 'ConnectionError') == 1
+
+    # 请求结束后不再记入该请求
+    with span('after'):
+        pass
+    assert 'after' not in {s['name'] for s in trace.to_dict()['spans']}
+
+    print("\n全部通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+模拟股票集合的代码测试
+检查大规模股票集合的代码都是6位且不重复、超出容量时报错，
+以及 fake_akshare 持仓经过转换后的股票都能在分钟数据中找到（压测不是在测未命中）
+用法: python tests_and_examples/test_minute_data_generator.py
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+import fake_akshare
+from holdings_normalize import normalize_holdings
+from minute_data import strip_market_suffix
+from minute_data_generator import UNIVERSE_CAPACITY, generate_universe, universe_code
+
+CODE_PATTERN = re.compile(r'^\d{6}$')
+
+
+def main():
+    for count in (5000, 20000, UNIVERSE_CAPACITY):
+        codes = [universe_code(i) for i in range(count)]
+        invalid = [code for code in codes if not CODE_PATTERN.match(code)]
+        assert not invalid, f"{count} 只股票中有 {len(invalid)} 个非6位代码，如 {invalid[:3]}"
+        assert len(set(codes)) == count, f"{count} 只股票的代码有重复"
+        print(f"{count} 只股票: 代码都是6位且不重复（{codes[0]} ... {codes[-1]}）")
+
+    try:
+        generate_universe(UNIVERSE_CAPACITY + 1)
+        raise AssertionError("超出容量应报错")
+    except ValueError as e:
+        print(f"超出容量: {e}")
+
+    index = generate_universe(20000, seed=1)
+    assert all(CODE_PATTERN.match(code) for code in index.codes)
+    missing = 0
+    for fund_code in ('000001', '005550', '161725'):
+        _, holdings = normalize_holdings(fake_akshare.fund_portfolio_hold_em(fund_code, '2025'))
+        missing += sum(strip_market_suffix(h['stockCode']) not in index for h in holdings)
+    assert missing == 0, f"{missing} 只持仓股票不在分钟数据中"
+    print("fake_akshare 持仓股票都能在分钟数据中找到")
+
+    print("\n全部通过")
+
+
+if __name__ == '__main__':
+    main()
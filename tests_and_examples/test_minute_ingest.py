@@ -0,0 +1,171 @@
+"""
+分钟K线采集离线测试
+使用 fixtures/intraday 中按爬虫返回格式保存的K线，按时间回放一个交易日：
+先在09:35全量采集，再在09:50增量采集（只重写二进制文件，flush()时才写JSON），
+检查写出的分钟数据能被估值引擎直接读取；跟踪股票集合按间隔刷新；
+通过本地桩服务检查爬虫采集沪市基金（5开头）和北交所股票时使用正确的市场前缀
+用法: python tests_and_examples/test_minute_ingest.py
+"""
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+import tempfile
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from minute_data import MINUTE_SLOT, MinuteDataIndex
+from minute_ingest import FixtureBarSource, MinuteBarIngestor, SpiderBarSource, TrackedStocks
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'intraday')
+
+
+class ReplayClock:
+    """可以手动拨动的时钟"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingSource(FixtureBarSource):
+    """记录每次请求的K线数，用于检查增量采集"""
+
+    def __init__(self, fixture_dir, clock):
+        super().__init__(fixture_dir, clock=clock)
+        self.requests = []
+
+    def fetch(self, code, datalen):
+        self.requests.append((code, datalen))
+        return super().fetch(code, datalen)
+
+
+class CountingHoldingsStore:
+    """记录读取次数的持仓库替身"""
+
+    def __init__(self):
+        self.loads = 0
+
+    def warm_load(self):
+        self.loads += 1
+
+    def latest_holdings(self):
+        return {'000001': [{'stockCode': '600519.XSHG', 'stockName': '贵州茅台'}]}
+
+
+def test_tracked_stocks():
+    store = CountingHoldingsStore()
+    monotonic = ReplayClock(0.0)
+    tracked = TrackedStocks(store, interval=600, clock=monotonic)
+    for second in range(0, 600, 60):
+        monotonic.now = float(second)
+        assert tracked.get() == {'600519': '贵州茅台'}
+    assert store.loads == 1, store.loads
+    monotonic.now = 600.0
+    tracked.get()
+    assert store.loads == 2, store.loads
+    print("跟踪股票集合: 10分钟内只读取一次持仓库")
+
+
+# 桩服务只认带正确市场前缀的代码，与真实接口一样，前缀错误时没有K线
+KLINE_SYMBOLS = {'sh510300', 'bj430047', 'bj920001', 'sz159915', 'sh600519'}
+
+
+class KlineStubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        symbol = parse_qs(urlparse(self.path).query)['symbol'][0]
+        bars = [{
+            'day': f"2025-01-15 09:{31 + i:02d}:00", 'open': '1.000', 'high': '1.010', 'low': '0.990',
+            'close': f"{1 + i * 0.001:.3f}", 'volume': '1000', 'amount': '1000.0'
+        } for i in range(5)] if symbol in KLINE_SYMBOLS else []
+        data = json.dumps(bars).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def test_spider_market_prefixes():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KlineStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    source = SpiderBarSource()
+    source.spider.KLINE_URL = f"http://127.0.0.1:{server.server_address[1]}/kline"
+    stocks = {'510300': '沪深300ETF', '430047': '诺思兰德', '920001': '北交所新代码', '159915': '创业板ETF', '600519': '贵州茅台'}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ingestor = MinuteBarIngestor(source, data_path=os.path.join(tmp_dir, 'stock_minute_data.json'),
+                                     bin_path=None, clock=ReplayClock(datetime(2025, 1, 15, 9, 36)))
+        summary = ingestor.ingest(stocks)
+    server.shutdown()
+    assert summary['updated'] == len(stocks) and summary['failed'] == 0, summary
+    print("爬虫采集: 沪市基金、北交所股票的K线都已取到")
+
+
+def main():
+    test_tracked_stocks()
+    test_spider_market_prefixes()
+
+    clock = ReplayClock(datetime(2025, 1, 15, 9, 35))
+    source = CountingSource(FIXTURE_DIR, clock)
+    stocks = {'600519': '贵州茅台', '300750': '宁德时代', '000000': '无录制数据'}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = os.path.join(tmp_dir, 'stock_minute_data.json')
+        bin_path = os.path.join(tmp_dir, 'stock_minute_data.bin')
+        ingestor = MinuteBarIngestor(source, data_path=data_path, bin_path=bin_path, clock=clock)
+
+        print("=" * 60)
+        print("09:35 首次采集（全量）")
+        print("=" * 60)
+        summary = ingestor.ingest(stocks)
+        assert summary['updated'] == 2 and summary['failed'] == 1, summary
+        assert all(datalen == 240 for _, datalen in source.requests), source.requests
+
+        entry = ingestor.data['600519']
+        assert entry['trade_date'] == '2025-01-15'
+        assert entry['minute_prices'][-1]['time'] == '09:35'
+        assert entry['base_price'] == 1520.0, entry['base_price']  # 前一交易日15:00收盘价
+
+        print("=" * 60)
+        print("09:50 增量采集")
+        print("=" * 60)
+        source.requests.clear()
+        clock.now = datetime(2025, 1, 15, 9, 50)
+        ingestor.ingest(stocks)
+        incremental = dict(source.requests)
+        assert incremental['600519'] == 15 + 3, incremental  # 新增15分钟 + 重叠3根
+        assert ingestor.data['600519']['minute_prices'][-1]['time'] == '09:50'
+        assert len(ingestor.data['600519']['minute_prices']) == 20
+
+        # 增量采集只重写二进制文件，JSON到写入间隔或 flush() 时才写
+        with open(data_path, 'r', encoding='utf-8') as f:
+            assert json.load(f)['600519']['minute_prices'][-1]['time'] == '09:35'
+        ingestor.flush()
+        with open(data_path, 'r', encoding='utf-8') as f:
+            assert json.load(f)['600519']['minute_prices'][-1]['time'] == '09:50'
+        assert os.path.getmtime(bin_path) >= os.path.getmtime(data_path)  # 服务仍优先使用二进制文件
+
+        # 写出的文件可以直接被服务加载
+        index = MinuteDataIndex.from_binary(bin_path)
+        row = index.get_row('600519')
+        slot = MINUTE_SLOT['09:50']
+        print(f"600519 {index.names[row]}: 开盘={index.open_prices[row]:.2f} "
+              f"昨收={index.base_prices[row]:.2f} 09:50={index.prices[row, slot]:.2f}")
+        assert index.prices[row, slot] == np.float32(ingestor.data['600519']['minute_prices'][-1]['price'])
+        assert index.prices[row, -1] == index.prices[row, slot]  # 之后的分钟沿用最新价格
+
+    print("\n分钟K线采集离线测试通过")
+
+
+if __name__ == '__main__':
+    main()
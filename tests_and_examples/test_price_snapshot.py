@@ -0,0 +1,53 @@
+"""
+报价快照与分钟数据热更新测试
+收盘后（快照键一直是当天15:00）重新加载分钟数据，检查下一次查询立即使用新数据，
+同一份数据同一分钟内仍然只计算一次
+用法: python tests_and_examples/test_price_snapshot.py
+"""
+from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from minute_data import MinuteDataSource, time_to_slot
+from minute_data_generator import generate_universe
+from price_snapshot import PriceSnapshot
+
+
+def main():
+    indices = [generate_universe(10, seed=1), generate_universe(10, seed=2)]
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return indices[min(len(loads), len(indices)) - 1]
+
+    # check_interval=0：不自动检查文件，由测试显式 reload()
+    source = MinuteDataSource(loader=loader, paths=(), check_interval=0)
+
+    def quote_fn(code, now):
+        index = source.current()
+        return float(index.prices[index.get_row(code), time_to_slot(now)])
+
+    snapshot = PriceSnapshot(quote_fn, index_fn=source.current)
+    code = indices[0].codes[0]
+    after_close = datetime(2025, 1, 15, 18, 0)
+
+    old_price = snapshot.get_quote(code, after_close)
+    assert snapshot.get_quote(code, after_close.replace(hour=19)) == old_price
+    assert snapshot.stats()['quotesComputed'] == 1, "同一分钟、同一份数据只应计算一次"
+
+    assert source.reload()
+    new_price = snapshot.get_quote(code, after_close.replace(hour=20))
+    expected = float(indices[1].prices[indices[1].get_row(code), -1])
+    print(f"{code} 重新加载前 {old_price:.2f}，重新加载后 {new_price:.2f}")
+    assert new_price == expected, "重新加载后应立即使用新数据"
+    assert new_price != old_price
+    assert snapshot.stats()['quotesComputed'] == 2
+
+    print("\n全部通过")
+
+
+if __name__ == '__main__':
+    main()
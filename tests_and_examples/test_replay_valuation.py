@@ -0,0 +1,69 @@
+"""
+回放模式下的估值走势测试
+步进回放从11:28经过午休到13:00，检查 /api/fund/valuation-history 只返回回放时钟之前的估值点：
+午休期间停在11:30，不会提前返回下午的价格；开盘前没有数据
+用法: python tests_and_examples/test_replay_valuation.py
+"""
+from datetime import datetime
+import os
+import sys
+import tempfile
+
+EXAMPLES_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, EXAMPLES_DIR)
+sys.path.append(os.path.join(EXAMPLES_DIR, '..', 'backend'))
+
+data_dir = tempfile.mkdtemp()
+os.environ.update({
+    'MINUTE_DATA_DIR': data_dir,
+    'HOLDINGS_STORE_PATH': os.path.join(data_dir, 'holdings_store.db'),
+    'MARKET_REPLAY_CONTROL': '1',
+    'FAKE_AKSHARE_STOCKS': '200',
+})
+
+from minute_data_generator import generate_universe
+
+generate_universe(200, seed=1).write_binary(os.path.join(data_dir, 'stock_minute_data.bin'))
+
+import fake_akshare
+
+fake_akshare.install()
+
+from fund_api import app, market_clock, valuation_end_slot
+
+FUND_CODE = '000001'
+
+
+def history_times(client):
+    response = client.get(f'/api/fund/valuation-history?fundCode={FUND_CODE}')
+    assert response.status_code == 200, response.get_json()
+    return [point['time'] for point in response.get_json()['valuationHistory']]
+
+
+def main():
+    client = app.test_client()
+    response = client.post('/api/replay', json={'mode': 'stepped', 'date': '2025-01-15', 'start': '11:28'})
+    assert response.status_code == 200, response.get_json()
+
+    expected_last = ['11:28', '11:29', '11:30']
+    for expected in expected_last:
+        times = history_times(client)
+        print(f"{market_clock.now():%H:%M} -> {len(times)} 个估值点，最后 {times[-1]}")
+        assert times[-1] == expected and len(times) == times.index(expected) + 1
+        client.post('/api/replay/step', json={'minutes': 1})
+
+    # 11:30之后的下一个交易分钟是13:00
+    times = history_times(client)
+    print(f"{market_clock.now():%H:%M} -> {len(times)} 个估值点，最后 {times[-1]}")
+    assert market_clock.now().strftime('%H:%M') == '13:00' and times[-1] == '13:00'
+
+    # 午休和开盘前（直接给出时间）
+    assert valuation_end_slot(datetime(2025, 1, 15, 11, 45)) == 120
+    assert valuation_end_slot(datetime(2025, 1, 15, 9, 0)) == -1
+
+    client.delete('/api/replay')
+    print("\n全部通过")
+
+
+if __name__ == '__main__':
+    main()